@@ -0,0 +1,72 @@
+import boto3
+import json
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from l4ecwcw import *
+import matplotlib.ticker as mtick
+
+# Mandatory to ensure text is rendered in SVG plots:
+matplotlib.rcParams['svg.fonttype'] = 'none'
+dpi = 100
+
+@emit_api_metrics
+def plot_component_importance(event, context):
+    model_name     = event['model_name']
+    widget_context = event['widgetContext']
+    width          = widget_context['width']
+    height         = widget_context['height']
+
+    # The component importance only depends on the model evaluation: this
+    # widget is pre-rendered when the model dashboard is created.
+    svg = get_widget_artifact(
+        'component-importance',
+        model_name,
+        width,
+        height,
+        lambda width, height: build_component_importance(model_name, width, height),
+        refresh='prerender' in event
+    )
+
+    return svg
+
+def build_component_importance(model_name, width, height):
+    # Average importance of each component of the dataset over all the
+    # minutes of the events, aggregated once for all the widgets of the
+    # model dashboard:
+    components = get_model_bundle(model_name)['components']
+    colors = set_aws_stylesheet()
+
+    rank_df = pd.DataFrame({
+        'value': components['values'],
+        'num_signals': components['num_signals']
+    }, index=components['names']).sort_values(by='value')
+
+    # A component is highlighted when it weighs more than its share of the
+    # signals of the dataset:
+    total_signals = max(rank_df['num_signals'].sum(), 1)
+    thresholds = rank_df['num_signals'] / total_signals
+    component_colors = [
+        assign_color(v, t, colors)
+        for v, t in zip(rank_df['value'], thresholds)
+    ]
+    y_pos = np.arange(rank_df.shape[0])
+
+    fig = plt.figure(figsize=(width/dpi, height/dpi), dpi=dpi)
+    ax = plt.subplot(111)
+    ax.barh(y_pos, rank_df['value'], align='center', color=component_colors)
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(rank_df.index)
+    ax.xaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+
+    # Add the values in each bar, with the expected share of each component:
+    for i, (v, t) in enumerate(zip(rank_df['value'], thresholds)):
+        text = ax.text(0.001, i, f'{v*100:.2f}%', color='#000000', fontweight='bold', verticalalignment='center')
+        text.set_bbox(dict(facecolor='#FFFFFF', alpha=0.5, pad=0.5, boxstyle='round4'))
+        ax.vlines(x=t, ymin=i - 0.4, ymax=i + 0.4, linestyle='--', linewidth=2.0, color=colors[0])
+
+    ax.set_title('Aggregated component importance over the evaluation period')
+
+    return render_figure(fig, 'component-importance')
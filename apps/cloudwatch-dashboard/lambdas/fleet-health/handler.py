@@ -0,0 +1,330 @@
+import boto3
+import datetime
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from l4ecwcw import *
+
+# Making the clients available to all methods in this Lambda:
+s3_client = boto3.client('s3')
+
+# Number of schedulers processed in parallel: the rate of the calls to the
+# Lookout for Equipment API is limited by the client of the l4ecwcw layer.
+MAX_WORKERS = 16
+
+# Fleet health results are kept between two refreshes of the widget:
+CACHE_TTL = 300
+fleet_cache = dict()
+
+# Only the newest executions of each scheduler are scanned on a refresh and
+# a bounded number of new results files are read: the other ones are read by
+# the next refreshes:
+MAX_EXECUTIONS = 500
+MAX_RESULTS_READS = 24
+
+# Inference results files are immutable: the number of anomalies and the
+# number of timestamps found in each of them are stored in the state of the
+# widget (see `load_state()` in the l4ecwcw layer), for the newest executions:
+MAX_STORED_EXECUTIONS = 5000
+
+COLUMNS = {
+    'scheduler': 'Scheduler',
+    'model': 'Model',
+    'status': 'Scheduler status',
+    'last_status': 'Last execution',
+    'failure_streak': 'Failure streak',
+    'executions': 'Executions',
+    'anomaly_rate': 'Anomaly rate'
+}
+
+@emit_api_metrics
+def get_fleet_health(event, context):
+    """
+    Entry point of the fleet health custom widget. This function builds an
+    HTML table with the health of every inference scheduler of this account
+    over the time range selected in the dashboard. The user can sort this
+    table by clicking on the column headers.
+    
+    Returns:
+        html (string): an HTML formatted string with the table to be displayed
+    """
+    widget_context = event['widgetContext']
+    start = widget_context['timeRange']['start']
+    end = widget_context['timeRange']['end']
+    sort_by = event.get('sort_by', 'failure_streak')
+    if sort_by not in COLUMNS:
+        sort_by = 'failure_streak'
+    descending = event.get('descending', True)
+    
+    fleet = get_fleet(start, end)
+    html = build_heat_table(
+        fleet, 
+        sort_by, 
+        descending, 
+        context.invoked_function_arn
+    )
+    
+    return html
+    
+def get_fleet(start, end, client=None, s3=None, max_workers=MAX_WORKERS):
+    """
+    Computes the health of every scheduler of the account, processing them
+    with a bounded pool of workers. Results are cached for a few minutes: the
+    time range boundaries are rounded so that a refresh of a relative time 
+    range (e.g. the last 3 months) hits the cache.
+    
+    Parameters:
+        start (integer):
+            Start of the time range (in milliseconds since epoch)
+        end (integer):
+            End of the time range (in milliseconds since epoch)
+        client (boto3.Client):
+            A ThrottledClient to query Lookout for Equipment. Defaults to None
+        s3 (boto3.Client):
+            A boto3 client to query Amazon S3. Defaults to None
+        max_workers (integer):
+            Number of schedulers processed in parallel
+            
+    Returns:
+        list of dict: the health of each scheduler
+    """
+    if client is None:
+        client = l4e_client
+    if s3 is None:
+        s3 = s3_client
+        
+    cache_key = (start // (CACHE_TTL * 1000), end // (CACHE_TTL * 1000))
+    if cache_key in fleet_cache:
+        timestamp, fleet = fleet_cache[cache_key]
+        if time.time() - timestamp < CACHE_TTL:
+            return fleet
+    
+    start = datetime.datetime.fromtimestamp(start/1000, datetime.timezone.utc)
+    end = datetime.datetime.fromtimestamp(end/1000, datetime.timezone.utc)
+    schedulers_list = list_schedulers(client)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fleet = list(executor.map(
+            lambda scheduler: get_scheduler_health(
+                scheduler, start, end, client, s3
+            ),
+            schedulers_list
+        ))
+        
+    fleet_cache.clear()
+    fleet_cache[cache_key] = (time.time(), fleet)
+    
+    return fleet
+    
+def list_schedulers(client):
+    """
+    Lists all the inference schedulers of the account
+    """
+    request = dict()
+    schedulers_list = []
+    while True:
+        response = client.list_inference_schedulers(**request)
+        schedulers_list += response['InferenceSchedulerSummaries']
+        
+        if 'NextToken' in response:
+            request['NextToken'] = response['NextToken']
+        else:
+            break
+            
+    return schedulers_list
+    
+def get_scheduler_health(scheduler, start, end, client, s3):
+    """
+    Computes the health of a single scheduler over a time range: the status
+    of its last execution, the number of consecutive failed executions up to
+    the last one and the share of timestamps flagged as anomalous in the
+    results of its successful executions.
+    
+    Returns:
+        dict: the health attributes of this scheduler
+    """
+    scheduler_name = scheduler['InferenceSchedulerName']
+    request = {
+        'InferenceSchedulerName': scheduler_name,
+        'DataStartTimeAfter': start,
+        'DataEndTimeBefore': end,
+        'MaxResults': 50
+    }
+    
+    # Executions are listed from the newest to the oldest:
+    executions = []
+    truncated = False
+    while True:
+        response = client.list_inference_executions(**request)
+        executions += response['InferenceExecutionSummaries']
+        
+        if 'NextToken' not in response:
+            break
+        if len(executions) >= MAX_EXECUTIONS:
+            truncated = True
+            break
+        request['NextToken'] = response['NextToken']
+            
+    last_status = None
+    failure_streak = 0
+    for execution in executions:
+        status = execution['Status']
+        if status == 'IN_PROGRESS':
+            continue
+        if last_status is None:
+            last_status = status
+        if status != 'FAILED':
+            break
+        failure_streak += 1
+        
+    counts = get_anomaly_counts(scheduler_name, executions, s3)
+    num_anomalies = sum(anomalies for anomalies, _ in counts)
+    num_timestamps = sum(timestamps for _, timestamps in counts)
+            
+    anomaly_rate = None
+    if num_timestamps > 0:
+        anomaly_rate = num_anomalies / num_timestamps
+        
+    return {
+        'scheduler': scheduler_name,
+        'model': scheduler['ModelName'],
+        'status': scheduler['Status'],
+        'last_status': last_status,
+        'failure_streak': failure_streak,
+        'executions': len(executions),
+        'truncated': truncated,
+        'anomaly_rate': anomaly_rate
+    }
+    
+def get_anomaly_counts(scheduler_name, executions, s3, max_reads=MAX_RESULTS_READS):
+    """
+    Gets the number of anomalies and timestamps of the successful executions
+    of a scheduler from the state of the widget. The results files of the
+    executions not counted yet are read, newest first and up to `max_reads`
+    files: the counts of the other executions are left to the next refresh.
+    
+    Returns:
+        list of tuple: the number of anomalous timestamps and the total
+        number of timestamps of each counted execution
+    """
+    state_name = f'fleet-health/{scheduler_name}'
+    state = load_state(state_name, s3) or dict()
+    
+    counts = []
+    reads = 0
+    for execution in executions:
+        if execution['Status'] != 'SUCCESS':
+            continue
+            
+        execution_id = str(int(execution['ScheduledStartTime'].timestamp()))
+        if execution_id not in state:
+            if reads >= max_reads:
+                continue
+            state[execution_id] = get_results_counts(
+                execution['CustomerResultObject']['Bucket'],
+                execution['CustomerResultObject']['Key'],
+                s3
+            )
+            reads += 1
+            
+        counts.append(state[execution_id])
+        
+    if reads > 0:
+        if len(state) > MAX_STORED_EXECUTIONS:
+            newest = sorted(state, key=int)[-MAX_STORED_EXECUTIONS:]
+            state = {execution_id: state[execution_id] for execution_id in newest}
+        save_state(state_name, state, s3)
+        
+    return counts
+    
+def get_results_counts(bucket, key, s3):
+    """
+    Counts the anomalous timestamps in an inference results file
+    
+    Returns:
+        tuple: the number of anomalous timestamps and the total number of
+        timestamps found in this file
+    """
+    response = s3.get_object(Bucket=bucket, Key=key)
+    anomalies = 0
+    timestamps = 0
+    for line in response['Body'].iter_lines():
+        if len(line) == 0:
+            continue
+        timestamps += 1
+        anomalies += int(json.loads(line)['prediction'] == 1)
+        
+    return anomalies, timestamps
+    
+def build_heat_table(fleet, sort_by, descending, endpoint):
+    """
+    Generates the HTML table with the health of every scheduler. Cells with
+    failure streaks and anomaly rates are shaded according to their value.
+    
+    Parameters:
+        fleet (list of dict):
+            The health of each scheduler
+        sort_by (string):
+            The attribute to sort the table by
+        descending (boolean):
+            Set to True to sort the table in descending order
+        endpoint (string):
+            The ARN of this Lambda function, called when a header is clicked
+            
+    Returns:
+        string: an HTML string with the table to display
+    """
+    # Missing values are always listed last:
+    present = [s for s in fleet if s[sort_by] is not None]
+    missing = [s for s in fleet if s[sort_by] is None]
+    fleet = sorted(present, key=lambda s: s[sort_by], reverse=descending) + missing
+    
+    header = '<table>\n<thead><tr>'
+    for column, label in COLUMNS.items():
+        if column == sort_by:
+            label += ' &#9660;' if descending else ' &#9650;'
+            
+        header += '<th>' + create_button(
+            action=endpoint,
+            payload={
+                'sort_by': column,
+                'descending': not descending if column == sort_by else True
+            },
+            label=label,
+            display_mode='widget'
+        ) + '</th>'
+    header += '</tr></thead>\n'
+    
+    body = '<tbody>\n'
+    for scheduler in fleet:
+        failure_streak = scheduler['failure_streak']
+        anomaly_rate = scheduler['anomaly_rate']
+        last_status = scheduler['last_status'] or '-'
+        
+        body += '<tr>'
+        body += f'<td>{scheduler["scheduler"]}</td>'
+        body += f'<td>{scheduler["model"]}</td>'
+        body += f'<td>{scheduler["status"]}</td>'
+        body += f'<td>{last_status}</td>'
+        body += f'<td style="{heat_style(failure_streak / 5)}">{failure_streak}</td>'
+        body += f'<td>{scheduler["executions"]}{"+" if scheduler["truncated"] else ""}</td>'
+        if anomaly_rate is None:
+            body += '<td>-</td>'
+        else:
+            body += f'<td style="{heat_style(anomaly_rate)}">{anomaly_rate*100:.1f}%</td>'
+        body += '</tr>\n'
+    body += '</tbody>\n'
+    
+    footer = '</table>'
+    
+    return header + body + footer
+    
+def heat_style(value):
+    """
+    Builds a CSS background style going from transparent (0.0) to the
+    AWS red color (1.0 or more)
+    """
+    alpha = min(max(value, 0.0), 1.0) * 0.8
+    
+    return f'background-color: rgba(209, 50, 18, {alpha:.2f}); text-align: center'
@@ -5,14 +5,13 @@ import matplotlib.pyplot as plt
 import pandas as pd
 
 from l4ecwcw import *
-from io import StringIO
 from matplotlib import gridspec
 
 # Mandatory to ensure text is rendered in SVG plots:
 matplotlib.rcParams['svg.fonttype'] = 'none'
-client = boto3.client('lookoutequipment')
 dpi = 100
 
+@emit_api_metrics
 def get_predictions(event, context):
     model_name     = event['model_name']
     widget_context = event['widgetContext']
@@ -21,25 +20,23 @@ def get_predictions(event, context):
     # Height taking into account the height of the tag selection form:
     height         = int(widget_context['height']) - 50
     
-    tags_list = get_tags_list(model_name)
+    # All the model data derived from the evaluation are shared with the
+    # other widgets of the model dashboard:
+    bundle = get_model_bundle(model_name)
+    tags_list = list(bundle['tags'])
     tag = get_selected_tag(widget_context)
     if tag is None:
         tag = tags_list[0]
         
-    svg = get_model_evaluations_infos(model_name, width, height, tag)
+    # Optional rolling average and envelope (e.g. `1D`) over the tag:
+    rolling_window = event.get('rolling_window', None)
+        
+    svg = get_model_evaluations_infos(bundle, width, height, tag, rolling_window)
     html = build_tag_selection_form(event, context, tags_list, tag)
     html = html + f'<div>{svg}</div>'
     
     return html
     
-def get_tags_list(model_name):
-    model_response = client.describe_model(ModelName=model_name)
-    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
-    diagnostics = predictions[0]['diagnostics']
-    tags_list = [d['name'].split('\\')[-1] for d in diagnostics]
-    
-    return tags_list
-    
 def get_selected_tag(widget_context):
     print(widget_context['forms']['all'])
 
@@ -49,23 +46,16 @@ def get_selected_tag(widget_context):
     else:
         return None
 
-def get_model_evaluations_infos(model_name, width, height, tag):
-    model_response = client.describe_model(ModelName=model_name)
-    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
-    start_date = pd.to_datetime(model_response['EvaluationDataStartTime']).tz_localize(None)
-    end_date = pd.to_datetime(model_response['EvaluationDataEndTime']).tz_localize(None)
-
-    df = pd.DataFrame(predictions)
-    predictions_df = convert_ranges(df, start_date, end_date)
+def get_model_evaluations_infos(bundle, width, height, tag, rolling_window=None):
+    df, start_date, end_date = get_bundle_ranges(bundle)
+    ranges = IntervalSet.from_dataframe(df)
+    predictions_df = convert_ranges(ranges, start_date, end_date)
     events_df = df.copy()
     events_df['duration'] = pd.to_datetime(events_df['end']) - pd.to_datetime(events_df['start'])
     events_df['duration'] = events_df['duration'].dt.total_seconds() / 3600    
     
-    component_name = json.loads(model_response['Schema'])['Components'][0]['ComponentName']
-    dataset_name = model_response['DatasetName']
-    dataset_response = client.describe_dataset(DatasetName=dataset_name)
-    bucket = dataset_response['IngestionInputConfiguration']['S3InputConfiguration']['Bucket']
-    prefix = dataset_response['IngestionInputConfiguration']['S3InputConfiguration']['Prefix'] #+ component_name + '/'
+    bucket = bundle['dataset']['bucket']
+    prefix = bundle['dataset']['prefix']
     df_list = []
     s3 = boto3.client('s3')
     for file_key in get_matching_s3_keys(bucket=bucket, prefix=prefix, suffix=('.csv', '.CSV')):
@@ -91,11 +81,15 @@ def get_model_evaluations_infos(model_name, width, height, tag):
     # First section: a line plot of the selected time series:
     ax1 = fig.add_subplot(gs[0])
     plt.plot(timeseries_df)
+    if rolling_window is not None:
+        rolling_df = get_rolling_statistics(timeseries_df[tag].sort_index(), rolling_window)
+        ax1.fill_between(rolling_df.index, rolling_df['min'], rolling_df['max'], color=colors[5], alpha=0.2, linewidth=0.0)
+        ax1.plot(rolling_df['mean'], color=colors[5], linewidth=1.0)
     ax1.set_title(f'Tag: {tag}')
     
     # Second section: the events detected by Lookout for Equipment:
     ax2 = fig.add_subplot(gs[1])
-    plot_ranges(predictions_df, 'Detected events', colors[5], ax2)
+    plot_ranges(ranges, 'Detected events', colors[5], ax2, start_date, end_date)
     ax2.set_xlim(ax1.get_xlim())
     
     # Third section: the number of detected events per day:
@@ -112,11 +106,8 @@ def get_model_evaluations_infos(model_name, width, height, tag):
     ax4.axes.get_xaxis().set_ticks([])
     ax4.set_xlabel('Average duration of detected events', fontsize=12)
 
-    # Save this image to an SVG string:
-    svg_io = StringIO()
-    fig.savefig(svg_io, format="svg", bbox_inches='tight')
-
-    return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
+    # Dense time series are rasterized or sent as a PNG image:
+    return render_figure(fig, 'get-predictions')
     
 def build_tag_selection_form(event, context, tags_list, selected_tag):
     endpoint = context.invoked_function_arn
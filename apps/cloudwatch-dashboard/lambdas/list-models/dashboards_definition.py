@@ -1,23 +1,49 @@
 # Initialization
-import boto3
-import os
+from l4ecwcw import get_widget_endpoint
 
-account_id = boto3.client('sts').get_caller_identity()['Account']
-session = boto3.session.Session()
-current_region = session.region_name
+# Model dashboard widgets depending only on the model evaluation: they are
+# pre-rendered when a dashboard is created, for the sizes they get in
+# dashboards displayed with these widths (in pixels). The console splits
+# the width in 24 grid columns and each grid row is about 39 pixels high.
+# Other sizes are rendered and stored in S3 the first time they are 
+# displayed:
+MODEL_DASHBOARD_PRERENDERED_WIDGETS = [
+    'plot-ranked-signals',
+    'plot-feature-importance',
+    'plot-feature-importance-legend',
+    'component-importance'
+]
+DASHBOARD_WIDTHS = [1280, 1440, 1920]
+GRID_COLUMNS = 24
+GRID_ROW_HEIGHT = 39
+
+def get_prerendered_widget_sizes(dashboard_body):
+    """
+    Lists the sizes (width, height in pixels) to pre-render for each 
+    pre-rendered widget of a dashboard, from its position in the grid
+    """
+    endpoints = {get_widget_endpoint(w): w for w in MODEL_DASHBOARD_PRERENDERED_WIDGETS}
+    widget_sizes = dict()
+    for widget in dashboard_body['widgets']:
+        widget_name = endpoints.get(widget['properties'].get('endpoint'))
+        if widget_name is None:
+            continue
+            
+        widget_sizes[widget_name] = [
+            (widget['width'] * dashboard_width // GRID_COLUMNS, widget['height'] * GRID_ROW_HEIGHT)
+            for dashboard_width in DASHBOARD_WIDTHS
+        ]
+        
+    return widget_sizes
 
 def get_model_dashboard_body(model_name):
-    stack = os.environ['Stack']
-    if stack != '':
-        stack = '-' + stack
-    
     dashboard_body = {
        "start": "-P3M",
        "periodOverride": "inherit",
        "widgets": [{
             "x": 0, "y": 0, "height": 3, "width": 24, "type": "custom",
             "properties": {
-                "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-model-details{stack}",
+                "endpoint": get_widget_endpoint("model-details"),
                 "updateOn": {"refresh": True, "resize": True, "timeRange": False},
                 "params": {"model_name": model_name},
                 "title": f"{model_name} | Model details"
@@ -26,7 +52,7 @@ def get_model_dashboard_body(model_name):
         {
             "x": 0, "y": 5, "height": 11, "width": 24, "type": "custom",
             "properties": {
-                "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-get-predictions{stack}",
+                "endpoint": get_widget_endpoint("get-predictions"),
                 "updateOn": {"refresh": True, "resize": True, "timeRange": True},
                 "params": {"model_name": model_name},
                 "title": "Detected anomalies"
@@ -35,7 +61,7 @@ def get_model_dashboard_body(model_name):
         {
             "x": 0, "y": 11, "height": 10, "width": 24, "type": "custom",
             "properties": {
-                "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-plot-ranked-signals{stack}",
+                "endpoint": get_widget_endpoint("plot-ranked-signals"),
                 "updateOn": {"refresh": True, "resize": True, "timeRange": False},
                 "params": {"model_name": model_name},
                 "title": "Aggregated signal importance"
@@ -44,7 +70,7 @@ def get_model_dashboard_body(model_name):
         {
             "x": 0, "y": 20, "height": 9, "width": 18, "type": "custom",
             "properties": {
-                "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-plot-feature-importance{stack}",
+                "endpoint": get_widget_endpoint("plot-feature-importance"),
                 "updateOn": {"refresh": True, "resize": True, "timeRange": True},
                 "params": {"model_name": model_name},
                 "title": "Signal importance"
@@ -53,11 +79,20 @@ def get_model_dashboard_body(model_name):
         {
             "x": 18, "y": 20, "height": 9, "width": 6, "type": "custom",
             "properties": {
-                "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-plot-feature-importance-legend{stack}",
+                "endpoint": get_widget_endpoint("plot-feature-importance-legend"),
                 "updateOn": {"refresh": False, "resize": False, "timeRange": False},
                 "params": {"model_name": model_name},
                 "title": "Signal importance legend"
             }
+        },
+        {
+            "x": 0, "y": 29, "height": 8, "width": 24, "type": "custom",
+            "properties": {
+                "endpoint": get_widget_endpoint("component-importance"),
+                "updateOn": {"refresh": True, "resize": True, "timeRange": False},
+                "params": {"model_name": model_name},
+                "title": "Aggregated component importance"
+            }
         }]
     }
     
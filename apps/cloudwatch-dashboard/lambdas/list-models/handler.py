@@ -3,21 +3,17 @@ import boto3
 import datetime
 import json
 import os
-import time
-import uuid
 
 from l4ecwcw import *
 from dashboards_definition import *
 
 # Initialization
-l4e_client     = boto3.client('lookoutequipment')
 cw_client      = boto3.client('cloudwatch')
-account_id     = boto3.client('sts').get_caller_identity()['Account']
-session        = boto3.session.Session()
-current_region = session.region_name
 all_dashboards = None
+provisioning_dashboard = None
 
 # Entry point
+@emit_api_metrics
 def create_model_dashboard(event, context):
     """
     Entry point of the list models custom widgets. This function build
@@ -28,10 +24,25 @@ def create_model_dashboard(event, context):
     Returns:
         html (string): an HTML formatted string with the table to be displayed
     """
+    load_environment(context)
+    
+    # Asynchronous invocation processing the next
+    # stage of a snapshot canary provisioning:
+    if 'canary_provisioning' in event:
+        return process_canary_provisioning(event)
+        
     # If a model action is requested, we perform it
-    # before displaying the dashboard:
+    # before displaying the dashboard. The snapshot canary
+    # of a new dashboard is provisioned in the background:
+    global provisioning_dashboard
+    provisioning_dashboard = None
     if 'dashboard_name' in event:
         process_dashboard_actions(event)
+        provisioning_dashboard = event['dashboard_name']
+        
+    # The user is polling the status of a snapshot canary:
+    elif 'provisioning_dashboard' in event:
+        provisioning_dashboard = event['provisioning_dashboard']
     
     # Get all the existing dashboard once and for all:
     global all_dashboards
@@ -79,12 +90,19 @@ def process_dashboard_actions(event):
         DashboardBody=json.dumps(dashboard_body)
     )
     
+    # Widgets depending only on the model are rendered in the background:
+    if dashboard_type == 'model':
+        prerender_widgets(entity_name, get_prerendered_widget_sizes(dashboard_body))
+    
     create_synthetics(dashboard_name)
     
 def create_synthetics(dashboard_name):
-    client = boto3.client('synthetics')
-    
-    canary_name = 'modeleval-' + str(uuid.uuid4()).replace('-', '')[:11]
+    """
+    Requests the creation of a Synthetics canary taking snapshots of a given
+    dashboard. The canary is created and started asynchronously: this function
+    returns as soon as the first provisioning stage is scheduled.
+    """
+    canary_name = get_canary_name('modeleval-', dashboard_name)
     version = os.getenv('VERSION')
     syn_source_bucket = os.getenv('SYN_SOURCE_BUCKET')
     syn_source_prefix = 'cloudwatch-dashboard-source-code'
@@ -93,20 +111,20 @@ def create_synthetics(dashboard_name):
     artifacts_s3_path = os.getenv('SYN_ARTIFACT_S3_PATH') + dashboard_name + '/'
     stack_id = os.getenv('Stack')
 
-    response = client.create_canary(
-        Name=canary_name,
-        Code={
+    provision_canary({
+        'Name': canary_name,
+        'Code': {
             'S3Bucket': syn_source_bucket,
             'S3Key': syn_source_code,
             'Handler': 'dashboard-snapshot.handler'
         },
-        ArtifactS3Location=artifacts_s3_path,
-        ExecutionRoleArn=syn_execution_role,
-        Schedule={ 
+        'ArtifactS3Location': artifacts_s3_path,
+        'ExecutionRoleArn': syn_execution_role,
+        'Schedule': { 
             'Expression': 'rate(0 minute)',
             'DurationInSeconds': 0
         },
-        RunConfig={
+        'RunConfig': {
             'TimeoutInSeconds': 180,
             'MemoryInMB': 1024,
             'ActiveTracing': False,
@@ -117,18 +135,10 @@ def create_synthetics(dashboard_name):
                 'DASHBOARD_TYPE': 'ModelEvaluation'
             }
         },
-        SuccessRetentionPeriodInDays=31,
-        FailureRetentionPeriodInDays=31,
-        RuntimeVersion='syn-python-selenium-1.0'
-    )
-    
-    status = 'CREATING'
-    while status != 'READY':
-        response = client.get_canary(Name=canary_name)
-        status = response['Canary']['Status']['State']
-        time.sleep(1)
-        
-    response = client.start_canary(Name=canary_name)
+        'SuccessRetentionPeriodInDays': 31,
+        'FailureRetentionPeriodInDays': 31,
+        'RuntimeVersion': 'syn-python-selenium-1.0'
+    })
 
 def generate_html_table(list_models):
     header = (
@@ -192,7 +202,7 @@ def build_entity_actions_buttons(dashboard_name, current_entity, entity_type):
     global all_dashboards
 
     actions = create_button(
-        action=f'arn:aws:lambda:{current_region}:{account_id}:function:{function}',
+        action=get_lambda_arn(function),
         payload={
             "dashboard_name": dashboard_name,
             "entity_name": current_entity,
@@ -209,8 +219,35 @@ def build_entity_actions_buttons(dashboard_name, current_entity, entity_type):
         disabled=not (dashboard_name in all_dashboards)
     )
     
+    if dashboard_name == provisioning_dashboard:
+        actions += build_provisioning_status(dashboard_name)
+    
     return actions
     
+def build_provisioning_status(dashboard_name):
+    """
+    Builds a button showing the provisioning status of the snapshot canary of
+    a given dashboard. Clicking on it polls this status again with a single
+    Synthetics API call (a canary created but never started is started).
+    Nothing is displayed once the canary is running.
+    """
+    function = os.environ['AWS_LAMBDA_FUNCTION_NAME']
+    
+    state = resume_canary_provisioning(get_canary_name('modeleval-', dashboard_name))
+    if state == 'RUNNING':
+        return ''
+    elif state is None:
+        state = 'PROVISIONING'
+    
+    status = create_button(
+        action=get_lambda_arn(function),
+        payload={"provisioning_dashboard": dashboard_name},
+        label=f'Snapshot: {state}',
+        display_mode='widget'
+    )
+    
+    return status
+    
 def build_status_action(status, model_name):
     # When a successfully trained model is found, we display the dashboard
     # management buttons:
@@ -1,23 +1,15 @@
 import boto3
 import json
 import os
-import time
-import uuid
 
 from datetime import datetime
 
 from l4ecwcw import *
 
-l4e_client = boto3.client('lookoutequipment')
 cw_client = boto3.client('cloudwatch')
+provisioning_dashboard = None
 
-account_id = boto3.client('sts').get_caller_identity()['Account']
-session = boto3.session.Session()
-current_region = session.region_name
-stack = os.environ['Stack']
-if stack != '':
-    stack = '-' + stack
-
+@emit_api_metrics
 def create_scheduler_dashboard(event, context):
     """
     Entry point of the list scheduler custom widgets. This function build
@@ -29,9 +21,24 @@ def create_scheduler_dashboard(event, context):
     Returns:
         html (string): an HTML formatted string with the table to be displayed
     """
+    load_environment(context)
+    
+    # Asynchronous invocation processing the next
+    # stage of a snapshot canary provisioning:
+    if 'canary_provisioning' in event:
+        return process_canary_provisioning(event)
     
+    # The snapshot canary of a new dashboard is
+    # provisioned in the background:
+    global provisioning_dashboard
+    provisioning_dashboard = None
     if 'dashboard_name' in event:
         process_dashboard_actions(event)
+        provisioning_dashboard = event['dashboard_name']
+        
+    # The user is polling the status of a snapshot canary:
+    elif 'provisioning_dashboard' in event:
+        provisioning_dashboard = event['provisioning_dashboard']
        
     # If a scheduler action is requested, we perform it
     # before displaying the dashboard:
@@ -76,7 +83,7 @@ def process_dashboard_actions(event):
                 "x": 12, "y": 0, "height": 8, "width": 12,
                 "type": "custom",
                 "properties": {
-                    "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-scheduler-details{stack}",
+                    "endpoint": get_widget_endpoint("scheduler-details"),
                     "updateOn": {
                         "refresh": True,
                         "resize": True,
@@ -92,7 +99,7 @@ def process_dashboard_actions(event):
                 "x": 0, "y": 0, "height": 8, "width": 12,
                 "type": "custom",
                 "properties": {
-                    "endpoint": f"arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-scheduler-last-execution-details{stack}",
+                    "endpoint": get_widget_endpoint("scheduler-last-execution-details"),
                     "updateOn": {
                         "refresh": True,
                         "resize": True,
@@ -115,10 +122,12 @@ def process_dashboard_actions(event):
         create_synthetics(dashboard_name)
         
 def create_synthetics(dashboard_name):
-    client = boto3.client('synthetics')
-    
-
-    canary_name = 'scheduler-' + str(uuid.uuid4()).replace('-', '')[:11]
+    """
+    Requests the creation of a Synthetics canary taking snapshots of a given
+    dashboard. The canary is created and started asynchronously: this function
+    returns as soon as the first provisioning stage is scheduled.
+    """
+    canary_name = get_canary_name('scheduler-', dashboard_name)
     version = os.getenv('VERSION')
     syn_source_bucket = os.getenv('SYN_SOURCE_BUCKET')
     syn_source_prefix = 'cloudwatch-dashboard-source-code'
@@ -142,20 +151,20 @@ def create_synthetics(dashboard_name):
         # Runs this canary every Monday morning at 6am:
         schedule_expression = 'cron(0 6 ? * MON *)'
     
-    response = client.create_canary(
-        Name=canary_name,
-        Code={
+    provision_canary({
+        'Name': canary_name,
+        'Code': {
             'S3Bucket': syn_source_bucket,
             'S3Key': syn_source_code,
             'Handler': 'dashboard-snapshot.handler'
         },
-        ArtifactS3Location=artifacts_s3_path,
-        ExecutionRoleArn=syn_execution_role,
-        Schedule={ 
+        'ArtifactS3Location': artifacts_s3_path,
+        'ExecutionRoleArn': syn_execution_role,
+        'Schedule': { 
             'Expression': schedule_expression,
             'DurationInSeconds': 0
         },
-        RunConfig={
+        'RunConfig': {
             'TimeoutInSeconds': 180,
             'MemoryInMB': 1024,
             'ActiveTracing': False,
@@ -166,16 +175,38 @@ def create_synthetics(dashboard_name):
                 'DASHBOARD_TYPE': 'Scheduler'
             }
         },
-        SuccessRetentionPeriodInDays=31,
-        FailureRetentionPeriodInDays=31,
-        RuntimeVersion='syn-python-selenium-1.0'
-    )
+        'SuccessRetentionPeriodInDays': 31,
+        'FailureRetentionPeriodInDays': 31,
+        'RuntimeVersion': 'syn-python-selenium-1.0'
+    })
 
+def build_provisioning_status(dashboard_name):
+    """
+    Builds a button showing the provisioning status of the snapshot canary of
+    a given dashboard. Clicking on it polls this status again with a single
+    Synthetics API call (a canary created but never started is started).
+    Nothing is displayed once the canary is running.
+    """
+    state = resume_canary_provisioning(get_canary_name('scheduler-', dashboard_name))
+    if state == 'RUNNING':
+        return ''
+    elif state is None:
+        state = 'PROVISIONING'
+    
+    status = create_button(
+        action=get_widget_endpoint('list-schedulers'),
+        payload={'provisioning_dashboard': dashboard_name},
+        label=f'Snapshot: {state}',
+        display_mode='widget'
+    )
+    
+    return status
+    
 def generate_html_row(scheduler_param):
     # If the scheduler is stopped, we allow the user to start it:
     if scheduler_param['status'] == 'STOPPED':
         status_button = create_button(
-            action=f'arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-list-schedulers{stack}',
+            action=get_widget_endpoint('list-schedulers'),
             payload={
                 'scheduler_name': scheduler_param['name'],
                 'action': 'start_scheduler'
@@ -187,7 +218,7 @@ def generate_html_row(scheduler_param):
     # Otherwise, the only action is to stop it:
     else:
         status_button = create_button(
-            action=f'arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-list-schedulers{stack}',
+            action=get_widget_endpoint('list-schedulers'),
             payload={
                 'scheduler_name': scheduler_param['name'],
                 'action': 'stop_scheduler'
@@ -206,11 +237,13 @@ def generate_html_row(scheduler_param):
             href=f'#dashboards:name={current_dashboard_name}"',
             label='View'
         )
+        if current_dashboard_name == provisioning_dashboard:
+            dashboard_button += build_provisioning_status(current_dashboard_name)
         
     # Otherwise, we create a button to let the user create it:
     else:
         dashboard_button = create_button(
-            action=f'arn:aws:lambda:{current_region}:{account_id}:function:l4e-dashboard-list-schedulers{stack}',
+            action=get_widget_endpoint('list-schedulers'),
             payload={
                 'dashboard_name': current_dashboard_name,
                 'scheduler_name': scheduler_param['name'],
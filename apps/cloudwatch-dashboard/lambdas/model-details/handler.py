@@ -4,10 +4,9 @@ import sys
 import os
 
 from datetime import datetime
+from l4ecwcw import *
 
-# Making Lookout for Equipment client available to all methods in this Lambda:
-l4e_client = boto3.client('lookoutequipment')
-
+@emit_api_metrics
 def display_model_details(event, context):
     """
     Entry point of the lambda function
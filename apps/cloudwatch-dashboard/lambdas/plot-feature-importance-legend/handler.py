@@ -4,32 +4,36 @@ import matplotlib
 import matplotlib.pyplot as plt
 
 from l4ecwcw import *
-from io import StringIO
 
 # Mandatory to ensure text is rendered in SVG plots:
 matplotlib.rcParams['svg.fonttype'] = 'none'
-l4e_client = boto3.client('lookoutequipment')
 dpi = 100
 
+@emit_api_metrics
 def plot_feature_importance_legend(event, context):
     model_name     = event['model_name']
     widget_context = event['widgetContext']
     width          = widget_context['width']
     height         = widget_context['height']
     
-    svg = build_feature_importance_legend(model_name, width, height)
+    # The legend only depends on the model signals: this widget is
+    # pre-rendered when the model dashboard is created.
+    svg = get_widget_artifact(
+        'plot-feature-importance-legend', 
+        model_name, 
+        width, 
+        height,
+        lambda width, height: build_feature_importance_legend(model_name, width, height),
+        refresh='prerender' in event
+    )
 
     return svg
 
 def build_feature_importance_legend(model_name, width, height):
-    model_response = l4e_client.describe_model(ModelName=model_name)
-    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
-
-    diagnostics = predictions[0]['diagnostics']
-    tags_list = [d['name'].split('\\')[-1] for d in diagnostics]
-    colors = set_aws_stylesheet()
+    # Same palette as the feature importance widget:
+    palette = get_model_bundle(model_name)['palette']
+    set_aws_stylesheet()
     matplotlib.rcParams['figure.facecolor'] = 'FFFFFF'
-    palette = {s: colors[index % len(colors)] for index, s in enumerate(tags_list)}
 
     # Create legend handles manually:
     handles = [matplotlib.patches.Patch(color=palette[x], label=x) for x in palette.keys()]
@@ -39,8 +43,4 @@ def build_feature_importance_legend(model_name, width, height):
     plt.legend(handles=handles, loc='upper left')
     plt.gca().set_axis_off()
 
-    # Build the SVG from this figure:
-    svg_io = StringIO()
-    fig.savefig(svg_io, format="svg", bbox_inches='tight')
-    
-    return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
\ No newline at end of file
+    return render_figure(fig, 'plot-feature-importance-legend')
\ No newline at end of file
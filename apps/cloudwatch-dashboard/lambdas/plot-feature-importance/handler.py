@@ -2,18 +2,15 @@ import boto3
 import json
 import matplotlib
 import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
 
 from l4ecwcw import *
-from io import StringIO, BytesIO
 from matplotlib import gridspec
 
 # Mandatory to ensure text is rendered in SVG plots:
 matplotlib.rcParams['svg.fonttype'] = 'none'
-client = boto3.client('lookoutequipment')
 dpi = 100
 
+@emit_api_metrics
 def plot_feature_importance(event, context):
     model_name     = event['model_name']
     widget_context = event['widgetContext']
@@ -23,55 +20,50 @@ def plot_feature_importance(event, context):
     try:
         output_format  = widget_context['output_format']
     except Exception as e:
-        output_format = 'svg'
+        output_format = None
+        
+    # Optionally only plot the top K signals and aggregate the other ones:
+    top_k = event.get('top_k', None)
     
-    svg = build_feature_importance(model_name, width, height, output_format)
+    # The daily importance only depends on the model evaluation: this
+    # widget is pre-rendered when the model dashboard is created.
+    variant = None
+    if (top_k is not None) or (output_format is not None):
+        variant = f'top{top_k}-{output_format}'
+    svg = get_widget_artifact(
+        'plot-feature-importance', 
+        model_name, 
+        width, 
+        height,
+        lambda width, height: build_feature_importance(model_name, width, height, output_format, top_k),
+        variant=variant,
+        refresh='prerender' in event
+    )
     
     return svg
 
-def build_feature_importance(model_name, width, height, output_format):    
-    model_response = client.describe_model(ModelName=model_name)
-    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
-    start_date = pd.to_datetime(model_response['EvaluationDataStartTime']).tz_localize(None)
-    end_date = pd.to_datetime(model_response['EvaluationDataEndTime']).tz_localize(None)
-
-    df = pd.DataFrame(predictions)
-    expanded_results = expand_results(df)
-    predictions_df = convert_ranges(df, start_date, end_date)
-    
-    new_index = pd.date_range(
-        start=np.min(predictions_df.index),
-        end=np.max(predictions_df.index),
-        freq='1D'
-    )
-    expanded_results = expanded_results.resample('1D').mean()
-    expanded_results = expanded_results.reindex(index=new_index)
-    expanded_results = expanded_results.replace(to_replace=np.nan, value=0.0)
+def build_feature_importance(model_name, width, height, output_format, top_k=None):    
+    bundle = get_model_bundle(model_name)
+    df, start_date, end_date = get_bundle_ranges(bundle)
+    ranges = IntervalSet.from_dataframe(df)
+    expanded_results = get_bundle_importance(bundle)
     
     colors = set_aws_stylesheet()
     fig = plt.figure(figsize=(width*1.25/dpi, height/dpi), dpi=dpi)
     gs = gridspec.GridSpec(nrows=2, ncols=1, height_ratios=[10, 1], hspace=0.5)
     ax1 = fig.add_subplot(gs[0])
-    x = expanded_results.index
     
-    bottom_values = np.zeros((len(expanded_results.index),))
-    for tag in list(expanded_results.columns):
-        y = expanded_results.loc[:, tag]
-        plt.bar(x=x, height=y, bottom=bottom_values, alpha=0.8, width=1.0)
-        bottom_values += y.values
+    # Signals keep the color they have in the legend widget:
+    palette = bundle['palette']
+    expanded_results = collapse_signals(expanded_results, top_k)
+    signal_colors = [palette.get(tag, '#AAB7B8') for tag in expanded_results.columns]
+    plot_stacked_bands(expanded_results, signal_colors, ax1)
+    ax1.set_ylim(bottom=0.0)
         
     ax1.set_title('Feature importance evolution by signal - Daily average')
 
     ax2 = fig.add_subplot(gs[1])
-    plot_ranges(predictions_df, 'Detected events', colors[5], ax2)
+    plot_ranges(ranges, 'Detected events', colors[5], ax2, start_date, end_date)
     ax2.set_xlim(ax1.get_xlim())
     
-    if output_format == 'png':
-        png_io = BytesIO()
-        fig.savefig(png_io, format="png", bbox_inches='tight')
-        return png_io.getvalue()
-        
-    elif output_format == 'svg':
-        svg_io = StringIO()
-        fig.savefig(svg_io, format="svg", bbox_inches='tight')
-        return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
\ No newline at end of file
+    return render_figure(fig, 'plot-feature-importance', output_format)
\ No newline at end of file
@@ -6,36 +6,43 @@ import numpy as np
 import pandas as pd
 
 from l4ecwcw import *
-from io import StringIO
 import matplotlib.ticker as mtick
 
 # Mandatory to ensure text is rendered in SVG plots:
 matplotlib.rcParams['svg.fonttype'] = 'none'
-client = boto3.client('lookoutequipment')
 dpi = 100
 
+@emit_api_metrics
 def plot_ranked_signals(event, context):
     model_name     = event['model_name']
     widget_context = event['widgetContext']
     width          = widget_context['width']
     height         = widget_context['height']
     
-    svg = build_feature_importance(model_name, width, height)
+    # The ranked signals only depend on the model evaluation: this widget
+    # is pre-rendered when the model dashboard is created.
+    svg = get_widget_artifact(
+        'plot-ranked-signals', 
+        model_name, 
+        width, 
+        height,
+        lambda width, height: build_feature_importance(model_name, width, height),
+        refresh='prerender' in event
+    )
     
     return svg
 
 def build_feature_importance(model_name, width, height):    
-    model_response = client.describe_model(ModelName=model_name)
-    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
-    start_date = pd.to_datetime(model_response['EvaluationDataStartTime']).tz_localize(None)
-    end_date = pd.to_datetime(model_response['EvaluationDataEndTime']).tz_localize(None)
-
-    df = pd.DataFrame(predictions)
-    expanded_results = expand_results(df)
-    num_values = len(list(expanded_results.columns))
+    # Average importance of each signal over all the minutes of the events,
+    # ranked once for all the widgets of the model dashboard:
+    ranked_signals = get_model_bundle(model_name)['ranked_signals']
+    num_values = ranked_signals['num_signals']
     
     colors = set_aws_stylesheet()
-    rank_df = pd.DataFrame(np.mean(expanded_results), columns=['value']).sort_values(by='value', ascending=True).tail(15)
+    rank_df = pd.DataFrame(
+        {'value': ranked_signals['values'][::-1]}, 
+        index=ranked_signals['names'][::-1]
+    )
     values = list(rank_df['value'])
     threshold = 1 / num_values
     signal_color = {v: assign_color(v, threshold, colors) for v in values}
@@ -59,7 +66,4 @@ def build_feature_importance(model_name, width, height):
     ax.vlines(x=1/num_values, ymin=-0.5, ymax=np.max(y_pos) + 0.5, linewidth=4.0, alpha=0.3, color=colors[0])
     ax.set_title('Aggregated signal importance over the evaluation period')
     
-    svg_io = StringIO()
-    fig.savefig(svg_io, format="svg", bbox_inches='tight')
-    
-    return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
\ No newline at end of file
+    return render_figure(fig, 'plot-ranked-signals')
\ No newline at end of file
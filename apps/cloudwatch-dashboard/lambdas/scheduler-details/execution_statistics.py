@@ -0,0 +1,102 @@
+# Initialization
+from datetime import datetime, timezone
+from l4ecwcw import TERMINAL_STATUSES, iterate_inference_executions, load_state, save_state
+
+def get_execution_statistics(scheduler_name, client=None):
+    """
+    Gets the number of executions, the last execution time and the last
+    successful execution time of a scheduler. The statistics are persisted
+    with a watermark (the scheduled start time of the last execution folded
+    into them) and only the executions scheduled after this watermark are
+    queried: in steady state, this is a single page of results.
+    
+    Params:
+        scheduler_name (string): name of the scheduler to get the statistics for
+        client (boto3.Client): a Lookout for Equipment client (defaults to None)
+        
+    Returns:
+        dict: the number of executions (`count`), the last execution time
+        (`last_execution`) and the last successful execution time
+        (`last_success`). The times are None when no such execution exists
+    """
+    stats = load_statistics(scheduler_name)
+    
+    # Collects the executions scheduled after the watermark, newest first:
+    new_executions = []
+    for summary in iterate_inference_executions(scheduler_name, client):
+        start_time = summary['ScheduledStartTime'].timestamp()
+        if (stats['watermark'] is not None) and (start_time <= stats['watermark']):
+            break
+        new_executions.append(summary)
+        
+    # Folds the new executions into the persisted statistics, from the oldest
+    # one and until we find an execution that is not completed yet:
+    watermark = stats['watermark']
+    while (len(new_executions) > 0) and (new_executions[-1]['Status'] in TERMINAL_STATUSES):
+        summary = new_executions.pop()
+        start_time = summary['ScheduledStartTime'].timestamp()
+        stats['count'] += 1
+        stats['watermark'] = start_time
+        stats['last_execution'] = start_time
+        if summary['Status'] == 'SUCCESS':
+            stats['last_success'] = start_time
+            
+    if stats['watermark'] != watermark:
+        save_statistics(scheduler_name, stats)
+    
+    # The remaining executions are still in progress (or more recent than
+    # one that is): they are counted, but not persisted yet:
+    count = stats['count'] + len(new_executions)
+    last_execution = stats['last_execution']
+    last_success = stats['last_success']
+    if len(new_executions) > 0:
+        last_execution = new_executions[0]['ScheduledStartTime'].timestamp()
+    for summary in new_executions:
+        if summary['Status'] == 'SUCCESS':
+            last_success = summary['ScheduledStartTime'].timestamp()
+            break
+    
+    return {
+        'count': count,
+        'last_execution': to_datetime(last_execution),
+        'last_success': to_datetime(last_success)
+    }
+    
+def load_statistics(scheduler_name):
+    """
+    Loads the persisted statistics of a scheduler (see `load_state()` in
+    the l4ecwcw layer: they are shared by all the execution environments
+    when the STATE_S3_PATH environment variable is set)
+    
+    Params:
+        scheduler_name (string): name of the scheduler to load the statistics of
+    """
+    stats = load_state(get_statistics_name(scheduler_name))
+    if stats is not None:
+        return stats
+            
+    return {
+        'count': 0,
+        'watermark': None,
+        'last_execution': None,
+        'last_success': None
+    }
+    
+def save_statistics(scheduler_name, stats):
+    """
+    Persists the statistics of a scheduler
+    
+    Params:
+        scheduler_name (string): name of the scheduler to save the statistics of
+        stats (dict): the statistics to persist
+    """
+    save_state(get_statistics_name(scheduler_name), stats)
+        
+def get_statistics_name(scheduler_name):
+    return f'execution-statistics/{scheduler_name}'
+    
+def to_datetime(timestamp):
+    if timestamp is None:
+        return None
+        
+    return datetime.fromtimestamp(timestamp, timezone.utc)
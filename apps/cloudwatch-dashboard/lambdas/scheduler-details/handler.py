@@ -3,10 +3,10 @@ import json
 import sys
 
 from datetime import datetime, timedelta
+from execution_statistics import get_execution_statistics
+from l4ecwcw import *
 
-# Making Lookout for Equipment client available to all methods in this Lambda:
-l4e_client = boto3.client('lookoutequipment')
-
+@emit_api_metrics
 def get_scheduler_details(event, context):
     """
     Entry point of the lambda function
@@ -80,81 +80,17 @@ def build_scheduler_details(scheduler_name):
     return html
     
 def get_last_execution(scheduler_name, date_format):
-    list_executions = execution_summaries = list_inference_executions(
-        scheduler_name,
-        start_time=None,
-        end_time=None,
-        execution_status=None
-    )
-    
-    num_executions = len(list_executions)
-    last_execution_time = datetime.strftime(list_executions[0]['ScheduledStartTime'], date_format)
-    for inference_exec in list_executions:
-        if inference_exec['Status'] == 'SUCCESS':
-            last_success_time = datetime.strftime(inference_exec['ScheduledStartTime'], date_format)
-            break
-            
+    stats = get_execution_statistics(scheduler_name)
     
+    num_executions = stats['count']
+    last_execution_time = 'Never'
+    last_success_time = 'Never'
+    if stats['last_execution'] is not None:
+        last_execution_time = datetime.strftime(stats['last_execution'], date_format)
+    if stats['last_success'] is not None:
+        last_success_time = datetime.strftime(stats['last_success'], date_format)
     
     return num_executions, last_execution_time, last_success_time
-    
-def list_inference_executions(scheduler_name,
-                              execution_status=None, 
-                              start_time=None, 
-                              end_time=None, 
-                              max_results=50):
-    """
-    This method lists all the past inference execution triggered by a
-    given scheduler.
-    
-    PARAMS
-    ======
-        execution_status: string (default: None)
-            Only keep the executions with a given status
-            
-        start_time: pandas.DateTime (default: None)
-            Filters out the executions that happened before start_time
-            
-        end_time: pandas.DateTime (default: None)
-            Filters out the executions that happened after end_time
-            
-        
-        max_results: integer (default: 50)
-            Max number of results you want to get out of this method
-    
-    RETURNS
-    =======
-        results_df: list of dict
-            A list of all past inference executions, with each inference
-            attributes stored in a python dictionary
-    """
-    # Built the execution request object:
-    list_executions_request = {"MaxResults": max_results}
-    list_executions_request["InferenceSchedulerName"] = scheduler_name
-    if execution_status is not None:
-        list_executions_request["Status"] = execution_status
-    if start_time is not None:
-        list_executions_request['DataStartTimeAfter'] = start_time
-    if end_time is not None:
-        list_executions_request['DataEndTimeBefore'] = end_time
-
-    # Loops through all the inference executed by the current scheduler:
-    has_more_records = True
-    list_executions = []
-    while has_more_records:
-        list_executions_response = l4e_client.list_inference_executions(
-            **list_executions_request
-        )
-        if "NextToken" in list_executions_response:
-            list_executions_request["NextToken"] = list_executions_response["NextToken"]
-        else:
-            has_more_records = False
-
-        list_executions = list_executions + \
-                          list_executions_response["InferenceExecutionSummaries"]
-
-    # Returns all the summaries in a list:
-    return list_executions
 
 def get_next_time_range(timestamp_format, frequency):
     """
@@ -3,22 +3,19 @@ import json
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
-import os
 import pandas as pd
 import sys
 
 from l4ecwcw import *
-from io import StringIO
 import matplotlib.ticker as mtick
 
 # Mandatory to ensure text is rendered in SVG plots:
 matplotlib.rcParams['svg.fonttype'] = 'none'
 dpi = 100
 
-# Making Lookout for Equipment client available to all methods in this Lambda:
-l4e_client = boto3.client('lookoutequipment')
-s3 = boto3.resource('s3')
+s3_client = boto3.client('s3')
 
+@emit_api_metrics
 def get_execution_summary(event, context):
     """
     Entry point of the lambda function
@@ -36,57 +33,18 @@ def get_execution_summary(event, context):
     return svg
 
 def build_execution_summary(scheduler_name, width, height):
-    list_executions = execution_summaries = list_inference_executions(
-        scheduler_name,
-        start_time=None,
-        end_time=None,
-        execution_status=None
-    )
+    last_anomaly = get_last_anomaly(scheduler_name)
     
-    # Loops through the executions summaries:
-    results_json = []
-    for execution_summary in list_executions:
-        # We only request an output if the inference execution is a sucess:
-        status = execution_summary['Status']
-        if status == 'SUCCESS':
-            # Download the JSON-line file locally:
-            bucket = execution_summary['CustomerResultObject']['Bucket']
-            key = execution_summary['CustomerResultObject']['Key']
-            current_timestamp = key.split('/')[-2]
-            local_fname = os.path.join('/tmp', f'{scheduler_name}_{current_timestamp}.jsonl')
-
-            if not os.path.exists(local_fname):
-                content_object = s3.Object(bucket, key)
-                file_content = content_object.get()['Body'].read().decode('utf-8')
-                with open(local_fname, 'w') as f:
-                    f.write(file_content)
-
-            # Opens the file and concatenate the results into a dataframe:
-            with open(local_fname, 'r') as f:
-                content = [eval(line) for line in f.readlines()]
-                results_json = results_json + content
-
-    # Build the final dataframes with all the results:
-    results_df = pd.DataFrame(results_json)
-    results_df['timestamp'] = pd.to_datetime(results_df['timestamp'])
-    results_df = results_df.set_index('timestamp')
-    results_df = results_df.sort_index()
-    
-    expanded_results = expand_signal_diagnostics(results_df)
-    expanded_results = expanded_results[expanded_results['prediction'] == 1]
-    
-    if expanded_results.shape[0] > 0:
-        event_details = pd.DataFrame(expanded_results.iloc[-1, 1:]).reset_index()
-
-        event_details.columns = ['name', 'value']
-        event_details = event_details.sort_values(by='value', ascending=False)
-        event_details = event_details.iloc[:15, :].reset_index(drop=True)
-        event_details = event_details.sort_values(by='value', ascending=True)
+    if last_anomaly is not None:
+        ranker = SignalRanker()
+        ranker.add(last_anomaly['diagnostics'])
+        names, values = ranker.top(15)
         
-        title = f'Last event detected at {expanded_results.index[-1]}'
+        event_details = pd.DataFrame({'name': names[::-1], 'value': values[::-1]})
+        title = f'Last event detected at {pd.to_datetime(last_anomaly["timestamp"])}'
         html = plot_single_diagnostic(
             event_details, 
-            len(expanded_results.columns) - 1, 
+            ranker.num_signals, 
             title,
             width, 
             height
@@ -96,84 +54,81 @@ def build_execution_summary(scheduler_name, width, height):
         html = '<div>No anomaly detected by this scheduler yet</div>'
     
     return html
-
-def list_inference_executions(scheduler_name,
-                              execution_status=None, 
-                              start_time=None, 
-                              end_time=None, 
-                              max_results=50):
+    
+def get_last_anomaly(scheduler_name):
     """
-    This method lists all the past inference execution triggered by a
-    given scheduler.
+    Finds the last anomalous timestamp detected by a scheduler. The results
+    files of the successful executions are read from the newest one and 
+    until a file with an anomaly is found. The last anomaly and a watermark
+    (the scheduled start time of the last execution scanned) are kept in the
+    widget state: a refresh only reads the results of the new executions.
     
-    PARAMS
-    ======
-        execution_status: string (default: None)
-            Only keep the executions with a given status
-            
-        start_time: pandas.DateTime (default: None)
-            Filters out the executions that happened before start_time
+    Params:
+        scheduler_name (string): name of the scheduler
+        
+    Returns:
+        dict: the last anomalous timestamp (`timestamp`, `prediction` and
+        `diagnostics`), None if this scheduler did not detect any anomaly
+    """
+    state_name = f'last-anomaly/{scheduler_name}'
+    state = load_state(state_name, s3_client)
+    if state is None:
+        state = {'watermark': None, 'last_anomaly': None}
+        
+    # Executions are listed from the newest to the oldest:
+    new_executions = []
+    for summary in iterate_inference_executions(scheduler_name, l4e_client):
+        start_time = summary['ScheduledStartTime'].timestamp()
+        if (state['watermark'] is not None) and (start_time <= state['watermark']):
+            break
+        new_executions.append(summary)
+        
+    for summary in new_executions:
+        if summary['Status'] != 'SUCCESS':
+            continue
             
-        end_time: pandas.DateTime (default: None)
-            Filters out the executions that happened after end_time
+        anomaly = read_last_anomaly(
+            summary['CustomerResultObject']['Bucket'],
+            summary['CustomerResultObject']['Key']
+        )
+        if anomaly is not None:
+            # The older executions can't hold a more recent anomaly:
+            state['last_anomaly'] = anomaly
+            break
             
+    # The watermark stops before the oldest execution still in progress:
+    watermark = state['watermark']
+    while (len(new_executions) > 0) and (new_executions[-1]['Status'] in TERMINAL_STATUSES):
+        state['watermark'] = new_executions.pop()['ScheduledStartTime'].timestamp()
         
-        max_results: integer (default: 50)
-            Max number of results you want to get out of this method
+    if state['watermark'] != watermark:
+        save_state(state_name, state, s3_client)
+        
+    return state['last_anomaly']
     
-    RETURNS
-    =======
-        results_df: list of dict
-            A list of all past inference executions, with each inference
-            attributes stored in a python dictionary
+def read_last_anomaly(bucket, key):
     """
-    # Built the execution request object:
-    list_executions_request = {"MaxResults": max_results}
-    list_executions_request["InferenceSchedulerName"] = scheduler_name
-    if execution_status is not None:
-        list_executions_request["Status"] = execution_status
-    if start_time is not None:
-        list_executions_request['DataStartTimeAfter'] = start_time
-    if end_time is not None:
-        list_executions_request['DataEndTimeBefore'] = end_time
-
-    # Loops through all the inference executed by the current scheduler:
-    has_more_records = True
-    list_executions = []
-    while has_more_records:
-        list_executions_response = l4e_client.list_inference_executions(
-            **list_executions_request
-        )
-        if "NextToken" in list_executions_response:
-            list_executions_request["NextToken"] = list_executions_response["NextToken"]
-        else:
-            has_more_records = False
-
-        list_executions = list_executions + \
-                          list_executions_response["InferenceExecutionSummaries"]
-
-    # Returns all the summaries in a list:
-    return list_executions
-
-def expand_signal_diagnostics(results_df):
-    expanded_results = []
-    for index, row in results_df.iterrows():
-        new_row = dict()
-        new_row.update({'timestamp': index})
-        new_row.update({'prediction': row['prediction']})
-
-        if row['prediction'] == 1:
-            diagnostics = pd.DataFrame(row['diagnostics'])
-            diagnostics = dict(zip(diagnostics['name'], diagnostics['value']))
-            new_row = {**new_row, **diagnostics}
-
-        expanded_results.append(new_row)
-
-    expanded_results = pd.DataFrame(expanded_results)
-    expanded_results['timestamp'] = pd.to_datetime(expanded_results['timestamp'])
-    expanded_results = expanded_results.set_index('timestamp')
+    Streams an inference results file (JSON lines) and keeps the last
+    anomalous timestamp it contains, None if there is no anomaly
+    """
+    response = s3_client.get_object(Bucket=bucket, Key=key)
     
-    return expanded_results
+    last_anomaly = None
+    for line in response['Body'].iter_lines():
+        if len(line) == 0:
+            continue
+        result = json.loads(line)
+        if result['prediction'] != 1:
+            continue
+            
+        timestamp = pd.to_datetime(result['timestamp'])
+        if (last_anomaly is None) or (timestamp >= last_anomaly[0]):
+            last_anomaly = (timestamp, result)
+            
+    if last_anomaly is None:
+        return None
+        
+    return last_anomaly[1]
 
 def plot_single_diagnostic(event_details, num_signals, title, width, height):
     # We can then plot a horizontal bar chart:
@@ -203,7 +158,4 @@ def plot_single_diagnostic(event_details, num_signals, title, width, height):
     ax.vlines(x=threshold, ymin=-0.5, ymax=np.max(y_pos) + 0.5, linewidth=4.0, alpha=0.3, color=colors[0])
     plt.title(title)
 
-    svg_io = StringIO()
-    fig.savefig(svg_io, format="svg", bbox_inches='tight')
-    
-    return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
\ No newline at end of file
+    return render_figure(fig, 'scheduler-last-execution-details')
\ No newline at end of file
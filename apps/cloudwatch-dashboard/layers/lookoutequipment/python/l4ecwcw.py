@@ -1,11 +1,364 @@
+# Matplotlib and pandas are only imported by the functions that need them:
+# this layer can then be used by the functions that do not plot anything,
+# without the matching layers and their import time.
 import boto3
+import botocore.exceptions
+import functools
+import hashlib
 import json
-import matplotlib.pyplot as plt
-import pandas as pd
+import os
+import random
+import re
+import threading
+import time
 
-l4e_client = boto3.client('lookoutequipment')
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import Future
+
+# Error codes returned by the AWS services when a client is throttled:
+THROTTLING_ERROR_CODES = [
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestLimitExceeded'
+]
+
+# Error codes of transient service failures, retried as the throttled calls
+# (as well as the 5xx responses and the connection errors and timeouts):
+TRANSIENT_ERROR_CODES = [
+    'InternalServerException',
+    'InternalFailure',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'RequestTimeout',
+    'RequestTimeoutException'
+]
+CONNECTION_ERRORS = (
+    botocore.exceptions.ConnectionError,
+    botocore.exceptions.HTTPClientError
+)
+
+# Counters published for each API by ThrottledClient.emit_metrics():
+API_COUNTERS = ['calls', 'throttles', 'errors', 'retries', 'coalesced']
+
+# Only the calls of these read-only APIs are coalesced:
+COALESCED_API_PREFIXES = ('describe_', 'list_', 'get_')
+
+# Client-side rate limits (calls per second) for the Lookout for Equipment
+# APIs used by the widgets. Other APIs use the default rate:
+DEFAULT_API_RATE = 10
+API_RATES = {
+    'describe_model': 10,
+    'describe_dataset': 10,
+    'describe_inference_scheduler': 10,
+    'list_inference_executions': 10,
+    'list_inference_schedulers': 5,
+    'list_models': 5
+}
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: each call consumes a token and tokens are
+    refilled at a constant rate, up to a maximum burst capacity.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        
+    def acquire(self):
+        """
+        Takes a token from the bucket, waiting for it to be refilled if needed
+        
+        Returns:
+            float: the number of seconds spent waiting for a token
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, 
+                self.tokens + (now - self.last_refill) * self.rate
+            )
+            self.last_refill = now
+            self.tokens -= 1
+            delay = max(0.0, -self.tokens / self.rate)
+            
+        if delay > 0:
+            time.sleep(delay)
+            
+        return delay
+
+class ThrottledClient:
+    """
+    Wraps a boto3 client to protect the API we call from bursts of requests
+    coming from the widgets of several dashboards:
+    
+    * Each API gets its own client-side token bucket
+    * Throttled calls and transient failures (5xx responses, connection
+      errors and timeouts) are retried with a jittered exponential backoff
+    * Identical read-only calls (`describe_*`, `list_*`, `get_*`) issued
+      concurrently are coalesced: only the first one reaches the service
+      and the others share its response (which must therefore not be 
+      modified by the callers)
+    * Throttles, errors, retries and latencies are counted for each API and
+      are published as CloudWatch metrics with `emit_metrics()`
+      
+    API methods are called as with the wrapped client, e.g. 
+    `client.describe_model(ModelName=model_name)`.
+    """
+    def __init__(self, 
+                 client, 
+                 api_rates=API_RATES, 
+                 default_rate=DEFAULT_API_RATE,
+                 max_retries=5, 
+                 base_delay=0.2, 
+                 max_delay=10.0):
+        self.client = client
+        self.api_rates = api_rates
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buckets = dict()
+        self.in_flight = dict()
+        self.counters = dict()
+        self.lock = threading.RLock()
+        
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if not callable(method) or name in ['get_paginator', 'can_paginate', 'get_waiter', 'close']:
+            return method
+            
+        def api_call(**kwargs):
+            return self.call(name, **kwargs)
+            
+        return api_call
+        
+    def call(self, api, **kwargs):
+        """
+        Calls an API of the wrapped client, coalescing a read-only call with
+        an identical one already in flight if any
+        """
+        if not api.startswith(COALESCED_API_PREFIXES):
+            return self.call_with_retries(api, kwargs)
+            
+        key = (api, json.dumps(kwargs, sort_keys=True, default=str))
+        with self.lock:
+            future = self.in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.in_flight[key] = future
+            else:
+                self.get_counters(api)['coalesced'] += 1
+                
+        if not is_owner:
+            return future.result()
+            
+        try:
+            future.set_result(self.call_with_retries(api, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+                
+        return future.result()
+        
+    def call_with_retries(self, api, kwargs):
+        """
+        Calls an API of the wrapped client once a token is available, and
+        retries it with a jittered exponential backoff when throttled or
+        when it failed with a transient error
+        """
+        method = getattr(self.client, api)
+        bucket = self.get_bucket(api)
+        counters = self.get_counters(api)
+        
+        attempt = 0
+        while True:
+            bucket.acquire()
+            start = time.monotonic()
+            try:
+                return method(**kwargs)
+                
+            except ClientError as e:
+                error = e
+                if e.response['Error']['Code'] in THROTTLING_ERROR_CODES:
+                    counter = 'throttles'
+                elif (e.response['Error']['Code'] in TRANSIENT_ERROR_CODES) or \
+                     (e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500):
+                    counter = 'errors'
+                else:
+                    raise
+                    
+            except CONNECTION_ERRORS as e:
+                error = e
+                counter = 'errors'
+                
+            finally:
+                # Only the service call is measured, not the backoff:
+                with self.lock:
+                    counters['calls'] += 1
+                    counters['latency'] += time.monotonic() - start
+                    
+            with self.lock:
+                counters[counter] += 1
+            if attempt >= self.max_retries:
+                raise error
+                
+            # Full jitter: wait for a random time below the backoff delay
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+            with self.lock:
+                counters['retries'] += 1
+                
+    def get_bucket(self, api):
+        with self.lock:
+            if api not in self.buckets:
+                rate = self.api_rates.get(api, self.default_rate)
+                self.buckets[api] = TokenBucket(rate)
+                
+            return self.buckets[api]
+            
+    def get_counters(self, api):
+        """
+        Returns the counters of an API: number of calls sent to the service,
+        throttles, transient errors, retries, coalesced calls and cumulated
+        latency (seconds)
+        """
+        with self.lock:
+            if api not in self.counters:
+                self.counters[api] = dict.fromkeys(API_COUNTERS, 0)
+                self.counters[api]['latency'] = 0.0
+                
+            return self.counters[api]
+        
+    def emit_metrics(self, namespace='LookoutEquipment/Dashboards'):
+        """
+        Publishes the counters collected since the last call as CloudWatch
+        metrics (one set of metrics per API) and resets them. The metrics
+        are written in the logs of the function with the CloudWatch embedded
+        metric format: publishing them does not call any API.
+        
+        Parameters:
+            namespace (string):
+                The CloudWatch namespace to publish the metrics to
+        """
+        with self.lock:
+            counters = self.counters
+            self.counters = dict()
+            
+        timestamp = int(time.time() * 1000)
+        for api, api_counters in counters.items():
+            metrics = [{'Name': name.capitalize(), 'Unit': 'Count'} for name in API_COUNTERS]
+            record = {name.capitalize(): api_counters[name] for name in API_COUNTERS}
+            if api_counters['calls'] > 0:
+                metrics.append({'Name': 'Latency', 'Unit': 'Milliseconds'})
+                record['Latency'] = api_counters['latency'] / api_counters['calls'] * 1000
+                
+            record['API'] = api
+            record['_aws'] = {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [['API']],
+                    'Metrics': metrics
+                }]
+            }
+            print(json.dumps(record))
+
+# Retries of throttled calls and transient errors are handled by the 
+# ThrottledClient wrapper:
+l4e_client = ThrottledClient(boto3.client(
+    'lookoutequipment', 
+    config=Config(retries={'mode': 'standard', 'total_max_attempts': 1})
+))
 cw_client = boto3.client('cloudwatch')
 
+def emit_api_metrics(entry_point):
+    """
+    Decorates the entry point of a Lambda function to publish the metrics of
+    the Lookout for Equipment calls of each invocation (see 
+    `ThrottledClient.emit_metrics()`)
+    """
+    @functools.wraps(entry_point)
+    def wrapper(event, context):
+        try:
+            return entry_point(event, context)
+        finally:
+            l4e_client.emit_metrics()
+            
+    return wrapper
+
+# Execution environment of the current Lambda function, derived once from
+# the invocation context (see load_environment()). No AWS API is called to
+# build it, which keeps the cold starts free of any extra round-trip:
+environment = dict()
+
+def load_environment(context):
+    """
+    Derives the partition, region, account ID and stack suffix of the current
+    Lambda function from its invocation context and environment variables.
+    The result is memoized for the lifetime of the execution environment.
+    
+    Parameters:
+        context (LambdaContext):
+            The context object passed to the Lambda function entry point
+            
+    Returns:
+        dict: the `partition`, `region`, `account_id` and `stack_suffix` 
+        (either an empty string or the stack name prefixed by a dash)
+    """
+    if len(environment) == 0:
+        # arn:<partition>:lambda:<region>:<account>:function:<name>[:<alias>]
+        arn = context.invoked_function_arn.split(':')
+        stack = os.getenv('Stack', '')
+        
+        environment.update({
+            'partition': arn[1],
+            'region': arn[3],
+            'account_id': arn[4],
+            'stack_suffix': '-' + stack if stack != '' else ''
+        })
+        
+    return environment
+    
+def get_lambda_arn(function_name):
+    """
+    Builds the ARN of a Lambda function deployed in the same account and
+    region as the current one. load_environment() must have been called first.
+    
+    Parameters:
+        function_name (string):
+            The name of the Lambda function
+            
+    Returns:
+        string: the ARN of this Lambda function
+    """
+    return (
+        f'arn:{environment["partition"]}:lambda:{environment["region"]}:'
+        f'{environment["account_id"]}:function:{function_name}'
+    )
+    
+def get_widget_endpoint(widget_name):
+    """
+    Builds the ARN of the Lambda function behind one of the custom widgets 
+    deployed by the current stack
+    
+    Parameters:
+        widget_name (string):
+            The name of the widget (e.g. `model-details`)
+            
+    Returns:
+        string: the ARN to use as the endpoint of this custom widget
+    """
+    return get_lambda_arn(f'l4e-dashboard-{widget_name}{environment["stack_suffix"]}')
+
 def create_button(action, 
                   payload, 
                   label, 
@@ -179,8 +532,12 @@ def set_aws_stylesheet():
     Returns:
         colors (List): a list of all colors defined in this template
     """
-    # Load AWS light background style sheet:
-    plt.style.use('/opt/python/aws_color_branding_light.mpl')
+    import matplotlib.pyplot as plt
+    
+    # Load AWS light background style sheet (shipped next to this module,
+    # in /opt/python once deployed as a layer):
+    stylesheet = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aws_color_branding_light.mpl')
+    plt.style.use(stylesheet)
 
     # Get colors from custom AWS palette:
     prop_cycle = plt.rcParams['axes.prop_cycle']
@@ -188,6 +545,125 @@ def set_aws_stylesheet():
     
     return colors
 
+# Output format negotiation: figures with few primitives are sent as SVG,
+# denser artists are rasterized inside the SVG and a PNG image is sent
+# instead when the primitives left as vectors would still make the SVG too
+# large. The format is chosen before rendering: each figure is saved once.
+SVG_MAX_PRIMITIVES = 5000
+DENSE_ARTIST_PRIMITIVES = 500
+
+def count_primitives(artist):
+    """
+    Estimates the number of primitives an artist will output when saved as 
+    a vector image (points of a line, vertices of a collection...)
+    
+    Parameters:
+        artist (matplotlib.artist.Artist):
+            The artist to estimate the size of
+            
+    Returns:
+        integer: the estimated number of primitives
+    """
+    from matplotlib.collections import Collection
+    from matplotlib.lines import Line2D
+    
+    if isinstance(artist, Line2D):
+        return len(artist.get_xdata())
+        
+    elif isinstance(artist, Collection):
+        return sum([len(path.vertices) for path in artist.get_paths()])
+        
+    return 1
+    
+def render_figure(fig, widget_name, output_format=None):
+    """
+    Renders a figure for a custom widget, choosing the output format from the
+    number of primitives in the figure, and closes it. The payload size and 
+    render time are logged for each widget.
+    
+    Parameters:
+        fig (matplotlib.pyplot.Figure):
+            The figure to render
+        widget_name (string):
+            The name of the widget (used for logging purposes)
+        output_format (string):
+            Either `svg` or `png` to force a format (raw PNG bytes are then
+            returned for `png`). Defaults to None (automatic selection)
+            
+    Returns:
+        string: an SVG string or an HTML image with an inline PNG image
+    """
+    import matplotlib.pyplot as plt
+    
+    start = time.monotonic()
+    
+    if output_format == 'png':
+        payload = save_figure(fig, 'png')
+        
+    elif output_format == 'svg':
+        payload = save_figure(fig, 'svg')
+        
+    else:
+        artists = [a for ax in fig.axes for a in ax.get_children()]
+        primitives = [count_primitives(a) for a in artists]
+        vector_primitives = sum([p for p in primitives if p <= DENSE_ARTIST_PRIMITIVES])
+        
+        if sum(primitives) <= SVG_MAX_PRIMITIVES:
+            output_format = 'svg'
+            payload = save_figure(fig, 'svg')
+            
+        # Dense artists are embedded as images in the SVG, the text and axes
+        # are kept as vector graphics, unless they are too many themselves:
+        elif vector_primitives <= SVG_MAX_PRIMITIVES:
+            for artist, num_primitives in zip(artists, primitives):
+                if num_primitives > DENSE_ARTIST_PRIMITIVES:
+                    artist.set_rasterized(True)
+            output_format = 'svg (rasterized)'
+            payload = save_figure(fig, 'svg')
+            
+        else:
+            output_format = 'png (inline)'
+            payload = save_figure(fig, 'png', inline=True)
+            
+    plt.close(fig)
+    
+    duration = time.monotonic() - start
+    print(f'{widget_name}: {output_format} rendered in {duration:.2f}s, {len(payload)} bytes')
+    
+    return payload
+    
+def save_figure(fig, output_format, inline=False):
+    """
+    Saves a figure in a string
+    
+    Parameters:
+        fig (matplotlib.pyplot.Figure):
+            The figure to save
+        output_format (string):
+            Either `svg` or `png`
+        inline (boolean):
+            Set to True to return a PNG image as an HTML image with inline
+            base64 encoded content instead of raw bytes. Defaults to False
+            
+    Returns:
+        string or bytes: the image content
+    """
+    import base64
+    from io import BytesIO, StringIO
+    
+    if output_format == 'svg':
+        svg_io = StringIO()
+        fig.savefig(svg_io, format='svg', bbox_inches='tight')
+        return svg_io.getvalue().replace('DejaVu Sans', 'Amazon Ember')
+        
+    png_io = BytesIO()
+    fig.savefig(png_io, format='png', bbox_inches='tight')
+    if not inline:
+        return png_io.getvalue()
+        
+    content = base64.b64encode(png_io.getvalue()).decode('utf-8')
+    return f'<img src="data:image/png;base64,{content}" style="max-width: 100%" />'
+
 def assign_color(value, threshold, colors):
     """
     Given a threshold, match the passed value with a color from the AWS color
@@ -253,13 +729,230 @@ def get_matching_s3_keys(bucket, prefix='', suffix=''):
         except KeyError:
             break
         
+class IntervalSet:
+    """
+    A set of time ranges (labelled anomalies, predicted events...) stored as
+    sorted arrays of starts and ends. Overlapping and adjacent ranges are
+    merged when the set is built: the ranges are disjoint, point and range
+    queries are binary searches and the set operations are array operations
+    over the bounds. Ranges are closed (they include their start and end).
+    This is the same structure as `utils/intervals.py` for the notebooks.
+    
+    Parameters:
+        starts, ends (array-like):
+            The start and end of each range, in any order
+        tolerance (string):
+            Ranges separated by at most this duration are merged (e.g. 
+            `1min`). Defaults to None
+    """
+    def __init__(self, starts=(), ends=(), tolerance=None):
+        import numpy as np
+        import pandas as pd
+        
+        starts = to_datetime64(starts)
+        ends = to_datetime64(ends)
+        valid = starts <= ends
+        starts = starts[valid]
+        ends = ends[valid]
+        
+        if len(starts) > 0:
+            order = np.argsort(starts, kind='stable')
+            starts = starts[order]
+            ends = ends[order]
+            
+            # A new range begins when its start is after all the previous ends:
+            running_end = np.maximum.accumulate(ends)
+            gap = starts[1:] - running_end[:-1]
+            max_gap = pd.Timedelta(tolerance or 0).value
+            new_range = np.append(True, gap > np.timedelta64(max_gap, 'ns'))
+            first = np.flatnonzero(new_range)
+            last = np.append(first[1:], len(starts)) - 1
+            starts = starts[first]
+            ends = running_end[last]
+            
+        self.starts = starts
+        self.ends = ends
+        
+    @classmethod
+    def from_sorted(cls, starts, ends):
+        interval_set = cls.__new__(cls)
+        interval_set.starts = starts
+        interval_set.ends = ends
+        
+        return interval_set
+        
+    @classmethod
+    def from_dataframe(cls, ranges_df, tolerance=None):
+        """
+        Builds a set from a dataframe with the start and end of a range in
+        its first two columns (e.g. the predicted ranges of a model bundle)
+        """
+        return cls(ranges_df.iloc[:, 0], ranges_df.iloc[:, 1], tolerance)
+        
+    def __len__(self):
+        return len(self.starts)
+        
+    @property
+    def durations(self):
+        import pandas as pd
+        
+        return pd.to_timedelta(self.ends - self.starts)
+        
+    def contains(self, timestamps):
+        """
+        Checks which timestamps fall within a range, with one binary search
+        per timestamp
+        """
+        import numpy as np
+        
+        timestamps = to_datetime64(np.atleast_1d(timestamps))
+        if len(self.starts) == 0:
+            return np.zeros(len(timestamps), dtype=bool)
+            
+        position = np.searchsorted(self.starts, timestamps, side='right') - 1
+        
+        return (position >= 0) & (timestamps <= self.ends[np.maximum(position, 0)])
+        
+    def find_overlaps(self, start, end):
+        """
+        Locates the ranges overlapping query ranges with two binary searches
+        
+        Returns:
+            tuple: the ranges self.starts[first:last] overlap each query range
+        """
+        import numpy as np
+        
+        first = np.searchsorted(self.ends, to_datetime64(np.atleast_1d(start)), side='left')
+        last = np.searchsorted(self.starts, to_datetime64(np.atleast_1d(end)), side='right')
+        
+        return first, np.maximum(first, last)
+        
+    def overlaps(self, start, end):
+        first, last = self.find_overlaps(start, end)
+        
+        return last > first
+        
+    def clip(self, start=None, end=None):
+        """
+        Returns the part of the set within a time window
+        """
+        import numpy as np
+        
+        first, last = 0, len(self)
+        if start is not None:
+            start = to_datetime64([start])[0]
+            first = np.searchsorted(self.ends, start, side='left')
+        if end is not None:
+            end = to_datetime64([end])[0]
+            last = np.searchsorted(self.starts, end, side='right')
+        last = max(first, last)
+        
+        starts = self.starts[first:last].copy()
+        ends = self.ends[first:last].copy()
+        if len(starts) > 0 and start is not None:
+            starts[0] = max(starts[0], start)
+        if len(ends) > 0 and end is not None:
+            ends[-1] = min(ends[-1], end)
+            
+        return IntervalSet.from_sorted(starts, ends)
+        
+    def union(self, other):
+        import numpy as np
+        
+        return IntervalSet(
+            np.concatenate([self.starts, other.starts]),
+            np.concatenate([self.ends, other.ends])
+        )
+        
+    def intersection(self, other):
+        """
+        Returns the ranges covered by both sets: each range is matched with
+        the ranges of the other set it overlaps, all the pairs at once
+        """
+        import numpy as np
+        
+        first, last = other.find_overlaps(self.starts, self.ends)
+        counts = last - first
+        rows = np.repeat(np.arange(len(self)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        other_rows = np.repeat(first, counts) + offsets
+        
+        return IntervalSet.from_sorted(
+            np.maximum(self.starts[rows], other.starts[other_rows]),
+            np.minimum(self.ends[rows], other.ends[other_rows])
+        )
+        
+    def difference(self, other):
+        """
+        Removes the ranges of another set, ranges reduced to a single 
+        timestamp are dropped
+        """
+        import numpy as np
+        
+        if len(self) == 0 or len(other) == 0:
+            return self
+            
+        # The gaps of the other set over the extent of both sets:
+        low = min(self.starts[0], other.starts[0])
+        high = max(self.ends[-1], other.ends[-1])
+        gap_starts = np.concatenate([[low], other.ends])
+        gap_ends = np.concatenate([other.starts, [high]])
+        keep = gap_starts < gap_ends
+        gaps = IntervalSet.from_sorted(gap_starts[keep], gap_ends[keep])
+        
+        remaining = self.intersection(gaps)
+        keep = remaining.starts < remaining.ends
+        
+        return IntervalSet.from_sorted(remaining.starts[keep], remaining.ends[keep])
+        
+    def rasterize(self, index):
+        """
+        Returns 1.0 for the timestamps of an index falling within a range and
+        0.0 otherwise
+        """
+        import numpy as np
+        
+        return self.contains(np.asarray(index, dtype='datetime64[ns]')).astype(np.float64)
+        
+    def plot(self, ax, start, end, color):
+        """
+        Plots the set as a step signal going from 0 to 1 during each range:
+        only the range bounds are drawn, whatever the plotted period
+        """
+        import numpy as np
+        
+        clipped = self.clip(start, end)
+        x = np.empty(2 * len(clipped) + 2, dtype='datetime64[ns]')
+        x[0] = to_datetime64([start])[0]
+        x[1:-1:2] = clipped.starts
+        x[2:-1:2] = clipped.ends
+        x[-1] = to_datetime64([end])[0]
+        
+        y = np.zeros(len(x))
+        y[1:-1:2] = 1.0
+        
+        ax.plot(x, y, drawstyle='steps-post', color=color)
+        
+def to_datetime64(values):
+    """
+    Converts timestamps into an array of naive UTC numpy.datetime64
+    """
+    import numpy as np
+    import pandas as pd
+    
+    timestamps = pd.to_datetime(pd.Index(values))
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert(None)
+        
+    return np.asarray(timestamps, dtype='datetime64[ns]')
+    
 def convert_ranges(ranges_df, start_date, end_date, default_freq='1min'):
     """
     This method expands a list of ranges into an datetime index 
     pandas.Series
 
     Parameters:
-        ranges_df (pandas.DataFrame):
+        ranges_df (pandas.DataFrame or IntervalSet):
             A dataframe with two columns, the start and end timestamp of
             each event
         default_freq (string):
@@ -272,47 +965,379 @@ def convert_ranges(ranges_df, start_date, end_date, default_freq='1min'):
         This will be a single Series named "Label" where a value of 1.0
         will correspond to the presence of an event (labels or anomalies).
     """
+    import pandas as pd
+    
     range_index = pd.date_range(
         start=start_date,
         end=end_date, 
         freq=default_freq
     )
-    range_data = pd.DataFrame(index=range_index)
-    range_data.loc[:, 'Label'] = 0.0
-
-    for _, row in ranges_df.iterrows():
-        event_start = row[0]
-        event_end = row[1]
-        range_data.loc[event_start:event_end, 'Label'] = 1.0
+    
+    # Each timestamp is looked up in the merged ranges:
+    ranges = ranges_df
+    if not isinstance(ranges, IntervalSet):
+        ranges = IntervalSet.from_dataframe(ranges_df)
+    range_data = pd.DataFrame({'Label': ranges.rasterize(range_index)}, index=range_index)
 
     return range_data
     
-def plot_ranges(range_df, range_title, color, ax):
+def plot_ranges(range_df, range_title, color, ax, start_date=None, end_date=None):
     """
     Plot a range with either labelled or predicted events as a filled
     area positionned under the timeseries data.
 
     Parameters:
-        range_df (pandas.DataFrame):
+        range_df (pandas.DataFrame or IntervalSet):
             A DataFrame that must contain at least a DateTimeIndex and a
-            column called "Label"
+            column called "Label", or the ranges themselves
         range_title (string):
             Title of the ax containing this range
         color (string):
             A string used as a color for the filled area of the plot
         ax (matplotlib.pyplot.Axis):
             The ax in which to render the range plot
+        start_date, end_date (pandas.Timestamp):
+            The plotted period, required when the ranges are given as an
+            IntervalSet
     """
-    ax.plot(range_df['Label'], color=color)
+    if isinstance(range_df, IntervalSet):
+        range_df.plot(ax, start_date, end_date, color)
+    else:
+        ax.plot(range_df['Label'], color=color)
+        
     ax.axes.get_xaxis().set_ticks([])
     ax.axes.get_yaxis().set_ticks([])
     ax.set_xlabel(range_title, fontsize=12)
+
+def get_rolling_statistics(series, window='1D'):
+    """
+    Computes the rolling mean and min / max envelope of a time series over a
+    time-based window (the timestamps in (t - window, t]), whatever its
+    sampling rate. The mean is derived from cumulative sums; this is the
+    same computation as `utils/rolling_statistics.py` for the notebooks.
+
+    Parameters:
+        series (pandas.Series):
+            A time series with a sorted DateTimeIndex
+        window (string):
+            The length of the window. Defaults to 1 day
+
+    Returns:
+        pandas.DataFrame: the `mean`, `min` and `max` of the series
+    """
+    import numpy as np
+    import pandas as pd
+
+    timestamps = np.asarray(series.index, dtype='datetime64[ns]')
+    first = np.searchsorted(
+        timestamps,
+        timestamps - np.timedelta64(pd.Timedelta(window)),
+        side='right'
+    )
+    last = np.arange(1, len(timestamps) + 1)
+
+    # Values are centered to limit the cancellation errors of the sums:
+    values = series.to_numpy(dtype=np.float64)
+    valid = np.isfinite(values)
+    center = values[valid].mean() if valid.any() else 0.0
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values - center, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    counts = counts[last] - counts[first]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = center + (sums[last] - sums[first]) / counts
+
+    rolling = series.astype(np.float64).rolling(pd.Timedelta(window))
+
+    return pd.DataFrame({
+        'mean': np.where(counts > 0, mean, np.nan),
+        'min': rolling.min(),
+        'max': rolling.max()
+    }, index=series.index)
+
+def collapse_signals(importance_df, top_k=None, other_label='Other'):
+    """
+    Keeps the top K signals with the highest cumulated importance and sums up
+    all the others in a single column
+    
+    Parameters:
+        importance_df (pandas.DataFrame):
+            A dataframe with one column per signal
+        top_k (integer):
+            Number of signals to keep. Defaults to None (keep all the signals)
+        other_label (string):
+            Name of the column collecting the other signals. Defaults to `Other`
+            
+    Returns:
+        pandas.DataFrame: a dataframe with the top K signals (in their original
+        order) followed by the column collecting the other ones
+    """
+    import numpy as np
+    
+    num_signals = importance_df.shape[1]
+    if (top_k is None) or (top_k >= num_signals):
+        return importance_df
+        
+    values = importance_df.to_numpy(dtype=float)
+    totals = values.sum(axis=0)
+    keep = np.sort(np.argpartition(totals, -top_k)[-top_k:])
+    
+    collapsed_df = importance_df.iloc[:, keep].copy()
+    collapsed_df[other_label] = np.delete(values, keep, axis=1).sum(axis=1)
+    
+    return collapsed_df
+    
+def plot_stacked_bands(importance_df, colors, ax, alpha=0.8):
+    """
+    Plots the evolution of the importance of each signal as stacked bars.
+    The cumulated values are computed at once and each signal is drawn as a
+    single step-shaped band instead of one rectangle per bar: the number of
+    artists only depends on the number of signals.
+    
+    Parameters:
+        importance_df (pandas.DataFrame):
+            A dataframe with a regular DateTimeIndex and one column per signal
+        colors (list of strings):
+            The colors of each signal, in the order of the columns
+        ax (matplotlib.pyplot.Axis):
+            The ax in which to render the bands
+        alpha (float):
+            Transparency of the bands. Defaults to 0.8
+    """
+    import numpy as np
+    import pandas as pd
+    
+    values = importance_df.to_numpy(dtype=float)
+    upper = np.cumsum(values, axis=1)
+    lower = upper - values
     
+    # Each bar is centered on its timestamp and spans a whole period: the
+    # last value is repeated to close the last step.
+    x = importance_df.index
+    half_period = (x[1] - x[0]) / 2 if len(x) > 1 else pd.Timedelta('12h')
+    edges = (x - half_period).append(pd.DatetimeIndex([x[-1] + half_period]))
+    lower = np.vstack([lower, lower[-1:]])
+    upper = np.vstack([upper, upper[-1:]])
+    
+    for index in range(values.shape[1]):
+        ax.fill_between(
+            edges, 
+            lower[:, index], 
+            upper[:, index], 
+            step='post', 
+            color=colors[index], 
+            alpha=alpha, 
+            linewidth=0
+        )
+        
+class SignalRanker:
+    """
+    Streaming aggregation of the signal importance: diagnostics are folded
+    one at a time into running weighted sums, so the memory used only 
+    depends on the number of signals. Diagnostics can come from the predicted
+    ranges of a model evaluation (weighted by their duration) or from the 
+    results of an inference scheduler (one diagnostic per timestamp).
+    
+    Diagnostics are lists of dictionaries with a `name` and a `value` key, as
+    in the results of Lookout for Equipment.
+    """
+    def __init__(self):
+        import numpy as np
+        
+        self.positions = dict()
+        self.names = []
+        self.sums = np.zeros(0)
+        self.total_weight = 0.0
+        self.last_names = None
+        self.last_positions = None
+        
+    def add(self, diagnostics, weight=1.0):
+        """
+        Folds the diagnostics of one event or timestamp into the running sums
+        
+        Parameters:
+            diagnostics (list of dict):
+                The name and value of each signal
+            weight (float):
+                The weight of these diagnostics. Defaults to 1.0
+        """
+        import numpy as np
+        
+        names = [d['name'] for d in diagnostics]
+        values = np.fromiter(
+            (d['value'] for d in diagnostics), 
+            dtype=float, 
+            count=len(diagnostics)
+        )
+        
+        # Signals are usually listed in the same order for every event:
+        if names != self.last_names:
+            self.last_names = names
+            self.last_positions = self.get_positions(names)
+            
+        self.sums[self.last_positions] += weight * values
+        self.total_weight += weight
+        
+    def add_ranges(self, predicted_ranges, freq='1min'):
+        """
+        Folds the diagnostics of predicted ranges, each range being weighted
+        by the number of timestamps it spans at a given frequency
+        
+        Parameters:
+            predicted_ranges (list of dict):
+                The predicted ranges with their `start`, `end` and `diagnostics`
+            freq (string):
+                The frequency used to count the timestamps of each range
+        """
+        import pandas as pd
+        
+        if len(predicted_ranges) == 0:
+            return
+            
+        starts = pd.to_datetime([r['start'] for r in predicted_ranges])
+        ends = pd.to_datetime([r['end'] for r in predicted_ranges])
+        weights = (ends - starts) // pd.Timedelta(freq) + 1
+        
+        for predicted_range, weight in zip(predicted_ranges, weights):
+            self.add(predicted_range['diagnostics'], weight)
+            
+    def get_positions(self, names):
+        import numpy as np
+        
+        new_names = [n for n in names if n not in self.positions]
+        for name in new_names:
+            self.positions[name] = len(self.names)
+            self.names.append(name)
+            
+        if len(new_names) > 0:
+            self.sums = np.append(self.sums, np.zeros(len(new_names)))
+            
+        return np.array([self.positions[n] for n in names], dtype=int)
+        
+    @property
+    def num_signals(self):
+        return len(self.names)
+        
+    def top(self, k=15):
+        """
+        Selects the signals with the highest average importance
+        
+        Parameters:
+            k (integer):
+                Number of signals to select. Defaults to 15
+                
+        Returns:
+            tuple: the names and the average importance of the selected
+            signals, sorted by decreasing importance
+        """
+        import numpy as np
+        
+        if self.total_weight == 0:
+            return [], np.zeros(0)
+            
+        means = self.sums / self.total_weight
+        k = min(k, len(means))
+        selected = np.argpartition(means, -k)[-k:]
+        selected = selected[np.argsort(means[selected])[::-1]]
+        
+        return [self.names[i] for i in selected], means[selected]
+
+def get_diagnostics_matrix(predicted_ranges):
+    """
+    Unpacks the diagnostics of several events into a single matrix, with all
+    the (name, value) pairs flattened in one pass
+
+    Parameters:
+        predicted_ranges (list of dict):
+            The predicted ranges with their `diagnostics`
+
+    Returns:
+        tuple: the (events x signals) importance matrix (0.0 for the signals
+        missing from an event) and the name of each signal
+    """
+    import numpy as np
+
+    lengths = [len(r['diagnostics']) for r in predicted_ranges]
+    positions = dict()
+    columns = np.fromiter(
+        (positions.setdefault(d['name'], len(positions)) for r in predicted_ranges for d in r['diagnostics']),
+        dtype=int,
+        count=sum(lengths)
+    )
+    values = np.fromiter(
+        (d['value'] for r in predicted_ranges for d in r['diagnostics']),
+        dtype=float,
+        count=sum(lengths)
+    )
+    rows = np.repeat(np.arange(len(predicted_ranges)), lengths)
+
+    matrix = np.zeros((len(predicted_ranges), len(positions)))
+    matrix[rows, columns] = values
+
+    return matrix, list(positions)
+
+def get_schema_components(schema):
+    """
+    Builds the signal to component mapping of a dataset from its schema
+
+    Parameters:
+        schema (string):
+            The `Schema` of a Lookout for Equipment dataset (JSON document)
+
+    Returns:
+        dict: the component of each signal, signals being named
+        `component\\tag` as in the diagnostics of Lookout for Equipment
+    """
+    components = dict()
+    for component in json.loads(schema)['Components']:
+        name = component['ComponentName']
+        for column in component['Columns']:
+            components[f'{name}\\{column["Name"]}'] = name
+
+    return components
+
+def aggregate_components(matrix, signals, components=None):
+    """
+    Sums the importance of the signals of each component for all the events
+    at once: the signals get the integer code of their component, are sorted
+    by code and each block of signals is summed by numpy.add.reduceat()
+
+    Parameters:
+        matrix (numpy.ndarray):
+            An (events x signals) importance matrix
+        signals (list of string):
+            The name of each signal
+        components (dict):
+            The component of each signal. Defaults to None: the component is
+            then taken from the signal name (`component\\tag`)
+
+    Returns:
+        tuple: the (events x components) importance matrix and the name of
+        each component
+    """
+    import numpy as np
+    import pandas as pd
+
+    if components is None:
+        components = dict()
+    names = [components.get(s, s.rpartition('\\')[0]) for s in signals]
+    codes, component_names = pd.factorize(pd.Index(names), sort=True)
+
+    order = np.argsort(codes, kind='stable')
+    present, starts = np.unique(codes[order], return_index=True)
+    totals = np.zeros((matrix.shape[0], len(component_names)))
+    if len(order) > 0 and matrix.shape[0] > 0:
+        totals[:, present] = np.add.reduceat(matrix[:, order], starts, axis=1)
+
+    return totals, list(component_names)
+
 def expand_results(df):
     """
     Let's first expand the results to expose the content of the diagnostics 
     column above into different dataframe columns
     """
+    import pandas as pd
+    
     expanded_results = []
     for _, row in df.iterrows():
         new_row = dict()
@@ -400,4 +1425,994 @@ def list_inference_executions(scheduler_name,
                           list_executions_response["InferenceExecutionSummaries"]
 
     # Returns all the summaries in a list:
-    return list_executions
\ No newline at end of file
+    return list_executions
+
+# Executions with these status won't change anymore: the widgets folding the
+# executions of a scheduler into a persisted state only skip them on the
+# next refreshes up to the first execution still in progress.
+TERMINAL_STATUSES = ['SUCCESS', 'FAILED']
+
+def iterate_inference_executions(scheduler_name, client=None, max_results=50):
+    """
+    Generates the inference executions of a scheduler, newest first. Pages 
+    are only requested when the caller consumes them: the caller can stop
+    iterating as soon as it found what it is looking for.
+    
+    Parameters:
+        scheduler_name (string):
+            Name of the scheduler to list the executions of
+        client (boto3.Client):
+            A Lookout for Equipment client. Defaults to None (the client of
+            this layer)
+        max_results (integer):
+            Number of executions per page. Defaults to 50
+    """
+    if client is None:
+        client = l4e_client
+        
+    list_executions_request = {
+        'InferenceSchedulerName': scheduler_name,
+        'MaxResults': max_results
+    }
+    
+    while True:
+        response = client.list_inference_executions(**list_executions_request)
+        for summary in response['InferenceExecutionSummaries']:
+            yield summary
+            
+        if 'NextToken' in response:
+            list_executions_request['NextToken'] = response['NextToken']
+        else:
+            break
+
+# Asynchronous provisioning of the Synthetics canaries: each stage runs in its
+# own asynchronous invocation of the Lambda function that requested it, so
+# that no custom widget request ever waits for a canary to be ready. The
+# checks of a canary still being created are delayed with one-time EventBridge
+# Scheduler schedules: no invocation sleeps while the canary is created. The
+# role allowing EventBridge Scheduler to invoke the function is given by the
+# PROVISIONING_SCHEDULER_ROLE_ARN environment variable:
+CANARY_STAGE_CREATE = 'create'
+CANARY_STAGE_WAIT = 'wait'
+CANARY_STAGE_START = 'start'
+CANARY_BACKOFF_BASE = 30
+CANARY_BACKOFF_MAX = 300
+CANARY_MAX_ATTEMPTS = 12
+
+def get_canary_name(prefix, dashboard_name):
+    """
+    Derives a deterministic canary name from a dashboard name: this lets any
+    widget refresh find the canary associated to a given dashboard without
+    having to list all the canaries of the account.
+    
+    Parameters:
+        prefix (string):
+            A prefix for the canary name (e.g. `modeleval-`)
+        dashboard_name (string):
+            The name of the dashboard the canary will take snapshots of
+            
+    Returns:
+        string: a canary name compliant with the Synthetics naming rules (up
+        to 21 lowercase alphanumerical characters)
+    """
+    digest = hashlib.sha1(dashboard_name.encode('utf-8')).hexdigest()
+    
+    return (prefix + digest)[:21]
+    
+def provision_canary(canary_config, lambda_client=None):
+    """
+    Starts the asynchronous provisioning of a Synthetics canary: this function
+    returns immediately after scheduling the first provisioning stage.
+    
+    Parameters:
+        canary_config (dict):
+            The arguments to pass to the Synthetics `create_canary` API
+        lambda_client (boto3.Client):
+            A boto3 client to invoke the current Lambda function. Defaults
+            to None
+    """
+    schedule_provisioning_stage({
+        'canary_provisioning': {
+            'stage': CANARY_STAGE_CREATE,
+            'attempt': 0,
+            'canary': canary_config
+        }
+    }, lambda_client=lambda_client)
+    
+def schedule_provisioning_stage(event, delay=0, lambda_client=None, scheduler_client=None):
+    """
+    Asynchronously invokes the current Lambda function to process the next
+    stage of a canary provisioning. Delayed stages are triggered by a one-time
+    EventBridge Scheduler schedule, which the stage deletes when it runs.
+    
+    Parameters:
+        event (dict):
+            The provisioning event to send to the function
+        delay (integer):
+            The number of seconds to wait for before running the stage.
+            Defaults to 0 (the function is invoked right away)
+        lambda_client (boto3.Client):
+            A boto3 client to invoke the current Lambda function. Defaults
+            to None
+        scheduler_client (boto3.Client):
+            A boto3 client to query EventBridge Scheduler. Defaults to None
+            
+    Returns:
+        boolean: False when a delayed stage cannot be scheduled because no
+        scheduler role is configured
+    """
+    function_name = os.environ['AWS_LAMBDA_FUNCTION_NAME']
+    
+    if delay <= 0:
+        if lambda_client is None:
+            lambda_client = boto3.client('lambda')
+            
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps(event)
+        )
+        return True
+        
+    role_arn = os.getenv('PROVISIONING_SCHEDULER_ROLE_ARN')
+    if role_arn is None:
+        return False
+        
+    if scheduler_client is None:
+        scheduler_client = boto3.client('scheduler')
+        
+    # One-time schedule named after the canary and the stage it triggers
+    # (up to 64 characters):
+    from datetime import datetime, timedelta, timezone
+    
+    provisioning = event['canary_provisioning']
+    run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    schedule_name = (
+        f'{provisioning["canary"]["Name"]}-{provisioning["stage"]}-'
+        f'{provisioning["attempt"]}-{run_at:%Y%m%d%H%M%S}'
+    )
+    provisioning['schedule_name'] = schedule_name
+    
+    scheduler_client.create_schedule(
+        Name=schedule_name,
+        ScheduleExpression=f'at({run_at:%Y-%m-%dT%H:%M:%S})',
+        ScheduleExpressionTimezone='UTC',
+        FlexibleTimeWindow={'Mode': 'OFF'},
+        Target={
+            'Arn': get_lambda_arn(function_name),
+            'RoleArn': role_arn,
+            'Input': json.dumps(event)
+        }
+    )
+    
+    return True
+    
+def delete_provisioning_schedule(schedule_name, scheduler_client=None):
+    """
+    Deletes the one-time schedule which triggered a provisioning stage
+    """
+    if scheduler_client is None:
+        scheduler_client = boto3.client('scheduler')
+        
+    try:
+        scheduler_client.delete_schedule(Name=schedule_name)
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            raise
+    
+def get_provisioning_delay(attempt):
+    """
+    Computes the exponential backoff delay to wait for before checking the
+    status of a canary again
+    
+    Parameters:
+        attempt (integer):
+            The number of times the status was already checked
+            
+    Returns:
+        integer: the number of seconds to wait for
+    """
+    return min(CANARY_BACKOFF_BASE * 2 ** attempt, CANARY_BACKOFF_MAX)
+    
+def process_canary_provisioning(event, client=None, lambda_client=None, scheduler_client=None):
+    """
+    Processes a single stage of the canary provisioning state machine:
+    
+    * `create`: requests the canary creation (existing canaries are reused)
+    * `wait`: checks the canary state and schedules itself again with an
+      exponential backoff until the canary is ready
+    * `start`: starts the canary
+    
+    When no scheduler role is configured, the provisioning stops after the
+    creation request: the canary is then started by the next status check
+    of its dashboard (see `resume_canary_provisioning()`).
+    
+    Parameters:
+        event (dict):
+            The provisioning event with the `canary_provisioning` key
+        client (boto3.Client):
+            A boto3 client to query the Synthetics service. Defaults to None
+        lambda_client (boto3.Client):
+            A boto3 client to invoke the current Lambda function. Defaults
+            to None
+        scheduler_client (boto3.Client):
+            A boto3 client to query EventBridge Scheduler. Defaults to None
+            
+    Returns:
+        string: the stage reached by the provisioning after this invocation
+    """
+    if client is None:
+        client = boto3.client('synthetics')
+        
+    provisioning = event['canary_provisioning']
+    canary_config = provisioning['canary']
+    canary_name = canary_config['Name']
+    stage = provisioning['stage']
+    attempt = provisioning['attempt']
+    delay = 0
+    
+    # This stage was triggered by a one-time schedule, which is not needed
+    # anymore:
+    if 'schedule_name' in provisioning:
+        delete_provisioning_schedule(provisioning['schedule_name'], scheduler_client)
+    
+    if stage == CANARY_STAGE_CREATE:
+        try:
+            client.create_canary(**canary_config)
+            
+        # The canary already exists (e.g. a dashboard was deleted and 
+        # created again): we will just make sure it's started.
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConflictException':
+                raise
+                
+        next_stage = CANARY_STAGE_WAIT
+        delay = get_provisioning_delay(attempt)
+        
+    elif stage == CANARY_STAGE_WAIT:
+        state = get_canary_state(canary_name, client)
+        if state in ['READY', 'STOPPED']:
+            next_stage = CANARY_STAGE_START
+        elif state == 'RUNNING':
+            return state
+        elif state in ['CREATING', 'UPDATING', 'STARTING', None]:
+            attempt += 1
+            if attempt >= CANARY_MAX_ATTEMPTS:
+                print(f'Canary {canary_name} still {state} after {attempt} checks, giving up')
+                return state
+                
+            next_stage = CANARY_STAGE_WAIT
+            delay = get_provisioning_delay(attempt)
+        else:
+            print(f'Canary {canary_name} cannot be started from state {state}')
+            return state
+            
+    elif stage == CANARY_STAGE_START:
+        start_ready_canary(canary_name, client)
+        return stage
+        
+    scheduled = schedule_provisioning_stage({
+        'canary_provisioning': {
+            'stage': next_stage,
+            'attempt': attempt,
+            'canary': canary_config
+        }
+    }, delay, lambda_client, scheduler_client)
+    
+    if not scheduled:
+        print(f'No scheduler role configured: canary {canary_name} will be started by its next status check')
+        return stage
+    
+    return next_stage
+    
+def resume_canary_provisioning(canary_name, client=None):
+    """
+    Checks the state of a canary and starts it if it was created but never
+    started (e.g. when its provisioning stopped after the creation request)
+    
+    Parameters:
+        canary_name (string):
+            Name of the canary to check
+        client (boto3.Client):
+            A boto3 client to query the Synthetics service. Defaults to None
+            
+    Returns:
+        string: the canary state (see `get_canary_state()`)
+    """
+    if client is None:
+        client = boto3.client('synthetics')
+        
+    state = get_canary_state(canary_name, client)
+    if state == 'READY':
+        state = start_ready_canary(canary_name, client)
+        
+    return state
+    
+def start_ready_canary(canary_name, client):
+    """
+    Starts a canary which is ready. A status check and the `start` stage of
+    the provisioning can both try to start the same canary: the second call
+    is rejected with a conflict, the canary being already started.
+    
+    Parameters:
+        canary_name (string):
+            Name of the canary to start
+        client (boto3.Client):
+            A boto3 client to query the Synthetics service
+            
+    Returns:
+        string: the `STARTING` state
+    """
+    try:
+        client.start_canary(Name=canary_name)
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConflictException':
+            raise
+            
+    return 'STARTING'
+    
+def get_canary_state(canary_name, client=None):
+    """
+    Gets the current state of a canary with a single Synthetics API call
+    
+    Parameters:
+        canary_name (string):
+            Name of the canary to get the state of
+        client (boto3.Client):
+            A boto3 client to query the Synthetics service. Defaults to None
+            
+    Returns:
+        string: the canary state (e.g. `CREATING`, `READY` or `RUNNING`) or
+        None if this canary does not exist yet
+    """
+    if client is None:
+        client = boto3.client('synthetics')
+        
+    try:
+        response = client.get_canary(Name=canary_name)
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            return None
+        raise
+        
+    return response['Canary']['Status']['State']
+
+# Widgets only depending on immutable model data are pre-rendered when a
+# model dashboard is created and stored in S3 under this path (for instance
+# s3://bucket/widgets/). When this variable is not set, widgets are always 
+# rendered on the fly:
+WIDGET_CACHE_S3_PATH = os.getenv('WIDGET_CACHE_S3_PATH')
+
+# The artifacts are rendered for sizes snapped to these steps (in pixels):
+# their SVG scales to the exact size of the widget. They are stored under 
+# the creation time of the model, so that a new model reusing the name of a
+# deleted one never gets its artifacts:
+WIDGET_WIDTH_STEP = 160
+WIDGET_HEIGHT_STEP = 40
+MODEL_VERSION_TTL = 300
+model_versions = dict()
+
+def snap_widget_size(width, height):
+    """
+    Snaps the size of a widget to the size buckets of the artifacts
+    
+    Returns:
+        tuple: the width and the height of the bucket, in pixels
+    """
+    width = max(1, round(width / WIDGET_WIDTH_STEP)) * WIDGET_WIDTH_STEP
+    height = max(1, round(height / WIDGET_HEIGHT_STEP)) * WIDGET_HEIGHT_STEP
+    
+    return width, height
+    
+def get_model_version(model_name):
+    """
+    Gets the version of a model: the creation time of the model with this
+    name (in seconds since epoch). Versions are kept for a few minutes in
+    each execution environment.
+    """
+    cached = model_versions.get(model_name)
+    if (cached is not None) and (time.time() - cached[0] < MODEL_VERSION_TTL):
+        return cached[1]
+        
+    response = l4e_client.describe_model(ModelName=model_name)
+    version = int(response['CreatedAt'].timestamp())
+    model_versions[model_name] = (time.time(), version)
+    
+    return version
+    
+def get_model_artifacts_prefix(model_name):
+    """
+    Builds the S3 location of the artifacts of the current version of a model
+    
+    Returns:
+        tuple: the bucket and the prefix of the artifacts
+    """
+    bucket, prefix = WIDGET_CACHE_S3_PATH[5:].split('/', 1)
+    
+    return bucket, f'{prefix}{model_name}/{get_model_version(model_name)}/'
+    
+def get_widget_artifact_location(widget_name, model_name, width, height, variant=None):
+    """
+    Builds the S3 location of a pre-rendered widget
+    
+    Parameters:
+        widget_name (string):
+            The name of the widget (e.g. `plot-ranked-signals`)
+        model_name (string):
+            The name of the model displayed by this widget
+        width, height (integer):
+            The size of the widget in pixels, snapped to the size buckets
+        variant (string):
+            An optional suffix for widgets accepting extra parameters
+            
+    Returns:
+        tuple: the bucket and the key of the pre-rendered widget
+    """
+    bucket, prefix = get_model_artifacts_prefix(model_name)
+    fname = f'{width}x{height}'
+    if variant is not None:
+        fname += f'-{variant}'
+        
+    return bucket, f'{prefix}{widget_name}/{fname}.html'
+    
+def make_svg_responsive(payload):
+    """
+    Makes an SVG image fill the width of its widget, the height following
+    its aspect ratio (the image keeps its viewBox)
+    """
+    match = re.search(r'<svg[^>]*>', payload)
+    if match is None:
+        return payload
+        
+    tag = re.sub(r'\s(width|height)="[^"]*"', '', match.group(0))
+    tag = tag.replace('<svg', '<svg width="100%"', 1)
+    
+    return payload[:match.start()] + tag + payload[match.end():]
+    
+def get_widget_artifact(widget_name, 
+                        model_name, 
+                        width, 
+                        height, 
+                        render, 
+                        variant=None, 
+                        refresh=False, 
+                        client=None):
+    """
+    Gets the content of a widget from its pre-rendered artifact in S3. On a
+    miss, the widget is rendered and the artifact stored for the next time.
+    Artifacts are rendered for the size bucket of the widget (see
+    `snap_widget_size()`) and their SVG scales to the size of the widget.
+    
+    Parameters:
+        widget_name (string):
+            The name of the widget (e.g. `plot-ranked-signals`)
+        model_name (string):
+            The name of the model displayed by this widget
+        width, height (integer):
+            The size of the widget in pixels
+        render (callable):
+            A function rendering the widget content for a given width and
+            height (in pixels)
+        variant (string):
+            An optional suffix for widgets accepting extra parameters
+        refresh (boolean):
+            Set to True to render the widget and overwrite its artifact
+        client (boto3.Client):
+            A boto3 client to query Amazon S3. Defaults to None
+            
+    Returns:
+        string: the content of the widget
+    """
+    if WIDGET_CACHE_S3_PATH is None:
+        return render(width, height)
+        
+    if client is None:
+        client = boto3.client('s3')
+        
+    width, height = snap_widget_size(width, height)
+    bucket, key = get_widget_artifact_location(widget_name, model_name, width, height, variant)
+    if not refresh:
+        try:
+            response = client.get_object(Bucket=bucket, Key=key)
+            return response['Body'].read().decode('utf-8')
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ['NoSuchKey', 'AccessDenied']:
+                raise
+    
+    payload = render(width, height)
+    
+    # Only text payloads (SVG or HTML) are stored:
+    if isinstance(payload, str):
+        payload = make_svg_responsive(payload)
+        client.put_object(
+            Bucket=bucket, 
+            Key=key, 
+            Body=payload.encode('utf-8'),
+            ContentType='text/html'
+        )
+    
+    return payload
+    
+def prerender_widgets(model_name, widget_sizes, lambda_client=None):
+    """
+    Asynchronously invokes the Lambda functions of the widgets of a model
+    dashboard, so that they render and store their artifacts in the
+    background for the most common widget sizes
+    
+    Parameters:
+        model_name (string):
+            The name of the model to render the widgets for
+        widget_sizes (dict):
+            The widget names with the list of (width, height) sizes in pixels
+            to pre-render for each of them, snapped to the size buckets
+        lambda_client (boto3.Client):
+            A boto3 client to invoke the Lambda functions. Defaults to None
+    """
+    if WIDGET_CACHE_S3_PATH is None:
+        return
+        
+    if lambda_client is None:
+        lambda_client = boto3.client('lambda')
+        
+    for widget_name, sizes in widget_sizes.items():
+        for width, height in sorted(set(snap_widget_size(w, h) for w, h in sizes)):
+            lambda_client.invoke(
+                FunctionName=get_widget_endpoint(widget_name),
+                InvocationType='Event',
+                Payload=json.dumps({
+                    'model_name': model_name,
+                    'prerender': True,
+                    'widgetContext': {'width': width, 'height': height}
+                })
+            )
+                
+# ----------------------------------------------------------------------------
+# Model dashboard bundle: the widgets of a model dashboard all derive their
+# content from the same model evaluation. The first widget to need it
+# computes every derived data set once and stores them as a single bundle
+# next to the widget artifacts. A lease in the DynamoDB table given by the
+# BUNDLE_LEASE_TABLE environment variable (partition key `lease_id`, TTL 
+# attribute `expires`) prevents concurrent widget refreshes from computing
+# the same bundle twice. Without this table, each invocation missing the
+# bundle computes it. The last bundles are also kept in each warm execution
+# environment (for each version of the model), which is their only cache
+# when WIDGET_CACHE_S3_PATH is not set. A widget waiting for the bundle of
+# another invocation gives up early enough to compute it within the timeout
+# of the custom widgets:
+# ----------------------------------------------------------------------------
+BUNDLE_LEASE_TABLE = os.getenv('BUNDLE_LEASE_TABLE')
+BUNDLE_LEASE_DURATION = 60
+BUNDLE_WAIT_TIMEOUT = 10
+BUNDLE_POLLING_PERIOD = 0.5
+BUNDLE_CACHE_SIZE = 4
+model_bundles = dict()
+
+def get_daily_importance(predicted_ranges, start_date, end_date, freq='1min'):
+    """
+    Computes the daily average importance of each signal over the minutes of
+    the detected events, without expanding each range at a minute frequency
+    
+    Parameters:
+        predicted_ranges (list of dict):
+            The predicted ranges with their `start`, `end` and `diagnostics`
+        start_date, end_date (pandas.Timestamp):
+            The evaluation period
+        freq (string):
+            The frequency used to count the timestamps of each range
+            
+    Returns:
+        pandas.DataFrame: one row per day and one column per signal, with the
+        average importance of each signal (0.0 for days without event)
+    """
+    import numpy as np
+    import pandas as pd
+    
+    days = pd.date_range(start_date.floor('D'), end_date.floor('D'), freq='1D')
+    one_day = pd.Timedelta('1D')
+    step = pd.Timedelta(freq)
+    
+    # Only the signals positions are needed from the ranker:
+    ranker = SignalRanker()
+    if len(predicted_ranges) > 0:
+        ranker.get_positions([d['name'] for d in predicted_ranges[0]['diagnostics']])
+    sums = np.zeros((len(days), ranker.num_signals))
+    weights = np.zeros(len(days))
+
+    for predicted_range in predicted_ranges:
+        diagnostics = predicted_range['diagnostics']
+        positions = ranker.get_positions([d['name'] for d in diagnostics])
+        if sums.shape[1] < ranker.num_signals:
+            sums = np.pad(sums, ((0, 0), (0, ranker.num_signals - sums.shape[1])))
+        values = np.array([d['value'] for d in diagnostics], dtype=float)
+        
+        start = pd.Timestamp(predicted_range['start'])
+        end = pd.Timestamp(predicted_range['end'])
+        num_timestamps = (end - start) // step + 1
+        
+        # Number of timestamps of this range falling into each day:
+        day = start.floor('D')
+        while day <= end:
+            first = max(0, -((start - day) // step))
+            last = min(num_timestamps - 1, -((start - day - one_day) // step) - 1)
+            index = (day - days[0]) // one_day
+            if (last >= first) and (0 <= index < len(days)):
+                sums[index, positions] += (last - first + 1) * values
+                weights[index] += last - first + 1
+            day += one_day
+
+    means = np.divide(sums, weights[:, None], out=np.zeros_like(sums), where=weights[:, None] > 0)
+    columns = [name.split('\\')[-1] for name in ranker.names]
+    
+    return pd.DataFrame(means, index=days, columns=columns)
+
+def compute_model_bundle(model_name, top_k=15):
+    """
+    Computes all the data derived from a model evaluation and needed by the
+    widgets of a model dashboard
+    
+    Parameters:
+        model_name (string):
+            The name of the model
+        top_k (integer):
+            Number of ranked signals to keep. Defaults to 15
+            
+    Returns:
+        dict: a JSON-serializable bundle with the evaluation period, the
+        dataset location, the predicted ranges, the tags list, the tags
+        palette, the ranked signals and the daily importance of each signal
+    """
+    import numpy as np
+    import pandas as pd
+    
+    start = time.time()
+    model_response = l4e_client.describe_model(ModelName=model_name)
+    dataset_name = model_response['DatasetName']
+    dataset_response = l4e_client.describe_dataset(DatasetName=dataset_name)
+    input_config = dataset_response['IngestionInputConfiguration']['S3InputConfiguration']
+    
+    predictions = json.loads(model_response['ModelMetrics'])['predicted_ranges']
+    start_date = pd.to_datetime(model_response['EvaluationDataStartTime']).tz_localize(None)
+    end_date = pd.to_datetime(model_response['EvaluationDataEndTime']).tz_localize(None)
+    
+    tags_list = []
+    if len(predictions) > 0:
+        tags_list = [d['name'].split('\\')[-1] for d in predictions[0]['diagnostics']]
+    colors = set_aws_stylesheet()
+    
+    ranker = SignalRanker()
+    ranker.add_ranges(predictions)
+    names, means = ranker.top(top_k)
+    
+    daily_importance = get_daily_importance(predictions, start_date, end_date)
+
+    # Importance of each component, averaged over the minutes of the events
+    # as for the ranked signals:
+    matrix, signals = get_diagnostics_matrix(predictions)
+    components = get_schema_components(model_response['Schema'])
+    component_matrix, component_names = aggregate_components(matrix, signals, components)
+    component_sizes, _ = aggregate_components(np.ones((1, len(signals))), signals, components)
+    component_values = np.zeros(len(component_names))
+    if len(predictions) > 0:
+        starts = pd.to_datetime([r['start'] for r in predictions])
+        ends = pd.to_datetime([r['end'] for r in predictions])
+        weights = np.asarray((ends - starts) // pd.Timedelta('1min') + 1, dtype=float)
+        component_values = weights @ component_matrix / weights.sum()
+
+    bundle = {
+        'model_name': model_name,
+        'evaluation_start': start_date.isoformat(),
+        'evaluation_end': end_date.isoformat(),
+        'dataset': {
+            'name': dataset_name,
+            'bucket': input_config['Bucket'],
+            'prefix': input_config.get('Prefix', '')
+        },
+        'predicted_ranges': [[r['start'], r['end']] for r in predictions],
+        'tags': tags_list,
+        'palette': {t: colors[index % len(colors)] for index, t in enumerate(tags_list)},
+        'ranked_signals': {
+            'names': [name.split('\\')[-1] for name in names],
+            'values': np.round(means, 6).tolist(),
+            'num_signals': ranker.num_signals
+        },
+        'components': {
+            'names': component_names,
+            'values': np.round(component_values, 6).tolist(),
+            'num_signals': component_sizes[0].astype(int).tolist()
+        },
+        'daily_importance': {
+            'index': [d.strftime('%Y-%m-%d') for d in daily_importance.index],
+            'columns': list(daily_importance.columns),
+            'values': np.round(daily_importance.values, 6).tolist()
+        }
+    }
+    print(f'Bundle of model {model_name} computed in {time.time() - start:.2f}s')
+    
+    return bundle
+    
+def get_model_bundle_location(model_name):
+    """
+    Builds the S3 location of the bundle of a model dashboard and the
+    identifier of its lease
+    
+    Parameters:
+        model_name (string):
+            The name of the model
+            
+    Returns:
+        tuple: the bucket and the key of the bundle, and the identifier of
+        its lease
+    """
+    bucket, prefix = get_model_artifacts_prefix(model_name)
+    
+    return bucket, f'{prefix}bundle.json', f'{bucket}/{prefix}bundle'
+    
+def read_json_object(bucket, key, client):
+    """
+    Reads a JSON document from S3, returns None when it does not exist
+    """
+    try:
+        response = client.get_object(Bucket=bucket, Key=key)
+        return json.loads(response['Body'].read())
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ['NoSuchKey', 'AccessDenied']:
+            raise
+            
+    return None
+    
+def acquire_bundle_lease(lease_id, owner, client):
+    """
+    Tries to acquire the lease on the computation of a bundle. The lease is
+    a conditional write that only succeeds when no other invocation holds
+    it: an expired lease (left by a failed invocation) is taken over by the
+    same write.
+    
+    Parameters:
+        lease_id (string):
+            The identifier of the lease
+        owner (string):
+            A unique identifier of this invocation
+        client (boto3.Client):
+            A boto3 client to query Amazon DynamoDB
+    
+    Returns:
+        boolean: True if the lease was acquired by this invocation
+    """
+    now = int(time.time())
+    try:
+        client.put_item(
+            TableName=BUNDLE_LEASE_TABLE,
+            Item={
+                'lease_id': {'S': lease_id},
+                'owner': {'S': owner},
+                'expires': {'N': str(now + BUNDLE_LEASE_DURATION)}
+            },
+            ConditionExpression='attribute_not_exists(lease_id) OR expires < :now',
+            ExpressionAttributeValues={':now': {'N': str(now)}}
+        )
+        return True
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+            
+    return False
+    
+def release_bundle_lease(lease_id, owner, client):
+    """
+    Releases a lease, unless it expired and was taken over by another
+    invocation in the meantime
+    """
+    try:
+        client.delete_item(
+            TableName=BUNDLE_LEASE_TABLE,
+            Key={'lease_id': {'S': lease_id}},
+            ConditionExpression='#owner = :owner',
+            ExpressionAttributeNames={'#owner': 'owner'},
+            ExpressionAttributeValues={':owner': {'S': owner}}
+        )
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f'Lease {lease_id} was taken over by another invocation')
+
+def get_model_bundle(model_name, refresh=False, client=None, lease_client=None):
+    """
+    Gets the bundle of a model dashboard from the execution environment or
+    from S3. On a miss, the invocation acquiring the lease computes and
+    stores the bundle while the other ones wait for it to be available.
+    
+    Parameters:
+        model_name (string):
+            The name of the model
+        refresh (boolean):
+            Set to True to compute the bundle and overwrite the stored one
+        client (boto3.Client):
+            A boto3 client to query Amazon S3. Defaults to None
+        lease_client (boto3.Client):
+            A boto3 client to query Amazon DynamoDB. Defaults to None
+            
+    Returns:
+        dict: the bundle of the model (see `compute_model_bundle()`)
+    """
+    cache_key = (model_name, get_model_version(model_name))
+    if (not refresh) and (cache_key in model_bundles):
+        model_bundles[cache_key] = model_bundles.pop(cache_key)
+        return model_bundles[cache_key]
+        
+    if WIDGET_CACHE_S3_PATH is None:
+        bundle = compute_model_bundle(model_name)
+        
+    else:
+        bundle = get_stored_model_bundle(model_name, refresh, client, lease_client)
+        
+    # Only the most recently used bundles are kept:
+    model_bundles[cache_key] = bundle
+    while len(model_bundles) > BUNDLE_CACHE_SIZE:
+        del model_bundles[next(iter(model_bundles))]
+        
+    return bundle
+    
+def get_stored_model_bundle(model_name, refresh=False, client=None, lease_client=None):
+    """
+    Reads the bundle of a model dashboard from S3 or computes and stores it
+    (see `get_model_bundle()`)
+    """
+    import uuid
+    
+    if client is None:
+        client = boto3.client('s3')
+    if (lease_client is None) and (BUNDLE_LEASE_TABLE is not None):
+        lease_client = boto3.client('dynamodb')
+        
+    bucket, key, lease_id = get_model_bundle_location(model_name)
+    owner = uuid.uuid4().hex
+    deadline = time.time() + BUNDLE_WAIT_TIMEOUT
+    while True:
+        if not refresh:
+            bundle = read_json_object(bucket, key, client)
+            if bundle is not None:
+                return bundle
+        
+        if (BUNDLE_LEASE_TABLE is None) or acquire_bundle_lease(lease_id, owner, lease_client):
+            try:
+                bundle = compute_model_bundle(model_name)
+                client.put_object(
+                    Bucket=bucket,
+                    Key=key,
+                    Body=json.dumps(bundle, separators=(',', ':')).encode('utf-8'),
+                    ContentType='application/json'
+                )
+                
+            finally:
+                if BUNDLE_LEASE_TABLE is not None:
+                    release_bundle_lease(lease_id, owner, lease_client)
+                
+            return bundle
+            
+        # Another invocation is computing the bundle: a refresh only needs 
+        # to wait for its result.
+        refresh = False
+        if time.time() > deadline:
+            print(f'Timeout while waiting for the bundle of model {model_name}')
+            return compute_model_bundle(model_name)
+            
+        time.sleep(BUNDLE_POLLING_PERIOD)
+        
+def get_bundle_importance(bundle):
+    """
+    Rebuilds the daily importance dataframe stored in a model bundle
+    """
+    import pandas as pd
+    
+    daily_importance = bundle['daily_importance']
+    
+    return pd.DataFrame(
+        daily_importance['values'],
+        index=pd.to_datetime(daily_importance['index']),
+        columns=daily_importance['columns']
+    )
+    
+def get_bundle_ranges(bundle):
+    """
+    Rebuilds the predicted ranges and the evaluation period of a model bundle
+    
+    Returns:
+        tuple: the ranges dataframe (`start` and `end` columns), the start
+        and the end of the evaluation period
+    """
+    import pandas as pd
+    
+    ranges_df = pd.DataFrame(bundle['predicted_ranges'], columns=['start', 'end'])
+    start_date = pd.to_datetime(bundle['evaluation_start'])
+    end_date = pd.to_datetime(bundle['evaluation_end'])
+    
+    return ranges_df, start_date, end_date
+    
+# ----------------------------------------------------------------------------
+# Incremental state of the widgets (e.g. the statistics folded from the
+# executions of a scheduler), stored as small JSON documents under this S3
+# path (for instance s3://bucket/state/) so that every execution environment
+# of every function starts from it. When this variable is not set, the state
+# is kept in /tmp and only survives in a warm execution environment.
+# ----------------------------------------------------------------------------
+STATE_S3_PATH = os.getenv('STATE_S3_PATH')
+
+def get_state_location(name):
+    """
+    Builds the S3 location of a state document
+    
+    Parameters:
+        name (string):
+            The name of the document (e.g. `execution-statistics/<scheduler>`)
+            
+    Returns:
+        tuple: the bucket and the key of the document
+    """
+    bucket, prefix = STATE_S3_PATH[5:].split('/', 1)
+    
+    return bucket, f'{prefix}{name}.json'
+    
+def load_state(name, client=None):
+    """
+    Loads a state document
+    
+    Parameters:
+        name (string):
+            The name of the document (e.g. `execution-statistics/<scheduler>`)
+        client (boto3.Client):
+            A boto3 client to query Amazon S3. Defaults to None
+            
+    Returns:
+        dict: the document, None when it was never saved
+    """
+    if STATE_S3_PATH is None:
+        fname = os.path.join('/tmp', name.replace('/', '_') + '.json')
+        if not os.path.exists(fname):
+            return None
+        with open(fname, 'r') as f:
+            return json.load(f)
+            
+    if client is None:
+        client = boto3.client('s3')
+        
+    bucket, key = get_state_location(name)
+    
+    return read_json_object(bucket, key, client)
+    
+def save_state(name, state, client=None):
+    """
+    Saves a state document. Concurrent invocations saving the same document
+    all write a consistent state: the last one wins.
+    
+    Parameters:
+        name (string):
+            The name of the document (e.g. `execution-statistics/<scheduler>`)
+        state (dict):
+            A JSON-serializable document
+        client (boto3.Client):
+            A boto3 client to query Amazon S3. Defaults to None
+    """
+    body = json.dumps(state, separators=(',', ':'))
+    if STATE_S3_PATH is None:
+        fname = os.path.join('/tmp', name.replace('/', '_') + '.json')
+        with open(fname, 'w') as f:
+            f.write(body)
+        return
+        
+    if client is None:
+        client = boto3.client('s3')
+        
+    bucket, key = get_state_location(name)
+    client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body.encode('utf-8'),
+        ContentType='application/json'
+    )
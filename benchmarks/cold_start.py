@@ -0,0 +1,72 @@
+# Measures the import time of the dashboard Lambda functions (the part of
+# their cold start under our control) and counts the AWS API calls they make
+# before handling their first event:
+#
+#     python benchmarks/cold_start.py
+#
+import importlib.util
+import os
+import sys
+import time
+
+import botocore.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('Stack', 'benchmark')
+sys.path.insert(0, os.path.join(DASHBOARD, 'layers', 'lookoutequipment', 'python'))
+
+FUNCTIONS = [
+    'list-models',
+    'list-schedulers',
+    'model-details',
+    'scheduler-details',
+    'get-predictions',
+    'plot-ranked-signals',
+    'component-importance',
+    'plot-feature-importance',
+    'plot-feature-importance-legend',
+    'scheduler-last-execution-details',
+    'fleet-health'
+]
+
+# Every API call made at import time is recorded and answered locally: in
+# Lambda, each of them is a network round-trip added to the cold start.
+api_calls = []
+
+def record_api_call(self, operation_name, api_params):
+    api_calls.append(f'{self.meta.service_model.service_name}.{operation_name}')
+    if operation_name == 'GetCallerIdentity':
+        return {'Account': '123456789012'}
+        
+    return {}
+
+def import_function(function):
+    folder = os.path.join(DASHBOARD, 'lambdas', function)
+    sys.path.insert(0, folder)
+    try:
+        spec = importlib.util.spec_from_file_location(
+            function.replace('-', '_'), 
+            os.path.join(folder, 'handler.py')
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        
+    finally:
+        sys.path.remove(folder)
+        
+if __name__ == '__main__':
+    botocore.client.BaseClient._make_api_call = record_api_call
+    
+    # Imports the shared libraries first, as they are cached by the runtime:
+    import l4ecwcw
+    import matplotlib.pyplot
+    import pandas
+    
+    for function in FUNCTIONS:
+        del api_calls[:]
+        start = time.perf_counter()
+        import_function(function)
+        duration = time.perf_counter() - start
+        print(f'{function:35s} {duration*1000:7.1f}ms, {len(api_calls)} API calls {api_calls}')
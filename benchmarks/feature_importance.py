@@ -0,0 +1,84 @@
+# Compares the render time and payload size of the signal importance
+# evolution plot drawn with one bar per signal and per day versus one
+# stacked band per signal:
+#
+#     python benchmarks/feature_importance.py
+#
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from io import StringIO, BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(DASHBOARD, 'layers', 'lookoutequipment', 'python'))
+
+from l4ecwcw import collapse_signals, plot_stacked_bands
+
+matplotlib.rcParams['svg.fonttype'] = 'none'
+NUM_DAYS = 365
+
+def generate_importance(num_signals, num_days=NUM_DAYS, seed=42):
+    """
+    Generates a daily signal importance matrix where each day sums to 1.0
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.dirichlet(np.ones(num_signals) * 0.3, size=num_days)
+    index = pd.date_range(start='2021-01-01', periods=num_days, freq='1D')
+    columns = [f'signal-{i:03d}' for i in range(num_signals)]
+    
+    return pd.DataFrame(values, index=index, columns=columns)
+    
+def plot_bars(importance_df, ax):
+    bottom_values = np.zeros((len(importance_df.index),))
+    for tag in list(importance_df.columns):
+        y = importance_df.loc[:, tag]
+        ax.bar(x=importance_df.index, height=y, bottom=bottom_values, alpha=0.8, width=1.0)
+        bottom_values += y.values
+        
+def plot_bands(importance_df, ax, top_k=None):
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    importance_df = collapse_signals(importance_df, top_k)
+    signal_colors = [colors[i % len(colors)] for i in range(importance_df.shape[1])]
+    plot_stacked_bands(importance_df, signal_colors, ax)
+    
+def measure(renderer, importance_df, output_format):
+    start = time.perf_counter()
+    fig = plt.figure(figsize=(15, 6), dpi=100)
+    ax = fig.add_subplot(111)
+    renderer(importance_df, ax)
+    
+    if output_format == 'svg':
+        buffer = StringIO()
+    else:
+        buffer = BytesIO()
+    fig.savefig(buffer, format=output_format, bbox_inches='tight')
+    plt.close(fig)
+    duration = time.perf_counter() - start
+    
+    return duration, len(buffer.getvalue())
+    
+if __name__ == '__main__':
+    renderers = {
+        'bars': plot_bars,
+        'bands': plot_bands,
+        'bands (top 15)': lambda df, ax: plot_bands(df, ax, top_k=15)
+    }
+    
+    for num_signals in [50, 200, 500]:
+        importance_df = generate_importance(num_signals)
+        for name, renderer in renderers.items():
+            for output_format in ['svg', 'png']:
+                duration, size = measure(renderer, importance_df, output_format)
+                print(
+                    f'{num_signals:3d} signals | {name:15s} | {output_format} | '
+                    f'{duration:6.2f}s | {size/1024:9.0f} KB'
+                )
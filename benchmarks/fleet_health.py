@@ -0,0 +1,175 @@
+# Benchmarks the fleet health widget against a stubbed Lookout for Equipment
+# API with a large fleet of schedulers:
+#
+#     python benchmarks/fleet_health.py
+#
+import datetime
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['STATE_S3_PATH'] = 's3://bucket/state/'
+sys.path.insert(0, os.path.join(DASHBOARD, 'layers', 'lookoutequipment', 'python'))
+
+# Schedulers running every 5 minutes for a month:
+NUM_SCHEDULERS = 1000
+NUM_EXECUTIONS = 30 * 24 * 12
+API_LATENCY = 0.02
+
+def load_handler():
+    path = os.path.join(DASHBOARD, 'lambdas', 'fleet-health', 'handler.py')
+    spec = importlib.util.spec_from_file_location('fleet_health', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    
+    return module
+
+class StubLookoutEquipment:
+    """
+    Mimics the paginated answers of the Lookout for Equipment API with a
+    constant latency for each call
+    """
+    def __init__(self, num_schedulers, num_executions, latency):
+        self.latency = latency
+        self.calls = 0
+        self.schedulers = [{
+            'InferenceSchedulerName': f'scheduler-{i:04d}',
+            'ModelName': f'model-{i:04d}',
+            'Status': 'RUNNING'
+        } for i in range(num_schedulers)]
+        
+        end = datetime.datetime(2022, 6, 1, tzinfo=datetime.timezone.utc)
+        self.executions = []
+        for i in range(num_executions):
+            status = 'FAILED' if i % 5 == 0 else 'SUCCESS'
+            self.executions.append({
+                'ScheduledStartTime': end - datetime.timedelta(minutes=5*i),
+                'Status': status,
+                'CustomerResultObject': {'Bucket': 'bucket', 'Key': f'results-{i}.jsonl'}
+            })
+        
+    def paginate(self, items, request, max_results):
+        self.calls += 1
+        time.sleep(self.latency)
+        index = int(request.get('NextToken', 0))
+        response = {'page': items[index:index + max_results]}
+        if index + max_results < len(items):
+            response['NextToken'] = str(index + max_results)
+            
+        return response
+        
+    def list_inference_schedulers(self, **request):
+        response = self.paginate(self.schedulers, request, 50)
+        response['InferenceSchedulerSummaries'] = response.pop('page')
+        return response
+        
+    def list_inference_executions(self, **request):
+        response = self.paginate(self.executions, request, request['MaxResults'])
+        response['InferenceExecutionSummaries'] = response.pop('page')
+        return response
+        
+class StubS3:
+    """
+    Serves the same results file for every execution and keeps the state
+    documents written by the widget
+    """
+    def __init__(self):
+        lines = [json.dumps({'prediction': i % 4 == 0}) for i in range(60)]
+        self.content = '\n'.join(lines).encode('utf-8')
+        self.objects = dict()
+        self.results_reads = 0
+        self.state_reads = 0
+        self.state_writes = 0
+        
+    def get_object(self, Bucket, Key):
+        if Key.startswith('state/'):
+            self.state_reads += 1
+            if Key not in self.objects:
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+            content = self.objects[Key]
+        else:
+            self.results_reads += 1
+            content = self.content
+            
+        return {'Body': StreamingBody(io.BytesIO(content), len(content))}
+        
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.state_writes += 1
+        self.objects[Key] = Body
+        
+def refresh(handler, client, s3, stub, max_workers, label):
+    handler.fleet_cache.clear()
+    calls = stub.calls
+    results_reads = s3.results_reads
+    
+    start = time.perf_counter()
+    fleet = handler.get_fleet(0, 1_000_000, client, s3, max_workers)
+    duration = time.perf_counter() - start
+    
+    print(
+        f'    {label:<13} {duration:7.2f}s, {stub.calls - calls} API calls, '
+        f'{s3.results_reads - results_reads} results files read'
+    )
+    
+    return fleet
+        
+def run(handler, max_workers, num_schedulers=NUM_SCHEDULERS, api_rates=None, steady_state=True):
+    if api_rates is None:
+        api_rates = handler.API_RATES
+
+    stub = StubLookoutEquipment(num_schedulers, NUM_EXECUTIONS, API_LATENCY)
+    client = handler.ThrottledClient(stub, api_rates=api_rates)
+    s3 = StubS3()
+    
+    print(f'{num_schedulers} schedulers, {NUM_EXECUTIONS} executions each, {max_workers:2d} workers:')
+    
+    # The first refresh starts without any state and the next ones read the
+    # results files left over by the previous refreshes. Once every execution
+    # is counted (filled here without timing), only the new ones are read:
+    fleet = refresh(handler, client, s3, stub, max_workers, 'cold')
+    if not steady_state:
+        return
+    refresh(handler, client, s3, stub, max_workers, 'second')
+    counts = handler.get_results_counts('bucket', 'results.jsonl', s3)
+    state = {
+        str(int(execution['ScheduledStartTime'].timestamp())): counts
+        for execution in stub.executions[:handler.MAX_EXECUTIONS]
+    }
+    for scheduler in stub.schedulers:
+        handler.save_state(f'fleet-health/{scheduler["InferenceSchedulerName"]}', state, s3)
+    refresh(handler, client, s3, stub, max_workers, 'steady state')
+    
+    start = time.perf_counter()
+    handler.get_fleet(0, 1_000_000, client, s3, max_workers)
+    cached_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    html = handler.build_heat_table(fleet, 'anomaly_rate', True, 'arn')
+    render_duration = time.perf_counter() - start
+    
+    state_size = sum(len(body) for body in s3.objects.values()) / num_schedulers
+    print(
+        f'    {cached_duration*1000:6.2f}ms cached, {render_duration*1000:6.1f}ms render, '
+        f'{len(html)/1024:.0f} KB, {state_size/1024:.1f} KB of state per scheduler'
+    )
+    
+if __name__ == '__main__':
+    handler = load_handler()
+    
+    # Rate limiting caps the throughput: lift it to compare the pool sizes.
+    unlimited = {'list_inference_schedulers': 1000, 'list_inference_executions': 1000}
+    run(handler, max_workers=1, num_schedulers=20, api_rates=unlimited)
+    for max_workers in [4, 16, 64]:
+        run(handler, max_workers=max_workers, api_rates=unlimited)
+        
+    # With the default rates, listing the executions dominates:
+    run(handler, max_workers=16, num_schedulers=50, steady_state=False)
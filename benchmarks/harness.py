@@ -0,0 +1,436 @@
+# Runs the entry point of every Lambda function of the CloudWatch dashboards
+# offline, against in-memory stand-ins of Lookout for Equipment, S3,
+# CloudWatch, Synthetics, Lambda, EventBridge Scheduler and SES filled with a synthetic fleet of
+# models and schedulers. The harness plays a typical session (listing the
+# models and schedulers, creating their dashboards, opening them twice...):
+# the dashboards are opened by invoking the custom widgets found in the
+# bodies the handlers stored in CloudWatch, and the asynchronous invocations
+# they request (pre-rendering, canary provisioning) are run afterwards.
+#
+# For each invocation, the harness reports its latency, the number of AWS
+# calls by API and the number of bytes fetched from S3:
+#
+#     python benchmarks/harness.py
+#     python benchmarks/harness.py --models 20 --schedulers-per-model 5 --executions 96
+#     python benchmarks/harness.py --json harness-report.json
+#
+# The Lookout for Equipment client of the layer keeps its client-side rate
+# limits: waiting for a token is part of the reported latencies.
+import argparse
+import contextlib
+import datetime
+import glob
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+import uuid
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard')
+sys.path.insert(0, os.path.join(DASHBOARD, 'layers', 'lookoutequipment', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import boto3
+import synthetic
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+SNAPSHOT_BUCKET = 'snapshot-bucket'
+FUNCTION_PREFIX = 'l4e-dashboard-'
+
+# Handler file and entry point of each Lambda function:
+FUNCTIONS = {
+    'list-models': ('handler.py', 'create_model_dashboard'),
+    'list-schedulers': ('handler.py', 'create_scheduler_dashboard'),
+    'fleet-health': ('handler.py', 'get_fleet_health'),
+    'model-details': ('handler.py', 'display_model_details'),
+    'get-predictions': ('handler.py', 'get_predictions'),
+    'plot-ranked-signals': ('handler.py', 'plot_ranked_signals'),
+    'component-importance': ('handler.py', 'plot_component_importance'),
+    'plot-feature-importance': ('handler.py', 'plot_feature_importance'),
+    'plot-feature-importance-legend': ('handler.py', 'plot_feature_importance_legend'),
+    'scheduler-details': ('handler.py', 'get_scheduler_details'),
+    'scheduler-last-execution-details': ('handler.py', 'get_execution_summary'),
+    'process-snapshot': ('lambda_function.py', 'lambda_handler')
+}
+
+# Size in pixels of a CloudWatch dashboard grid unit:
+GRID_WIDTH = 60
+GRID_HEIGHT = 40
+
+class StubContext:
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.invoked_function_arn = f'arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{function_name}'
+
+class Harness:
+    """
+    Loads the Lambda functions of the dashboards with every boto3 client
+    replaced by an in-memory stand-in, and records the cost of each of their
+    invocations
+
+    Parameters:
+        run_id (string):
+            A prefix for the names of the synthetic resources, so that the
+            files cached by the handlers in /tmp are never reused
+        num_models (integer):
+            The number of models of the fleet
+        schedulers_per_model (integer):
+            The number of inference schedulers of each model
+        num_executions (integer):
+            The number of executions of each scheduler
+        num_ranges, num_signals, num_days (integer):
+            The size of the evaluation of each model
+        widget_cache (boolean):
+            Set to True to store the pre-rendered widgets in S3
+    """
+    def __init__(self,
+                 run_id,
+                 num_models=5,
+                 schedulers_per_model=2,
+                 num_executions=48,
+                 num_ranges=100,
+                 num_signals=20,
+                 num_days=90,
+                 widget_cache=True):
+        self.run_id = run_id
+        self.invocations = []
+        self.modules = dict()
+        self.backends = {
+            'lookoutequipment': synthetic.StubLookoutEquipment(),
+            's3': synthetic.StubS3(),
+            'cloudwatch': synthetic.StubCloudWatch(),
+            'synthetics': synthetic.StubSynthetics(creating_checks=2),
+            'lambda': synthetic.StubLambda(),
+            'scheduler': synthetic.StubScheduler(),
+            'dynamodb': synthetic.StubDynamoDB(),
+            'ses': synthetic.StubSES()
+        }
+        self.build_fleet(num_models, schedulers_per_model, num_executions, num_ranges, num_signals, num_days)
+
+        os.environ.update({
+            'AWS_DEFAULT_REGION': REGION,
+            'Stack': '',
+            'VERSION': 'harness',
+            'SYN_SOURCE_BUCKET': 'source-bucket',
+            'SYN_EXECUTION_ROLE': f'arn:aws:iam::{ACCOUNT_ID}:role/synthetics',
+            'SYN_ARTIFACT_S3_PATH': f's3://{SNAPSHOT_BUCKET}/synthetics/',
+            'SNAPSHOT_RUNS': 'Weekly',
+            'TargetEmail': 'user@example.com',
+            'SESRegion': REGION,
+            'PROVISIONING_SCHEDULER_ROLE_ARN': f'arn:aws:iam::{ACCOUNT_ID}:role/scheduler',
+            'STATE_S3_PATH': f's3://{SNAPSHOT_BUCKET}/state/',
+            'BUNDLE_LEASE_TABLE': 'l4e-dashboard-leases'
+        })
+        if widget_cache:
+            os.environ['WIDGET_CACHE_S3_PATH'] = f's3://{SNAPSHOT_BUCKET}/widgets/'
+        else:
+            os.environ.pop('WIDGET_CACHE_S3_PATH', None)
+
+        # The layer creates its clients when imported:
+        boto3.client = self.get_client
+        boto3.resource = self.get_client
+        import l4ecwcw
+
+    def build_fleet(self, num_models, schedulers_per_model, num_executions, num_ranges, num_signals, num_days):
+        l4e = self.backends['lookoutequipment']
+        s3 = self.backends['s3']
+        now = datetime.datetime.now(datetime.timezone.utc)
+        results = synthetic.generate_results_file(5, num_signals, '2022-06-01')
+        self.models = []
+        self.schedulers = []
+
+        for model_index in range(num_models):
+            model_name = f'{self.run_id}-model-{model_index:03d}'
+            predicted_ranges, start_date, end_date = synthetic.generate_predicted_ranges(
+                num_ranges, num_signals, num_days, seed=model_index
+            )
+            dataset_prefix = f'datasets/{model_name}/'
+            l4e.add_model(
+                model_name,
+                predicted_ranges,
+                start_date,
+                end_date,
+                dataset_prefix=dataset_prefix,
+                created_at=now - datetime.timedelta(days=model_index)
+            )
+            self.models.append(model_name)
+
+            # One sensor file per month:
+            timeseries_df = synthetic.generate_timeseries(num_signals, num_days, seed=model_index)
+            for month, month_df in timeseries_df.groupby(timeseries_df.index.to_period('M')):
+                s3.put(l4e.dataset_bucket, f'{dataset_prefix}{month}.csv', synthetic.generate_sensor_csv(month_df))
+
+            for scheduler_index in range(schedulers_per_model):
+                scheduler_name = f'{model_name}-scheduler-{scheduler_index}'
+                scheduler = l4e.add_scheduler(
+                    scheduler_name,
+                    model_name,
+                    num_executions,
+                    failure_rate=0.1,
+                    seed=scheduler_index
+                )
+                for execution in scheduler['executions']:
+                    result_object = execution['CustomerResultObject']
+                    s3.put(result_object['Bucket'], result_object['Key'], results)
+                self.schedulers.append(scheduler_name)
+
+        # Nothing fetched or counted while building the fleet:
+        s3.calls.clear()
+
+    def get_client(self, service_name, *args, **kwargs):
+        return self.backends[service_name]
+
+    def load_function(self, name):
+        """
+        Loads the handler of a Lambda function once, as in a warm execution
+        environment
+        """
+        if name not in self.modules:
+            fname, entry_point = FUNCTIONS[name]
+            directory = os.path.join(DASHBOARD, 'lambdas', name)
+            sys.path.insert(0, directory)
+            try:
+                spec = importlib.util.spec_from_file_location(
+                    f'harness_{name.replace("-", "_")}',
+                    os.path.join(directory, fname)
+                )
+                module = importlib.util.module_from_spec(spec)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    spec.loader.exec_module(module)
+            finally:
+                sys.path.remove(directory)
+
+            self.modules[name] = getattr(module, entry_point)
+
+        return self.modules[name]
+
+    def snapshot(self):
+        calls = dict()
+        for service, backend in self.backends.items():
+            for api, count in backend.calls.items():
+                calls[f'{service}:{api}'] = count
+
+        return calls, self.backends['s3'].bytes_fetched
+
+    def invoke(self, name, event, step, trigger='user'):
+        """
+        Invokes a Lambda function and records its cost, then runs the
+        asynchronous invocations it requested
+
+        Returns:
+            the response of the function, or None if it failed
+        """
+        function_name = f'{FUNCTION_PREFIX}{name}'
+        os.environ['AWS_LAMBDA_FUNCTION_NAME'] = function_name
+        cold_start = name not in self.modules
+        calls_before, bytes_before = self.snapshot()
+        start = time.perf_counter()
+        response = None
+        error = None
+
+        try:
+            entry_point = self.load_function(name)
+            with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                response = entry_point(event, StubContext(function_name))
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+
+        latency = time.perf_counter() - start
+        plt.close('all')
+        calls_after, bytes_after = self.snapshot()
+        calls = {
+            api: count - calls_before.get(api, 0)
+            for api, count in calls_after.items()
+            if count > calls_before.get(api, 0)
+        }
+
+        self.invocations.append({
+            'step': step,
+            'function': name,
+            'trigger': trigger,
+            'cold_start': cold_start,
+            'latency': latency,
+            'aws_calls': sum(calls.values()),
+            'calls': calls,
+            's3_bytes_fetched': bytes_after - bytes_before,
+            'response_bytes': len(json.dumps(response, default=str)) if response is not None else 0,
+            'error': error
+        })
+
+        # Asynchronous invocations requested by this function, then the
+        # delayed ones (one-time schedules), as if their time had come:
+        pending = self.backends['lambda'].invocations
+        scheduled = self.backends['scheduler'].pending
+        while len(pending) + len(scheduled) > 0:
+            if len(pending) > 0:
+                target, payload = pending.pop(0)
+                self.invoke(target[len(FUNCTION_PREFIX):], payload, step, trigger='async')
+            else:
+                target, payload = scheduled.pop(0)
+                self.invoke(target[len(FUNCTION_PREFIX):], payload, step, trigger='delayed')
+
+        return response
+
+    def open_dashboard(self, dashboard_name, step):
+        """
+        Invokes every custom widget of a dashboard stored in CloudWatch, as
+        the console does when the dashboard is opened
+        """
+        body = json.loads(self.backends['cloudwatch'].dashboards[dashboard_name])
+        for widget in body['widgets']:
+            if widget['type'] != 'custom':
+                continue
+
+            properties = widget['properties']
+            event = dict(properties.get('params', {}))
+            event['widgetContext'] = get_widget_context(
+                widget['width'] * GRID_WIDTH,
+                widget['height'] * GRID_HEIGHT,
+                dashboard_name=dashboard_name
+            )
+            function = properties['endpoint'].split(':')[-1]
+            self.invoke(function[len(FUNCTION_PREFIX):], event, step)
+
+    def run_session(self):
+        """
+        Plays a typical session over the synthetic fleet
+        """
+        model_name = self.models[0]
+        model_dashboard = f'L4E-Model-Dashboard-{model_name}'
+        scheduler_name = self.schedulers[0]
+        scheduler_dashboard = f'L4E-Scheduler-Dashboard-{scheduler_name}'
+
+        self.invoke('list-models', {'widgetContext': get_widget_context()}, 'list models')
+        self.invoke('list-models', {
+            'dashboard_name': model_dashboard,
+            'entity_name': model_name,
+            'dashboard_type': 'model',
+            'widgetContext': get_widget_context()
+        }, 'create model dashboard')
+        self.invoke('list-models', {
+            'provisioning_dashboard': model_dashboard,
+            'widgetContext': get_widget_context()
+        }, 'poll snapshot status')
+        self.open_dashboard(model_dashboard, 'open model dashboard')
+        self.open_dashboard(model_dashboard, 'refresh model dashboard')
+
+        self.invoke('list-schedulers', {'widgetContext': get_widget_context()}, 'list schedulers')
+        self.invoke('list-schedulers', {
+            'dashboard_name': scheduler_dashboard,
+            'scheduler_name': scheduler_name,
+            'action': 'create_dashboard',
+            'widgetContext': get_widget_context()
+        }, 'create scheduler dashboard')
+        self.invoke('list-schedulers', {
+            'provisioning_dashboard': scheduler_dashboard,
+            'widgetContext': get_widget_context()
+        }, 'poll scheduler snapshot')
+        self.invoke('list-schedulers', {
+            'scheduler_name': scheduler_name,
+            'action': 'stop_scheduler',
+            'widgetContext': get_widget_context()
+        }, 'stop scheduler')
+        self.open_dashboard(scheduler_dashboard, 'open scheduler dashboard')
+        self.open_dashboard(scheduler_dashboard, 'refresh scheduler dashboard')
+
+        self.invoke('fleet-health', {'widgetContext': get_widget_context()}, 'fleet health')
+        self.invoke('fleet-health', {
+            'sort_by': 'anomaly_rate',
+            'widgetContext': get_widget_context()
+        }, 'sort fleet health')
+
+        # The snapshot canary uploaded a screenshot of the model dashboard:
+        snapshot_key = f'synthetics/{model_dashboard}/{model_dashboard}-ModelEvaluation-harness'
+        self.backends['s3'].put(SNAPSHOT_BUCKET, snapshot_key, b'\x89PNG\r\n\x1a\n' + b'\x00' * 1024)
+        self.invoke('process-snapshot', {'Records': [{'s3': {
+            'bucket': {'name': SNAPSHOT_BUCKET},
+            'object': {'key': snapshot_key}
+        }}]}, 'email snapshot', trigger='s3')
+
+    def cleanup(self):
+        for fname in glob.glob(f'/tmp/*{self.run_id}-*'):
+            os.remove(fname)
+
+def get_widget_context(width=1200, height=400, days=90, dashboard_name='L4E-Dashboard'):
+    end = int(time.time() * 1000)
+    start = end - days * 24 * 3600 * 1000
+
+    return {
+        'dashboardName': dashboard_name,
+        'width': width,
+        'height': height,
+        'timeRange': {'start': start, 'end': end},
+        'forms': {'all': {}}
+    }
+
+def print_report(invocations):
+    print(
+        f'{"step":28s} | {"function":40s} | {"trigger":7s} | {"latency":>8s} | '
+        f'{"calls":>5s} | {"S3 bytes":>10s} | calls by API'
+    )
+    for i in invocations:
+        calls = ', '.join(f'{api} x{count}' for api, count in sorted(i['calls'].items()))
+        function = i['function'] + (' (cold)' if i['cold_start'] else '')
+        print(
+            f'{i["step"]:28s} | {function:40s} | {i["trigger"]:7s} | '
+            f'{i["latency"]:7.3f}s | {i["aws_calls"]:5d} | {i["s3_bytes_fetched"]:10d} | '
+            + (f'ERROR {i["error"]}' if i['error'] is not None else calls)
+        )
+
+    # Totals by function:
+    print()
+    print(f'{"function":40s} | {"invocations":>11s} | {"latency":>8s} | {"calls":>6s} | {"S3 bytes":>10s}')
+    functions = sorted(set(i['function'] for i in invocations))
+    for function in functions:
+        selected = [i for i in invocations if i['function'] == function]
+        print(
+            f'{function:40s} | {len(selected):11d} | '
+            f'{sum(i["latency"] for i in selected):7.3f}s | '
+            f'{sum(i["aws_calls"] for i in selected):6d} | '
+            f'{sum(i["s3_bytes_fetched"] for i in selected):10d}'
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the dashboards Lambda functions against local AWS stand-ins')
+    parser.add_argument('--models', type=int, default=5, help='Number of models of the fleet')
+    parser.add_argument('--schedulers-per-model', type=int, default=2, help='Number of schedulers of each model')
+    parser.add_argument('--executions', type=int, default=48, help='Number of executions of each scheduler')
+    parser.add_argument('--ranges', type=int, default=100, help='Number of predicted ranges of each model')
+    parser.add_argument('--signals', type=int, default=20, help='Number of signals of each model')
+    parser.add_argument('--days', type=int, default=90, help='Length of the evaluation period of each model')
+    parser.add_argument('--no-widget-cache', action='store_true', help='Do not store the pre-rendered widgets in S3')
+    parser.add_argument('--json', default=None, help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    harness = Harness(
+        run_id=f'harness-{uuid.uuid4().hex[:8]}',
+        num_models=args.models,
+        schedulers_per_model=args.schedulers_per_model,
+        num_executions=args.executions,
+        num_ranges=args.ranges,
+        num_signals=args.signals,
+        num_days=args.days,
+        widget_cache=not args.no_widget_cache
+    )
+    try:
+        harness.run_session()
+    finally:
+        harness.cleanup()
+
+    print_report(harness.invocations)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(harness.invocations, f, indent=2)
+
+    errors = [i for i in harness.invocations if i['error'] is not None]
+    sys.exit(1 if len(errors) > 0 else 0)
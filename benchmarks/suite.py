@@ -0,0 +1,751 @@
+# Benchmark suite of the hot paths of the dashboards layer, of the notebooks
+# utilities and of the widget handlers, run on synthetic data of increasing
+# size. Each case records its wall time (best of several runs), its peak
+# memory (traced Python and numpy allocations) and the size of its output,
+# and is compared against the baseline stored in `benchmarks/baseline.json`:
+#
+#     python benchmarks/suite.py                     # default sizes
+#     python benchmarks/suite.py --full              # up to 2 years and 100k result files
+#     python benchmarks/suite.py -k convert_ranges   # only the matching cases
+#     python benchmarks/suite.py --save-baseline     # stores the results as the new baseline
+#
+# The script exits with an error code when a case is slower, uses more
+# memory or produces a larger output than its baseline (beyond the given
+# tolerance). Wall times depend on the machine: refresh the baseline when
+# running the suite on a new one.
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard')
+BASELINE_FNAME = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.pop('WIDGET_CACHE_S3_PATH', None)
+sys.path.insert(0, os.path.join(DASHBOARD, 'layers', 'lookoutequipment', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'utils'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import boto3
+import component_diagnostics
+import l4ecwcw
+import lookout_equipment_utils
+import rolling_statistics
+import evaluation
+import inference_slicer
+import resampling
+import partition_registration
+import results_dataset
+import sensor_loader
+import signal_grading
+import training_data_writer
+import synthetic
+
+MODEL_NAME = 'benchmark-model'
+CASES = []
+TEMP_DIRS = []
+
+def benchmark(name, default, full=None):
+    """
+    Registers a benchmark case. The decorated function gets the parameters
+    of the case, prepares the data and returns a function without argument
+    running the measured code.
+
+    Parameters:
+        name (string):
+            The name of the case
+        default (dict):
+            The values of each parameter for the default run
+        full (dict):
+            The values of each parameter for the full run. Defaults to the
+            default values
+    """
+    def register(setup):
+        CASES.append((name, setup, default, full or default))
+        return setup
+
+    return register
+
+def get_grid(values):
+    names = list(values.keys())
+    for combination in itertools.product(*[values[n] for n in names]):
+        yield dict(zip(names, combination))
+
+def get_case_id(name, params):
+    params = ','.join(f'{k}={v}' for k, v in params.items())
+    return f'{name}[{params}]'
+
+def load_handler(function_name):
+    path = os.path.join(DASHBOARD, 'lambdas', function_name, 'handler.py')
+    spec = importlib.util.spec_from_file_location(function_name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+class StubContext:
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:l4e-dashboard-benchmark'
+
+def get_widget_event(width=1200, height=400, **params):
+    event = {'widgetContext': {'width': width, 'height': height, 'forms': {'all': {}}}}
+    event.update(params)
+
+    return event
+
+def use_stub_lookout_equipment(stub, *modules):
+    """
+    Replaces the Lookout for Equipment client of the layer and of the
+    handlers (which copied it with their star import). The stub is wrapped
+    in a ThrottledClient without rate limit, as the entry points publish
+    its metrics. Each run views the widgets from a cold execution
+    environment: the bundles and model versions kept by the layer are
+    dropped.
+    """
+    client = l4ecwcw.ThrottledClient(stub, api_rates={}, default_rate=1e9)
+    for module in (l4ecwcw,) + modules:
+        module.l4e_client = client
+    l4ecwcw.model_bundles.clear()
+    l4ecwcw.model_versions.clear()
+
+@contextlib.contextmanager
+def use_stub_s3(stub):
+    """
+    Makes every boto3 S3 client created during the run use an in-memory stub
+    """
+    client = boto3.client
+
+    def stub_client(service_name, *args, **kwargs):
+        if service_name == 's3':
+            return stub
+        return client(service_name, *args, **kwargs)
+
+    boto3.client = stub_client
+    try:
+        yield
+    finally:
+        boto3.client = client
+
+def get_output_size(output):
+    if output is None:
+        return 0
+    if isinstance(output, str):
+        return len(output.encode('utf-8'))
+    if isinstance(output, (bytes, bytearray)):
+        return len(output)
+    if isinstance(output, pd.DataFrame):
+        return int(output.memory_usage(deep=True).sum())
+    if isinstance(output, pd.Series):
+        return int(output.memory_usage(deep=True))
+    if isinstance(output, np.ndarray):
+        return output.nbytes
+    if isinstance(output, matplotlib.figure.Figure):
+        buffer = io.BytesIO()
+        output.savefig(buffer, format='png')
+        return len(buffer.getvalue())
+    if isinstance(output, (tuple, list)):
+        return sum(get_output_size(o) for o in output)
+    if isinstance(output, dict):
+        return len(json.dumps(output, default=str).encode('utf-8'))
+
+    return 0
+
+def measure(run, repeat):
+    """
+    Measures the best wall time over several runs, then the peak memory
+    during an additional traced run (tracing slows the code down)
+    """
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = run()
+            durations.append(time.perf_counter() - start)
+            output_size = get_output_size(output)
+            plt.close('all')
+            del output
+
+        tracemalloc.start()
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        plt.close('all')
+
+    return {
+        'wall_time': min(durations),
+        'peak_memory': peak_memory,
+        'output_size': output_size
+    }
+
+# ----------------------------------------------------------------------------
+# Layer functions
+# ----------------------------------------------------------------------------
+@benchmark(
+    'convert_ranges',
+    default={'num_ranges': [100, 1000], 'num_days': [7, 90]},
+    full={'num_ranges': [100, 1000, 10000], 'num_days': [7, 90, 730]}
+)
+def convert_ranges(num_ranges, num_days):
+    predicted_ranges, start_date, end_date = synthetic.generate_predicted_ranges(num_ranges, 1, num_days)
+    ranges_df = pd.DataFrame(predicted_ranges)[['start', 'end']]
+
+    return lambda: l4ecwcw.convert_ranges(ranges_df, start_date, end_date)
+
+@benchmark(
+    'expand_results',
+    default={'num_ranges': [100], 'num_signals': [20, 200]},
+    full={'num_ranges': [100, 1000], 'num_signals': [20, 200]}
+)
+def expand_results(num_ranges, num_signals):
+    predicted_ranges, _, _ = synthetic.generate_predicted_ranges(num_ranges, num_signals, 90)
+    df = pd.DataFrame(predicted_ranges)
+
+    return lambda: l4ecwcw.expand_results(df)
+
+# The diagnostics of the predicted ranges used to be expanded with
+# expand_signal_diagnostics(): they are now ranked with a SignalRanker.
+@benchmark(
+    'signal_ranker',
+    default={'num_ranges': [100, 1000], 'num_signals': [20, 200]},
+    full={'num_ranges': [100, 1000, 10000], 'num_signals': [20, 200, 1000]}
+)
+def signal_ranker(num_ranges, num_signals):
+    predicted_ranges, _, _ = synthetic.generate_predicted_ranges(num_ranges, num_signals, 90)
+
+    def run():
+        ranker = l4ecwcw.SignalRanker()
+        ranker.add_ranges(predicted_ranges)
+        return ranker.top(15)
+
+    return run
+
+@benchmark(
+    'get_daily_importance',
+    default={'num_ranges': [100, 1000], 'num_signals': [20, 200], 'num_days': [90]},
+    full={'num_ranges': [100, 1000, 10000], 'num_signals': [20, 200], 'num_days': [7, 90, 730]}
+)
+def get_daily_importance(num_ranges, num_signals, num_days):
+    predicted_ranges, start_date, end_date = synthetic.generate_predicted_ranges(
+        num_ranges, num_signals, num_days
+    )
+
+    return lambda: l4ecwcw.get_daily_importance(predicted_ranges, start_date, end_date)
+
+# ----------------------------------------------------------------------------
+# Notebooks utilities
+# ----------------------------------------------------------------------------
+@benchmark(
+    'plot_timeseries',
+    default={'num_ranges': [100], 'num_days': [7, 90]},
+    full={'num_ranges': [100, 1000], 'num_days': [7, 90, 730]}
+)
+def plot_timeseries(num_ranges, num_days):
+    timeseries_df = synthetic.generate_timeseries(1, num_days)
+    timeseries_df.columns = ['Value']
+    labels, _, _ = synthetic.generate_predicted_ranges(20, 1, num_days, seed=1)
+    predictions = [
+        pd.DataFrame(synthetic.generate_predicted_ranges(num_ranges, 1, num_days, seed=seed)[0])
+        for seed in [2, 3]
+    ]
+    shutdowns, _, _ = synthetic.generate_predicted_ranges(10, 1, num_days, seed=4)
+
+    def run():
+        fig, _ = lookout_equipment_utils.plot_timeseries(
+            timeseries_df,
+            'signal-000',
+            plot_rolling_avg=True,
+            labels_df=pd.DataFrame(labels),
+            predictions=predictions,
+            prediction_titles=['Model A', 'Model B'],
+            shutdown_ranges_df=pd.DataFrame(shutdowns)
+        )
+        return fig
+
+    return run
+
+@benchmark(
+    'rolling_statistics',
+    default={'num_days': [7, 90], 'freq': ['1min']},
+    full={'num_days': [7, 90, 730], 'freq': ['1s', '1min', '5min']}
+)
+def rolling_statistics_case(num_days, freq):
+    series = synthetic.generate_timeseries(1, num_days, freq=freq).iloc[:, 0]
+
+    def run():
+        # Memoization is not measured:
+        rolling_statistics._statistics_cache.clear()
+        statistics = rolling_statistics.get_rolling_statistics(series, '1D')
+        return statistics.mean(), statistics.std(), statistics.envelope()
+
+    return run
+
+@benchmark(
+    'sensor_loader',
+    default={'num_components': [100], 'num_files': [2]},
+    full={'num_components': [100, 500], 'num_files': [1, 12]}
+)
+def sensor_loader_case(num_components, num_files):
+    # One directory per component with 5 tags and 30 days of 5 minutes data
+    # split in several files, one component out of 10 sampled every 10 minutes:
+    root_dir = tempfile.mkdtemp(prefix='benchmark-sensors-')
+    TEMP_DIRS.append(root_dir)
+    for component in range(num_components):
+        component_dir = os.path.join(root_dir, f'component-{component:03d}')
+        os.makedirs(component_dir)
+        timeseries_df = synthetic.generate_timeseries(5, 30, seed=component)
+        timeseries_df.columns = [f'component-{component:03d}-{c}' for c in timeseries_df.columns]
+        if component % 10 == 0:
+            timeseries_df = timeseries_df.iloc[::2]
+
+        bounds = np.linspace(0, len(timeseries_df), num_files + 1).astype(int)
+        for i in range(num_files):
+            part_df = timeseries_df.iloc[bounds[i]:bounds[i + 1]]
+            with open(os.path.join(component_dir, f'file{i}.csv'), 'w') as f:
+                f.write(synthetic.generate_sensor_csv(part_df))
+
+    def run():
+        return sensor_loader.load_sensor_data(root_dir)
+
+    return run
+
+@benchmark(
+    'training_data_writer',
+    default={'num_days': [30], 'layout': ['component', 'tag'], 'compression': [None, 'gzip']},
+    full={'num_days': [30, 365], 'layout': ['component', 'tag'], 'compression': [None, 'gzip']}
+)
+def training_data_writer_case(num_days, layout, compression):
+    equipment_df = synthetic.generate_timeseries(10, num_days, freq='1min')
+    tags_description = {tag: f'component-{i % 3}' for i, tag in enumerate(equipment_df.columns)}
+
+    def run():
+        s3 = synthetic.StubS3()
+        training_data_writer.write_training_data(
+            equipment_df,
+            'benchmark-bucket',
+            'training-data/',
+            layout=layout,
+            tags_description=tags_description,
+            compression=compression,
+            part_size=training_data_writer.MIN_PART_SIZE,
+            client=s3
+        )
+        return b''.join(s3.objects.values())
+
+    return run
+
+@benchmark(
+    'inference_slicer',
+    default={'num_days': [7], 'num_components': [1, 4]},
+    full={'num_days': [7, 30], 'num_components': [1, 4]}
+)
+def inference_slicer_case(num_days, num_components):
+    # Backfilling a 5 minutes scheduler with 1 minute data:
+    inference_df = synthetic.generate_timeseries(20, num_days, freq='1min')
+    tags_description = {tag: f'component-{i % num_components}' for i, tag in enumerate(inference_df.columns)}
+
+    def run():
+        s3 = synthetic.StubS3()
+        inference_slicer.slice_inference_data(
+            inference_df,
+            freq='5min',
+            tags_description=tags_description,
+            bucket='benchmark-bucket',
+            prefix='inference-data/input/',
+            client=s3
+        )
+        return b''.join(s3.objects.values())
+
+    return run
+
+@benchmark(
+    'signal_grading',
+    default={'num_tags': [50], 'num_rows': [1000000]},
+    full={'num_tags': [50, 500], 'num_rows': [1000000]}
+)
+def signal_grading_case(num_tags, num_rows):
+    # Random walks (one out of 5 quantized) with 1% of missing values:
+    rng = np.random.default_rng(42)
+    values = rng.normal(size=(num_tags, num_rows)).astype(np.float32).cumsum(axis=1).T
+    values[:, ::5] = np.round(values[:, ::5])
+    values[rng.random(values.shape) < 0.01] = np.nan
+    sensors_df = pd.DataFrame(
+        values,
+        index=pd.date_range(synthetic.EVALUATION_START, periods=num_rows, freq='1min'),
+        columns=[f'signal-{i:03d}' for i in range(num_tags)]
+    )
+
+    def run():
+        return signal_grading.grade_signals(sensors_df)
+
+    return run
+
+@benchmark(
+    'resampling',
+    default={'num_tags': [50], 'num_days': [30], 'how': ['last', 'mean']},
+    full={'num_tags': [50, 500], 'num_days': [30, 180], 'how': ['last', 'mean', 'max']}
+)
+def resampling_case(num_tags, num_days, how):
+    # A third of the tags sampled every second, every minute and every 5
+    # minutes, aligned on a 5 minutes grid:
+    rng = np.random.default_rng(42)
+    index = pd.date_range(synthetic.EVALUATION_START, periods=num_days * 86400, freq='1s')
+    values = np.full((len(index), num_tags), np.nan)
+    for tag, rate in enumerate(np.resize([1, 60, 300], num_tags)):
+        values[::rate, tag] = rng.normal(size=len(values[::rate, tag]))
+    sensors_df = pd.DataFrame(values, index=index, columns=[f'signal-{i:03d}' for i in range(num_tags)])
+
+    def run():
+        return resampling.align_frame(sensors_df, 'PT5M', how=how, limit='15min')
+
+    return run
+
+@benchmark(
+    'event_evaluation',
+    default={'num_pairs': [2000], 'num_ranges': [300]},
+    full={'num_pairs': [2000, 20000], 'num_ranges': [300, 3000]}
+)
+def event_evaluation_case(num_pairs, num_ranges):
+    # Models x assets pairs over 90 days, with one labelled range for 15
+    # predicted ranges:
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp(synthetic.EVALUATION_START)
+    end = start + pd.Timedelta('90D')
+    minutes = int((end - start) / pd.Timedelta('1min'))
+
+    def get_ranges(num, max_length):
+        starts = start + pd.to_timedelta(rng.integers(0, minutes, num), unit='min')
+        return pd.DataFrame({
+            'start': starts,
+            'end': starts + pd.to_timedelta(rng.integers(0, max_length, num), unit='min')
+        })
+
+    pairs = [
+        ((f'model-{i // 10}', f'asset-{i % 10}'), get_ranges(num_ranges // 15, 3000), get_ranges(num_ranges, 600), start, end)
+        for i in range(num_pairs)
+    ]
+
+    def run():
+        return evaluation.evaluate_batch(pairs, lead_window='7D')
+
+    return run
+
+@benchmark(
+    'component_diagnostics',
+    default={'num_ranges': [1000, 10000], 'num_signals': [200]},
+    full={'num_ranges': [1000, 10000, 100000], 'num_signals': [20, 200]}
+)
+def component_diagnostics_case(num_ranges, num_signals):
+    # Diagnostics of every predicted range rolled up to 10 components:
+    predicted_ranges, _, _ = synthetic.generate_predicted_ranges(num_ranges, num_signals, 90)
+    predicted_ranges = pd.DataFrame(predicted_ranges)
+    tags_description = pd.DataFrame({
+        'Tag': [f'signal-{i:03d}' for i in range(num_signals)],
+        'Component': [f'component-{i % 10}' for i in range(num_signals)]
+    })
+
+    def run():
+        return component_diagnostics.aggregate_diagnostics(predicted_ranges, tags_description)
+
+    return run
+
+@benchmark(
+    'results_dataset',
+    default={'num_timestamps': [10000], 'num_signals': [30, 200]},
+    full={'num_timestamps': [10000, 100000], 'num_signals': [30, 200]}
+)
+def results_dataset_case(num_timestamps, num_signals):
+    # One minute results flattened into the long-format dataset:
+    content = synthetic.generate_results_file(num_timestamps, num_signals, synthetic.EVALUATION_START)
+    records = [json.loads(line) for line in content.splitlines()]
+
+    def run():
+        return results_dataset.flatten_results(records, 'benchmark-scheduler')
+
+    return run
+
+@benchmark(
+    'results_dataset_write',
+    default={'num_timestamps': [10000], 'num_signals': [30, 200]},
+    full={'num_timestamps': [10000, 100000], 'num_signals': [30, 200]}
+)
+def results_dataset_write_case(num_timestamps, num_signals):
+    # The flattened results written as one Parquet file per day (the
+    # output size is the size of the files written):
+    content = synthetic.generate_results_file(num_timestamps, num_signals, synthetic.EVALUATION_START)
+    records = [json.loads(line) for line in content.splitlines()]
+    results_df = results_dataset.flatten_results(records, 'benchmark-scheduler')
+
+    def run():
+        s3 = synthetic.StubS3()
+        results_dataset.write_partitions(results_df, 'results.parquet', bucket='benchmark-bucket', prefix='dataset/', client=s3)
+        return list(s3.objects.values())
+
+    return run
+
+@benchmark(
+    'partition_registration',
+    default={'num_schedulers': [10], 'num_days': [90, 730]},
+    full={'num_schedulers': [10, 100], 'num_days': [90, 730]}
+)
+def partition_registration_case(num_schedulers, num_days):
+    # A refresh of the results table: the files written by the last 5
+    # minutes executions of every scheduler over the last day, which is a
+    # new partition, are registered on top of the previous days:
+    glue = synthetic.StubGlue()
+    glue.create_database(DatabaseInput={'Name': 'benchmark'})
+    glue.create_table(
+        DatabaseName='benchmark',
+        TableInput=results_dataset.get_table_input('results', 's3://benchmark-bucket/dataset/')
+    )
+    dates = pd.date_range(synthetic.EVALUATION_START, periods=num_days, freq='1D').strftime('%Y-%m-%d')
+    schedulers = [f'scheduler-{i:03d}' for i in range(num_schedulers)]
+    partition_registration.PartitionRegistrar('benchmark', 'results', client=glue).register(
+        [(s, d) for s in schedulers for d in dates[:-1]]
+    )
+    keys = [
+        f'dataset/{results_dataset.get_partition_path(s, dates[-1])}{t:%Y%m%d%H%M%S}.parquet'
+        for s in schedulers
+        for t in pd.date_range(dates[-1], periods=288, freq='5min')
+    ]
+
+    def run():
+        # The new day is registered by the first run only, the following
+        # runs list the table and filter the keys:
+        registrar = partition_registration.PartitionRegistrar('benchmark', 'results', client=glue)
+        return registrar.register_keys(keys)
+
+    return run
+
+# ----------------------------------------------------------------------------
+# Widget handlers
+# ----------------------------------------------------------------------------
+def model_widget_benchmark(function_name, entry_point, width, height, **params):
+    def setup(num_ranges, num_signals, num_days):
+        handler = load_handler(function_name)
+        predicted_ranges, start_date, end_date = synthetic.generate_predicted_ranges(
+            num_ranges, num_signals, num_days
+        )
+        stub = synthetic.StubLookoutEquipment(predicted_ranges, start_date, end_date)
+        event = get_widget_event(width, height, model_name=MODEL_NAME, **params)
+
+        def run():
+            use_stub_lookout_equipment(stub, handler)
+            return getattr(handler, entry_point)(event, StubContext())
+
+        return run
+
+    return setup
+
+MODEL_WIDGETS_DEFAULT = {'num_ranges': [100, 1000], 'num_signals': [20, 200], 'num_days': [90]}
+MODEL_WIDGETS_FULL = {'num_ranges': [100, 1000, 10000], 'num_signals': [20, 200], 'num_days': [7, 90, 730]}
+
+benchmark('widget:plot-feature-importance', MODEL_WIDGETS_DEFAULT, MODEL_WIDGETS_FULL)(
+    model_widget_benchmark('plot-feature-importance', 'plot_feature_importance', 1200, 400)
+)
+benchmark('widget:plot-feature-importance-top15', MODEL_WIDGETS_DEFAULT, MODEL_WIDGETS_FULL)(
+    model_widget_benchmark('plot-feature-importance', 'plot_feature_importance', 1200, 400, top_k=15)
+)
+benchmark('widget:plot-ranked-signals', MODEL_WIDGETS_DEFAULT, MODEL_WIDGETS_FULL)(
+    model_widget_benchmark('plot-ranked-signals', 'plot_ranked_signals', 600, 400)
+)
+benchmark('widget:component-importance', MODEL_WIDGETS_DEFAULT, MODEL_WIDGETS_FULL)(
+    model_widget_benchmark('component-importance', 'plot_component_importance', 600, 300)
+)
+benchmark('widget:plot-feature-importance-legend', MODEL_WIDGETS_DEFAULT, MODEL_WIDGETS_FULL)(
+    model_widget_benchmark('plot-feature-importance-legend', 'plot_feature_importance_legend', 300, 400)
+)
+
+@benchmark(
+    'widget:get-predictions',
+    default={'num_ranges': [100], 'num_days': [7, 90]},
+    full={'num_ranges': [100, 1000], 'num_days': [7, 90, 730]}
+)
+def get_predictions(num_ranges, num_days):
+    handler = load_handler('get-predictions')
+    predicted_ranges, start_date, end_date = synthetic.generate_predicted_ranges(num_ranges, 20, num_days)
+    stub = synthetic.StubLookoutEquipment(predicted_ranges, start_date, end_date)
+
+    # One file of sensor data per month, as usually ingested:
+    s3 = synthetic.StubS3()
+    timeseries_df = synthetic.generate_timeseries(20, num_days)
+    for month, month_df in timeseries_df.groupby(timeseries_df.index.to_period('M')):
+        s3.put(stub.dataset_bucket, f'{stub.dataset_prefix}{month}.csv', synthetic.generate_sensor_csv(month_df))
+
+    event = get_widget_event(1200, 600, model_name=MODEL_NAME)
+
+    def run():
+        use_stub_lookout_equipment(stub, handler)
+        with use_stub_s3(s3):
+            return handler.get_predictions(event, StubContext())
+
+    return run
+
+@benchmark(
+    'widget:scheduler-last-execution-details',
+    default={'num_files': [100, 1000], 'num_signals': [50]},
+    full={'num_files': [100, 1000, 10000, 100000], 'num_signals': [50, 500]}
+)
+def scheduler_last_execution_details(num_files, num_signals):
+    handler = load_handler('scheduler-last-execution-details')
+    stub = synthetic.StubLookoutEquipment(num_executions=num_files)
+
+    # A 5 minutes scheduler with 1 minute data:
+    s3 = synthetic.StubS3()
+    content = synthetic.generate_results_file(5, num_signals, '2022-06-01')
+    for execution in stub.executions:
+        s3.put(execution['CustomerResultObject']['Bucket'], execution['CustomerResultObject']['Key'], content)
+
+    # The last anomaly is kept in the widget state (in /tmp here) by
+    # scheduler name: each run uses a new scheduler.
+    runs = itertools.count()
+
+    def run():
+        use_stub_lookout_equipment(stub, handler)
+        handler.s3_client = s3
+        event = get_widget_event(600, 400, scheduler_name=f'benchmark-scheduler-{os.getpid()}-{next(runs)}')
+        return handler.get_execution_summary(event, StubContext())
+
+    return run
+
+def cleanup():
+    for root_dir in TEMP_DIRS:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+    for fname in glob.glob(f'/tmp/last-anomaly_benchmark-scheduler-{os.getpid()}-*.json'):
+        os.remove(fname)
+
+# ----------------------------------------------------------------------------
+# Baseline comparison
+# ----------------------------------------------------------------------------
+METRICS = ['wall_time', 'peak_memory', 'output_size']
+
+# Changes below these absolute values are measurement noise, whatever the
+# relative change:
+NOISE_THRESHOLDS = {
+    'wall_time': 0.05,
+    'peak_memory': 1024 * 1024,
+    'output_size': 1024
+}
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FNAME):
+        return {'environment': {}, 'cases': {}}
+
+    with open(BASELINE_FNAME, 'r') as f:
+        return json.load(f)
+
+def save_baseline(baseline, results):
+    baseline['environment'] = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count()
+    }
+    baseline['cases'].update(results)
+    baseline['cases'] = dict(sorted(baseline['cases'].items()))
+
+    with open(BASELINE_FNAME, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+def compare(result, reference, tolerance):
+    """
+    Returns the relative change of each metric and the list of the metrics
+    regressing beyond the tolerance
+    """
+    changes = dict()
+    regressions = []
+    for metric in METRICS:
+        if reference is None or reference.get(metric, 0) == 0:
+            changes[metric] = None
+            continue
+
+        changes[metric] = result[metric] / reference[metric] - 1.0
+        noise = result[metric] - reference[metric] < NOISE_THRESHOLDS[metric]
+        if changes[metric] > tolerance and not noise:
+            regressions.append(metric)
+
+    return changes, regressions
+
+def format_change(change):
+    if change is None:
+        return '     new'
+    return f'{change * 100:+7.0f}%'
+
+def main(args):
+    baseline = load_baseline()
+    results = dict()
+    failures = []
+
+    for name, setup, default, full in CASES:
+        if args.k is not None and args.k not in name:
+            continue
+
+        for params in get_grid(full if args.full else default):
+            case_id = get_case_id(name, params)
+            try:
+                run = setup(**params)
+                result = measure(run, args.repeat)
+
+            except Exception as e:
+                print(f'{case_id:85s} | FAILED: {type(e).__name__}: {e}')
+                failures.append(case_id)
+                continue
+
+            finally:
+                cleanup()
+
+            results[case_id] = result
+            changes, regressions = compare(result, baseline['cases'].get(case_id), args.tolerance)
+            if len(regressions) > 0:
+                failures.append(case_id)
+
+            print(
+                f'{case_id:85s} | '
+                f'{result["wall_time"]:8.3f}s {format_change(changes["wall_time"])} | '
+                f'{result["peak_memory"] / 1024**2:8.1f} MB {format_change(changes["peak_memory"])} | '
+                f'{result["output_size"] / 1024:9.1f} KB {format_change(changes["output_size"])}'
+                + (f' | REGRESSION ({", ".join(regressions)})' if len(regressions) > 0 else '')
+            )
+
+    if args.save_baseline:
+        save_baseline(baseline, results)
+        print(f'Baseline saved to {BASELINE_FNAME}')
+        return 0
+
+    if len(failures) > 0:
+        print(f'{len(failures)} case(s) failed or regressed')
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the dashboards and utilities hot paths')
+    parser.add_argument('-k', default=None, help='Only run the cases with a name containing this string')
+    parser.add_argument('--full', action='store_true', help='Run the full (larger) parameter grids')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs of each case')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative change above which a metric regresses')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,688 @@
+# Synthetic Lookout for Equipment data used by the benchmarks: model
+# evaluations, sensor time series and inference results, with stubs of the
+# AWS clients serving them.
+import datetime
+import io
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+EVALUATION_START = pd.Timestamp('2021-01-01')
+COMPONENT_NAME = 'centrifugal-pump'
+
+def get_signal_names(num_signals):
+    return [f'{COMPONENT_NAME}\\signal-{i:03d}' for i in range(num_signals)]
+
+def generate_predicted_ranges(num_ranges,
+                              num_signals,
+                              num_days,
+                              max_duration=240,
+                              seed=42):
+    """
+    Generates the predicted ranges of a model evaluation: the ranges are
+    spread over the evaluation period, last up to `max_duration` minutes and
+    each of them has a diagnostic summing to 1.0
+
+    Returns:
+        tuple: the list of predicted ranges, the start and the end of the
+        evaluation period
+    """
+    rng = np.random.default_rng(seed)
+    start_date = EVALUATION_START
+    end_date = start_date + pd.Timedelta(days=num_days)
+
+    num_minutes = num_days * 24 * 60
+    starts = np.sort(rng.integers(0, num_minutes - max_duration, num_ranges))
+    durations = rng.integers(0, max_duration, num_ranges)
+    values = rng.dirichlet(np.ones(num_signals) * 0.3, size=num_ranges)
+    names = get_signal_names(num_signals)
+
+    predicted_ranges = []
+    for start, duration, diagnostic in zip(starts, durations, values):
+        range_start = start_date + pd.Timedelta(minutes=int(start))
+        range_end = range_start + pd.Timedelta(minutes=int(duration))
+        predicted_ranges.append({
+            'start': range_start.strftime('%Y-%m-%dT%H:%M:%S.000000'),
+            'end': range_end.strftime('%Y-%m-%dT%H:%M:%S.000000'),
+            'diagnostics': [
+                {'name': name, 'value': round(float(value), 5)}
+                for name, value in zip(names, diagnostic)
+            ]
+        })
+
+    return predicted_ranges, start_date, end_date
+
+def generate_timeseries(num_tags, num_days, freq='5min', seed=42):
+    """
+    Generates a wide dataframe of sensor data with one random walk per tag
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(
+        start=EVALUATION_START,
+        end=EVALUATION_START + pd.Timedelta(days=num_days),
+        freq=freq
+    )
+    values = rng.normal(size=(len(index), num_tags)).cumsum(axis=0)
+    columns = [name.split('\\')[-1] for name in get_signal_names(num_tags)]
+
+    return pd.DataFrame(values, index=index, columns=columns)
+
+def generate_results_file(num_timestamps,
+                          num_signals,
+                          start,
+                          freq='1min',
+                          anomaly_rate=0.2,
+                          seed=42):
+    """
+    Generates the content of an inference results file (JSON lines)
+    """
+    rng = np.random.default_rng(seed)
+    names = get_signal_names(num_signals)
+    lines = []
+    for i in range(num_timestamps):
+        timestamp = pd.Timestamp(start) + i * pd.Timedelta(freq)
+        record = {
+            'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S.000000'),
+            'prediction': int(rng.random() < anomaly_rate)
+        }
+        if record['prediction'] == 1:
+            values = rng.dirichlet(np.ones(num_signals))
+            record['diagnostics'] = [
+                {'name': name, 'value': round(float(value), 5)}
+                for name, value in zip(names, values)
+            ]
+        lines.append(json.dumps(record))
+
+    return '\n'.join(lines) + '\n'
+
+def generate_sensor_csv(timeseries_df):
+    """
+    Serializes a sensor dataframe as the CSV files ingested by Lookout for
+    Equipment (with a `Timestamp` column)
+    """
+    return timeseries_df.rename_axis('Timestamp').to_csv(
+        date_format='%Y-%m-%dT%H:%M:%S.%f'
+    )
+
+class StubBackend:
+    """
+    Base class of the stubbed AWS services: every API call is counted
+    """
+    def __init__(self):
+        self.calls = dict()
+        self.calls_lock = threading.Lock()
+
+    def count(self, api):
+        with self.calls_lock:
+            self.calls[api] = self.calls.get(api, 0) + 1
+
+class StubLookoutEquipment(StubBackend):
+    """
+    Serves synthetic models and inference schedulers with the same answers
+    as the Lookout for Equipment API. The model and scheduler given to the
+    constructor are served for any name that was not added explicitly with
+    `add_model()` or `add_scheduler()`.
+    """
+    def __init__(self,
+                 predicted_ranges=None,
+                 start_date=None,
+                 end_date=None,
+                 num_executions=0,
+                 results_bucket='results-bucket',
+                 dataset_bucket='dataset-bucket',
+                 dataset_prefix='dataset/'):
+        super().__init__()
+        self.results_bucket = results_bucket
+        self.dataset_bucket = dataset_bucket
+        self.dataset_prefix = dataset_prefix
+        self.models = dict()
+        self.schedulers = dict()
+
+        self.default_model = self.build_model(None, predicted_ranges, start_date, end_date)
+        self.default_scheduler = self.build_scheduler(None, None, num_executions)
+        self.executions = self.default_scheduler['executions']
+
+    def build_model(self, model_name, predicted_ranges, start_date, end_date, created_at=None):
+        return {
+            'name': model_name,
+            'predicted_ranges': predicted_ranges or [],
+            'start_date': start_date or EVALUATION_START,
+            'end_date': end_date or EVALUATION_START,
+            'created_at': created_at or datetime.datetime.now(datetime.timezone.utc),
+            'dataset_prefix': self.dataset_prefix
+        }
+
+    def build_scheduler(self, scheduler_name, model_name, num_executions, failure_rate=0.0, seed=42):
+        rng = np.random.default_rng(seed)
+        scheduled_end = datetime.datetime(2022, 6, 1, tzinfo=datetime.timezone.utc)
+        executions = []
+        for i in range(num_executions):
+            timestamp = scheduled_end - datetime.timedelta(minutes=5 * i)
+            status = 'FAILED' if rng.random() < failure_rate else 'SUCCESS'
+            executions.append({
+                'ScheduledStartTime': timestamp,
+                'Status': status,
+                'CustomerResultObject': {
+                    'Bucket': self.results_bucket,
+                    'Key': f'results/{scheduler_name}/{timestamp.strftime("%Y%m%d%H%M%S")}/results.jsonl'
+                }
+            })
+
+        return {
+            'name': scheduler_name,
+            'model_name': model_name,
+            'status': 'RUNNING',
+            'executions': executions
+        }
+
+    def add_model(self, model_name, predicted_ranges, start_date, end_date, dataset_prefix=None, created_at=None):
+        model = self.build_model(model_name, predicted_ranges, start_date, end_date, created_at)
+        if dataset_prefix is not None:
+            model['dataset_prefix'] = dataset_prefix
+        self.models[model_name] = model
+
+        return model
+
+    def add_scheduler(self, scheduler_name, model_name, num_executions, failure_rate=0.0, seed=42):
+        scheduler = self.build_scheduler(scheduler_name, model_name, num_executions, failure_rate, seed)
+        self.schedulers[scheduler_name] = scheduler
+
+        return scheduler
+
+    def get_model(self, model_name):
+        return self.models.get(model_name, self.default_model)
+
+    def get_scheduler(self, scheduler_name):
+        return self.schedulers.get(scheduler_name, self.default_scheduler)
+
+    def describe_model(self, ModelName):
+        self.count('describe_model')
+        model = self.get_model(ModelName)
+        predicted_ranges = model['predicted_ranges']
+        signals = []
+        if len(predicted_ranges) > 0:
+            signals = [d['name'] for d in predicted_ranges[0]['diagnostics']]
+
+        return {
+            'ModelName': ModelName,
+            'ModelArn': f'arn:aws:lookoutequipment:us-east-1:123456789012:model/{ModelName}',
+            'DatasetName': f'{ModelName}-dataset',
+            'Status': 'SUCCESS',
+            'CreatedAt': model['created_at'],
+            'TrainingDataStartTime': model['start_date'] - pd.Timedelta(days=180),
+            'TrainingDataEndTime': model['start_date'],
+            'EvaluationDataStartTime': model['start_date'].tz_localize('UTC'),
+            'EvaluationDataEndTime': model['end_date'].tz_localize('UTC'),
+            'ModelMetrics': json.dumps({'predicted_ranges': predicted_ranges}),
+            'Schema': json.dumps({'Components': [{
+                'ComponentName': COMPONENT_NAME,
+                'Columns': [{'Name': s.split('\\')[-1], 'Type': 'DOUBLE'} for s in signals]
+            }]})
+        }
+
+    def describe_dataset(self, DatasetName):
+        self.count('describe_dataset')
+        model = self.get_model(DatasetName[:-len('-dataset')])
+
+        return {
+            'DatasetName': DatasetName,
+            'IngestionInputConfiguration': {
+                'S3InputConfiguration': {
+                    'Bucket': self.dataset_bucket,
+                    'Prefix': model['dataset_prefix']
+                }
+            }
+        }
+
+    def list_models(self, **kwargs):
+        self.count('list_models')
+        return {'ModelSummaries': [{
+            'ModelName': name,
+            'DatasetName': f'{name}-dataset',
+            'Status': 'SUCCESS',
+            'CreatedAt': model['created_at']
+        } for name, model in self.models.items()]}
+
+    def list_tags_for_resource(self, ResourceArn):
+        self.count('list_tags_for_resource')
+        return {'Tags': []}
+
+    def list_inference_schedulers(self, **kwargs):
+        self.count('list_inference_schedulers')
+        summaries = [{
+            'InferenceSchedulerName': name,
+            'ModelName': scheduler['model_name'],
+            'Status': scheduler['status']
+        } for name, scheduler in self.schedulers.items()]
+
+        max_results = kwargs.get('MaxResults', 50)
+        index = int(kwargs.get('NextToken', 0))
+        response = {'InferenceSchedulerSummaries': summaries[index:index + max_results]}
+        if index + max_results < len(summaries):
+            response['NextToken'] = str(index + max_results)
+
+        return response
+
+    def describe_inference_scheduler(self, InferenceSchedulerName):
+        self.count('describe_inference_scheduler')
+        scheduler = self.get_scheduler(InferenceSchedulerName)
+
+        return {
+            'InferenceSchedulerName': InferenceSchedulerName,
+            'ModelName': scheduler['model_name'],
+            'Status': scheduler['status'],
+            'DataUploadFrequency': 'PT5M',
+            'DataInputConfiguration': {
+                'InputTimeZoneOffset': '+00:00',
+                'S3InputConfiguration': {
+                    'Bucket': 'inference-bucket',
+                    'Prefix': f'{InferenceSchedulerName}/input/'
+                },
+                'InferenceInputNameConfiguration': {
+                    'TimestampFormat': 'yyyyMMddHHmmss',
+                    'ComponentTimestampDelimiter': '_'
+                }
+            },
+            'DataOutputConfiguration': {
+                'S3OutputConfiguration': {
+                    'Bucket': self.results_bucket,
+                    'Prefix': f'results/{InferenceSchedulerName}/'
+                }
+            }
+        }
+
+    def start_inference_scheduler(self, InferenceSchedulerName):
+        self.count('start_inference_scheduler')
+        self.get_scheduler(InferenceSchedulerName)['status'] = 'RUNNING'
+        return {'Status': 'PENDING'}
+
+    def stop_inference_scheduler(self, InferenceSchedulerName):
+        self.count('stop_inference_scheduler')
+        self.get_scheduler(InferenceSchedulerName)['status'] = 'STOPPED'
+        return {'Status': 'STOPPING'}
+
+    def list_inference_executions(self, **kwargs):
+        self.count('list_inference_executions')
+        executions = self.get_scheduler(kwargs.get('InferenceSchedulerName'))['executions']
+        if 'Status' in kwargs:
+            executions = [e for e in executions if e['Status'] == kwargs['Status']]
+
+        max_results = kwargs.get('MaxResults', 50)
+        index = int(kwargs.get('NextToken', 0))
+        response = {
+            'InferenceExecutionSummaries': executions[index:index + max_results]
+        }
+        if index + max_results < len(executions):
+            response['NextToken'] = str(index + max_results)
+
+        return response
+
+class StubS3(StubBackend):
+    """
+    In-memory S3 bucket(s) answering the client and resource calls used by
+    the dashboards. Every call and the number of bytes fetched are counted.
+    """
+    def __init__(self, objects=None):
+        super().__init__()
+        self.objects = dict(objects or {})
+        self.bytes_fetched = 0
+        self.uploads = dict()
+        self.lock = threading.Lock()
+
+    def put(self, bucket, key, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.objects[(bucket, key)] = body
+
+    # Client API:
+    def get_object(self, Bucket, Key, **kwargs):
+        self.count('get_object')
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+        body = self.objects[(Bucket, Key)]
+        self.bytes_fetched += len(body)
+
+        return {
+            'Body': StreamingBody(io.BytesIO(body), len(body)),
+            'ContentLength': len(body)
+        }
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.count('put_object')
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        self.put(Bucket, Key, Body)
+
+        return {}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self.count('delete_object')
+        self.objects.pop((Bucket, Key), None)
+
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, StartAfter='', **kwargs):
+        self.count('list_objects_v2')
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix) and k > StartAfter)
+        index = int(ContinuationToken or 0)
+        page = keys[index:index + MaxKeys]
+        response = {'KeyCount': len(page)}
+        if len(page) > 0:
+            response['Contents'] = [
+                {'Key': k, 'Size': len(self.objects[(Bucket, k)])} for k in page
+            ]
+        if index + MaxKeys < len(keys):
+            response['NextContinuationToken'] = str(index + MaxKeys)
+
+        return response
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.count('create_multipart_upload')
+        with self.lock:
+            upload_id = str(len(self.uploads))
+            self.uploads[upload_id] = dict()
+
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self.count('upload_part')
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        with self.lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self.count('complete_multipart_upload')
+        with self.lock:
+            parts = self.uploads.pop(UploadId)
+        numbers = [p['PartNumber'] for p in MultipartUpload['Parts']]
+        if numbers != sorted(numbers) or set(numbers) != set(parts):
+            raise ClientError({'Error': {'Code': 'InvalidPartOrder'}}, 'CompleteMultipartUpload')
+
+        # Every part but the last one must be at least 5 MB:
+        if any(len(parts[n]) < 5 * 1024 * 1024 for n in numbers[:-1]):
+            raise ClientError({'Error': {'Code': 'EntityTooSmall'}}, 'CompleteMultipartUpload')
+        self.put(Bucket, Key, b''.join(parts[n] for n in numbers))
+
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self.count('abort_multipart_upload')
+        with self.lock:
+            self.uploads.pop(UploadId, None)
+
+        return {}
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        response = self.get_object(Bucket=Bucket, Key=Key)
+        with open(Filename, 'wb') as f:
+            f.write(response['Body'].read())
+
+    # Resource API:
+    def Object(self, bucket_name, key):
+        s3 = self
+
+        class StubObject:
+            def get(self):
+                return s3.get_object(Bucket=bucket_name, Key=key)
+
+        return StubObject()
+
+class StubCloudWatch(StubBackend):
+    """
+    Stores the dashboards created by the handlers and the metrics they emit
+    """
+    def __init__(self, dashboards=None):
+        super().__init__()
+        self.dashboards = dict(dashboards or {})
+        self.metrics = []
+
+    def list_dashboards(self, DashboardNamePrefix='', **kwargs):
+        self.count('list_dashboards')
+        return {'DashboardEntries': [
+            {'DashboardName': name}
+            for name in sorted(self.dashboards) if name.startswith(DashboardNamePrefix)
+        ]}
+
+    def put_dashboard(self, DashboardName, DashboardBody):
+        self.count('put_dashboard')
+        self.dashboards[DashboardName] = DashboardBody
+        return {'DashboardValidationMessages': []}
+
+    def put_metric_data(self, Namespace, MetricData):
+        self.count('put_metric_data')
+        self.metrics += MetricData
+        return {}
+
+class StubSynthetics(StubBackend):
+    """
+    Creates canaries which are ready to be started once their state was
+    checked `creating_checks` times (as soon as they exist by default)
+    """
+    def __init__(self, creating_checks=0):
+        super().__init__()
+        self.canaries = dict()
+        self.creating_checks = creating_checks
+        self.checks = dict()
+
+    def create_canary(self, **kwargs):
+        self.count('create_canary')
+        if kwargs['Name'] in self.canaries:
+            raise ClientError({'Error': {'Code': 'ConflictException'}}, 'CreateCanary')
+
+        self.canaries[kwargs['Name']] = 'CREATING' if self.creating_checks > 0 else 'READY'
+        self.checks[kwargs['Name']] = 0
+        return {'Canary': {'Name': kwargs['Name'], 'Status': {'State': 'CREATING'}}}
+
+    def get_canary(self, Name):
+        self.count('get_canary')
+        if Name not in self.canaries:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'GetCanary')
+
+        state = self.canaries[Name]
+        self.checks[Name] += 1
+        if state == 'CREATING' and self.checks[Name] >= self.creating_checks:
+            self.canaries[Name] = 'READY'
+
+        return {'Canary': {'Name': Name, 'Status': {'State': state}}}
+
+    def start_canary(self, Name):
+        self.count('start_canary')
+        if self.canaries[Name] not in ['READY', 'STOPPED']:
+            raise ClientError({'Error': {'Code': 'ConflictException'}}, 'StartCanary')
+        self.canaries[Name] = 'RUNNING'
+        return {}
+
+class StubLambda(StubBackend):
+    """
+    Queues the asynchronous invocations of other functions so that the
+    caller can run them after the current invocation
+    """
+    def __init__(self):
+        super().__init__()
+        self.invocations = []
+
+    def invoke(self, FunctionName, InvocationType='RequestResponse', Payload='{}'):
+        self.count('invoke')
+        self.invocations.append((FunctionName.split(':')[-1], json.loads(Payload)))
+        return {'StatusCode': 202}
+
+class StubScheduler(StubBackend):
+    """
+    Stores the one-time EventBridge Scheduler schedules created by the
+    functions: the caller runs the invocations they target in their order
+    of creation, as if their time had come
+    """
+    def __init__(self):
+        super().__init__()
+        self.schedules = dict()
+        self.pending = []
+
+    def create_schedule(self, Name, ScheduleExpression, Target, **kwargs):
+        self.count('create_schedule')
+        if Name in self.schedules:
+            raise ClientError({'Error': {'Code': 'ConflictException'}}, 'CreateSchedule')
+
+        self.schedules[Name] = {'ScheduleExpression': ScheduleExpression, 'Target': Target, **kwargs}
+        self.pending.append((Target['Arn'].split(':')[-1], json.loads(Target['Input'])))
+        return {'ScheduleArn': f'arn:aws:scheduler:::schedule/default/{Name}'}
+
+    def delete_schedule(self, Name, **kwargs):
+        self.count('delete_schedule')
+        if Name not in self.schedules:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'DeleteSchedule')
+
+        del self.schedules[Name]
+        return {}
+
+class StubSES(StubBackend):
+    def __init__(self):
+        super().__init__()
+        self.emails = []
+
+    def send_raw_email(self, **kwargs):
+        self.count('send_raw_email')
+        self.emails.append(kwargs)
+        return {'MessageId': str(len(self.emails))}
+
+class StubDynamoDB(StubBackend):
+    """
+    In-memory DynamoDB tables with the conditional writes used by the
+    leases: the conditions are `attribute_not_exists(...)` and `<` or `=`
+    comparisons, joined by `OR`
+    """
+    def __init__(self):
+        super().__init__()
+        self.tables = dict()
+        self.lock = threading.Lock()
+
+    def check_condition(self, item, expression, names, values):
+        if expression is None:
+            return True
+
+        for clause in expression.split(' OR '):
+            clause = clause.strip()
+            if clause.startswith('attribute_not_exists('):
+                name = names.get(clause[21:-1], clause[21:-1])
+                if (item is None) or (name not in item):
+                    return True
+                continue
+
+            name, operator, value = clause.split()
+            name = names.get(name, name)
+            if (item is None) or (name not in item):
+                continue
+            left = decode_attribute(item[name])
+            right = decode_attribute(values[value])
+            if (operator == '<' and left < right) or (operator == '=' and left == right):
+                return True
+
+        return False
+
+    def write_item(self, api, TableName, key, item, kwargs):
+        self.count(api)
+        with self.lock:
+            table = self.tables.setdefault(TableName, dict())
+            if not self.check_condition(
+                table.get(key),
+                kwargs.get('ConditionExpression'),
+                kwargs.get('ExpressionAttributeNames', {}),
+                kwargs.get('ExpressionAttributeValues', {})
+            ):
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, api)
+
+            if item is None:
+                table.pop(key, None)
+            else:
+                table[key] = item
+
+        return {}
+
+    def put_item(self, TableName, Item, **kwargs):
+        key = json.dumps(Item[next(iter(Item))], sort_keys=True)
+        return self.write_item('put_item', TableName, key, Item, kwargs)
+
+    def delete_item(self, TableName, Key, **kwargs):
+        key = json.dumps(next(iter(Key.values())), sort_keys=True)
+        return self.write_item('delete_item', TableName, key, None, kwargs)
+
+def decode_attribute(value):
+    if 'N' in value:
+        return float(value['N'])
+    return value['S']
+
+class StubGlue(StubBackend):
+    """
+    In-memory Glue data catalog: databases, tables and their partitions,
+    with the same answers (and errors) as the Glue API
+    """
+    def __init__(self):
+        super().__init__()
+        self.databases = dict()
+        self.tables = dict()
+        self.partitions = dict()
+
+    def create_database(self, DatabaseInput):
+        self.count('create_database')
+        if DatabaseInput['Name'] in self.databases:
+            raise ClientError({'Error': {'Code': 'AlreadyExistsException'}}, 'CreateDatabase')
+        self.databases[DatabaseInput['Name']] = DatabaseInput
+
+        return {}
+
+    def create_table(self, DatabaseName, TableInput):
+        self.count('create_table')
+        key = (DatabaseName, TableInput['Name'])
+        if key in self.tables:
+            raise ClientError({'Error': {'Code': 'AlreadyExistsException'}}, 'CreateTable')
+        self.tables[key] = TableInput
+        self.partitions[key] = dict()
+
+        return {}
+
+    def get_table(self, DatabaseName, Name):
+        self.count('get_table')
+        if (DatabaseName, Name) not in self.tables:
+            raise ClientError({'Error': {'Code': 'EntityNotFoundException'}}, 'GetTable')
+
+        return {'Table': dict(self.tables[(DatabaseName, Name)], DatabaseName=DatabaseName)}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        self.count('batch_create_partition')
+        if len(PartitionInputList) > 100:
+            raise ClientError({'Error': {'Code': 'ValidationException'}}, 'BatchCreatePartition')
+        partitions = self.partitions[(DatabaseName, TableName)]
+
+        errors = []
+        for partition_input in PartitionInputList:
+            values = tuple(partition_input['Values'])
+            if values in partitions:
+                errors.append({
+                    'PartitionValues': list(values),
+                    'ErrorDetail': {'ErrorCode': 'AlreadyExistsException', 'ErrorMessage': 'Partition already exists.'}
+                })
+            else:
+                partitions[values] = partition_input
+
+        return {'Errors': errors} if len(errors) > 0 else {}
+
+    def get_partitions(self, DatabaseName, TableName, NextToken=None, MaxResults=1000, **kwargs):
+        self.count('get_partitions')
+        partitions = sorted(self.partitions[(DatabaseName, TableName)].items())
+        index = int(NextToken or 0)
+        response = {'Partitions': [
+            dict(p, DatabaseName=DatabaseName, TableName=TableName)
+            for _, p in partitions[index:index + MaxResults]
+        ]}
+        if index + MaxResults < len(partitions):
+            response['NextToken'] = str(index + MaxResults)
+
+        return response
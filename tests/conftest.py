@@ -0,0 +1,12 @@
+# The tests run the layer of the dashboards and the notebook utilities
+# against the in-memory AWS stand-ins of the benchmarks:
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'apps', 'cloudwatch-dashboard', 'layers', 'lookoutequipment', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'utils'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.pop('WIDGET_CACHE_S3_PATH', None)
@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+import l4ecwcw
+import synthetic
+
+LEASE_ID = 'widgets-bucket/widgets/test-model/1654041600/bundle'
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    monkeypatch.setattr(l4ecwcw, 'BUNDLE_LEASE_TABLE', 'leases')
+
+    return synthetic.StubDynamoDB()
+
+def test_lease_is_exclusive(dynamodb):
+    assert l4ecwcw.acquire_bundle_lease(LEASE_ID, 'first', dynamodb)
+    assert not l4ecwcw.acquire_bundle_lease(LEASE_ID, 'second', dynamodb)
+
+    l4ecwcw.release_bundle_lease(LEASE_ID, 'first', dynamodb)
+    assert l4ecwcw.acquire_bundle_lease(LEASE_ID, 'second', dynamodb)
+
+def test_expired_lease_is_taken_over(dynamodb, monkeypatch):
+    assert l4ecwcw.acquire_bundle_lease(LEASE_ID, 'first', dynamodb)
+
+    now = l4ecwcw.time.time()
+    monkeypatch.setattr(l4ecwcw.time, 'time', lambda: now + l4ecwcw.BUNDLE_LEASE_DURATION + 1)
+    assert l4ecwcw.acquire_bundle_lease(LEASE_ID, 'second', dynamodb)
+
+    # The late release of the first owner keeps the lease of the second one:
+    l4ecwcw.release_bundle_lease(LEASE_ID, 'first', dynamodb)
+    assert not l4ecwcw.acquire_bundle_lease(LEASE_ID, 'third', dynamodb)
+    l4ecwcw.release_bundle_lease(LEASE_ID, 'second', dynamodb)
+    assert l4ecwcw.acquire_bundle_lease(LEASE_ID, 'third', dynamodb)
+
+def test_bundle_is_computed_once_per_environment(monkeypatch):
+    # Without S3 path, the widgets of a dashboard share the bundle kept in
+    # the execution environment:
+    l4e = synthetic.StubLookoutEquipment()
+    model = l4e.add_model('test-model', [], None, None)
+    monkeypatch.setattr(l4ecwcw, 'WIDGET_CACHE_S3_PATH', None)
+    monkeypatch.setattr(l4ecwcw, 'l4e_client', l4e)
+    monkeypatch.setattr(l4ecwcw, 'model_versions', dict())
+    monkeypatch.setattr(l4ecwcw, 'model_bundles', dict())
+
+    computed = []
+    def compute_model_bundle(model_name):
+        computed.append(model_name)
+        return {'model_name': model_name}
+    monkeypatch.setattr(l4ecwcw, 'compute_model_bundle', compute_model_bundle)
+
+    for _ in range(5):
+        assert l4ecwcw.get_model_bundle('test-model') == {'model_name': 'test-model'}
+    assert computed == ['test-model']
+
+    l4ecwcw.get_model_bundle('test-model', refresh=True)
+    assert len(computed) == 2
+
+    # A new model with the same name gets its own bundle:
+    model['created_at'] += datetime.timedelta(days=30)
+    monkeypatch.setattr(l4ecwcw, 'model_versions', dict())
+    l4ecwcw.get_model_bundle('test-model')
+    assert len(computed) == 3
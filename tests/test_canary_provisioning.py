@@ -0,0 +1,138 @@
+import pytest
+
+import l4ecwcw
+import synthetic
+
+FUNCTION_NAME = 'l4e-dashboard-list-models'
+CANARY_NAME = l4ecwcw.get_canary_name('modeleval-', 'L4E-Model-Dashboard-test')
+
+class StubContext:
+    invoked_function_arn = f'arn:aws:lambda:us-east-1:123456789012:function:{FUNCTION_NAME}'
+
+@pytest.fixture
+def clients(monkeypatch):
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', FUNCTION_NAME)
+    monkeypatch.setenv('PROVISIONING_SCHEDULER_ROLE_ARN', 'arn:aws:iam::123456789012:role/scheduler')
+
+    # No provisioning stage may wait for the canary:
+    def no_sleep(seconds):
+        raise AssertionError(f'Provisioning stage slept for {seconds}s')
+    monkeypatch.setattr(l4ecwcw.time, 'sleep', no_sleep)
+    l4ecwcw.load_environment(StubContext())
+
+    return {
+        'client': synthetic.StubSynthetics(creating_checks=3),
+        'lambda_client': synthetic.StubLambda(),
+        'scheduler_client': synthetic.StubScheduler()
+    }
+
+def run_provisioning(clients):
+    """
+    Runs the provisioning stages in the order they are requested, the
+    delayed ones once their schedule fires
+    """
+    stages = []
+    lambda_client = clients['lambda_client']
+    scheduler_client = clients['scheduler_client']
+    while len(lambda_client.invocations) + len(scheduler_client.pending) > 0:
+        if len(lambda_client.invocations) > 0:
+            _, event = lambda_client.invocations.pop(0)
+            trigger = 'async'
+        else:
+            _, event = scheduler_client.pending.pop(0)
+            trigger = 'delayed'
+
+        stages.append((trigger, event['canary_provisioning']['stage']))
+        l4ecwcw.process_canary_provisioning(event, **clients)
+
+    return stages
+
+def test_canary_is_started_once_created(clients):
+    l4ecwcw.provision_canary({'Name': CANARY_NAME}, lambda_client=clients['lambda_client'])
+    stages = run_provisioning(clients)
+
+    # The state checks are delayed by schedules, the start is immediate:
+    assert stages == [
+        ('async', 'create'),
+        ('delayed', 'wait'),
+        ('delayed', 'wait'),
+        ('delayed', 'wait'),
+        ('delayed', 'wait'),
+        ('async', 'start')
+    ]
+    assert clients['client'].canaries[CANARY_NAME] == 'RUNNING'
+    assert clients['client'].calls['create_canary'] == 1
+    assert clients['client'].calls['start_canary'] == 1
+
+    # Every schedule was deleted by the stage it triggered:
+    assert clients['scheduler_client'].calls['create_schedule'] == 4
+    assert clients['scheduler_client'].schedules == {}
+
+def test_schedules_back_off(clients, monkeypatch):
+    delays = []
+    schedule_provisioning_stage = l4ecwcw.schedule_provisioning_stage
+
+    def record_delay(event, delay=0, lambda_client=None, scheduler_client=None):
+        delays.append(delay)
+        return schedule_provisioning_stage(event, delay, lambda_client, scheduler_client)
+    monkeypatch.setattr(l4ecwcw, 'schedule_provisioning_stage', record_delay)
+
+    l4ecwcw.provision_canary({'Name': CANARY_NAME}, lambda_client=clients['lambda_client'])
+    run_provisioning(clients)
+
+    assert delays == [0, 30, 60, 120, 240, 0]
+
+def test_existing_canary_is_reused(clients):
+    clients['client'].create_canary(Name=CANARY_NAME)
+    l4ecwcw.provision_canary({'Name': CANARY_NAME}, lambda_client=clients['lambda_client'])
+    run_provisioning(clients)
+
+    assert clients['client'].calls['create_canary'] == 2
+    assert clients['client'].canaries[CANARY_NAME] == 'RUNNING'
+
+def test_provisioning_gives_up(clients):
+    clients['client'].creating_checks = l4ecwcw.CANARY_MAX_ATTEMPTS + 1
+    l4ecwcw.provision_canary({'Name': CANARY_NAME}, lambda_client=clients['lambda_client'])
+    stages = run_provisioning(clients)
+
+    assert stages.count(('delayed', 'wait')) == l4ecwcw.CANARY_MAX_ATTEMPTS
+    assert clients['client'].canaries[CANARY_NAME] == 'CREATING'
+    assert clients['scheduler_client'].schedules == {}
+
+def test_status_check_resumes_provisioning(clients, monkeypatch):
+    # Without scheduler role, the provisioning stops after the creation
+    # request and the canary is started by the next status check:
+    monkeypatch.delenv('PROVISIONING_SCHEDULER_ROLE_ARN')
+    clients['client'].creating_checks = 0
+    l4ecwcw.provision_canary({'Name': CANARY_NAME}, lambda_client=clients['lambda_client'])
+    stages = run_provisioning(clients)
+
+    assert stages == [('async', 'create')]
+    assert clients['client'].canaries[CANARY_NAME] == 'READY'
+
+    assert l4ecwcw.resume_canary_provisioning(CANARY_NAME, clients['client']) == 'STARTING'
+    assert clients['client'].canaries[CANARY_NAME] == 'RUNNING'
+    assert l4ecwcw.resume_canary_provisioning(CANARY_NAME, clients['client']) == 'RUNNING'
+
+def test_concurrent_starts_do_not_fail(clients, monkeypatch):
+    # A status check and the start stage both find the canary ready:
+    monkeypatch.delenv('PROVISIONING_SCHEDULER_ROLE_ARN')
+    synthetics = clients['client']
+    synthetics.creating_checks = 0
+    synthetics.create_canary(Name=CANARY_NAME)
+    start_stage = {'canary_provisioning': {'stage': 'start', 'attempt': 0, 'canary': {'Name': CANARY_NAME}}}
+
+    get_canary = synthetics.get_canary
+    def start_after_check(Name):
+        response = get_canary(Name)
+        l4ecwcw.process_canary_provisioning(start_stage, **clients)
+        return response
+    monkeypatch.setattr(synthetics, 'get_canary', start_after_check)
+
+    assert l4ecwcw.resume_canary_provisioning(CANARY_NAME, synthetics) == 'STARTING'
+    assert synthetics.calls['start_canary'] == 2
+    assert synthetics.canaries[CANARY_NAME] == 'RUNNING'
+
+    # The start stage running after the status check does not fail either:
+    monkeypatch.setattr(synthetics, 'get_canary', get_canary)
+    assert l4ecwcw.process_canary_provisioning(start_stage, **clients) == 'start'
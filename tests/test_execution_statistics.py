@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+import l4ecwcw
+import synthetic
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'apps', 'cloudwatch-dashboard', 'lambdas', 'scheduler-details'))
+import execution_statistics
+
+SCHEDULER_NAME = 'test-scheduler'
+
+@pytest.fixture
+def backends(monkeypatch):
+    s3 = synthetic.StubS3()
+    monkeypatch.setattr(l4ecwcw, 'STATE_S3_PATH', 's3://state-bucket/state/')
+    monkeypatch.setattr(l4ecwcw.boto3, 'client', lambda service_name, *args, **kwargs: s3)
+
+    l4e = synthetic.StubLookoutEquipment()
+    l4e.add_scheduler(SCHEDULER_NAME, 'test-model', num_executions=120, failure_rate=0.1)
+
+    return l4e, s3
+
+def test_statistics_are_shared_through_s3(backends):
+    l4e, s3 = backends
+    stats = execution_statistics.get_execution_statistics(SCHEDULER_NAME, l4e)
+    assert stats['count'] == 120
+    assert l4e.calls['list_inference_executions'] == 3
+    assert ('state-bucket', f'state/execution-statistics/{SCHEDULER_NAME}.json') in s3.objects
+
+    # Nothing is kept in the execution environment: the next call resumes
+    # from the statistics stored in S3 and only reads the newest page:
+    for fname in os.listdir('/tmp'):
+        assert not fname.startswith(f'execution-statistics_{SCHEDULER_NAME}')
+    assert execution_statistics.get_execution_statistics(SCHEDULER_NAME, l4e) == stats
+    assert l4e.calls['list_inference_executions'] == 4
+
+    # Unchanged statistics are not written again:
+    assert s3.calls['put_object'] == 1
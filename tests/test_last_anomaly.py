@@ -0,0 +1,79 @@
+import datetime
+import importlib.util
+import json
+import os
+
+import pytest
+
+import l4ecwcw
+import synthetic
+
+from conftest import ROOT
+
+SCHEDULER_NAME = 'test-scheduler'
+
+def load_handler():
+    path = os.path.join(ROOT, 'apps', 'cloudwatch-dashboard', 'lambdas', 'scheduler-last-execution-details', 'handler.py')
+    spec = importlib.util.spec_from_file_location('last_execution_details', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+def results_file(timestamps, anomalies):
+    lines = []
+    for timestamp in timestamps:
+        record = {'timestamp': timestamp, 'prediction': int(timestamp in anomalies)}
+        if record['prediction'] == 1:
+            record['diagnostics'] = [{'name': 'component\\signal', 'value': 1.0}]
+        lines.append(json.dumps(record))
+
+    return '\n'.join(lines) + '\n'
+
+@pytest.fixture
+def backends(monkeypatch):
+    monkeypatch.setattr(l4ecwcw, 'STATE_S3_PATH', 's3://state-bucket/state/')
+    handler = load_handler()
+    l4e = synthetic.StubLookoutEquipment()
+    scheduler = l4e.add_scheduler(SCHEDULER_NAME, 'test-model', num_executions=20)
+    s3 = synthetic.StubS3()
+
+    # Only the 6th newest execution detected anomalies:
+    for index, execution in enumerate(scheduler['executions']):
+        result_object = execution['CustomerResultObject']
+        anomalies = ['2022-05-31T23:31:00.000000', '2022-05-31T23:33:00.000000'] if index == 5 else []
+        content = results_file(['2022-05-31T23:31:00.000000', '2022-05-31T23:33:00.000000'], anomalies)
+        s3.put(result_object['Bucket'], result_object['Key'], content)
+
+    monkeypatch.setattr(handler, 'l4e_client', l4e)
+    monkeypatch.setattr(handler, 's3_client', s3)
+
+    return handler, l4e, s3
+
+def test_results_are_read_until_the_last_anomaly(backends):
+    handler, l4e, s3 = backends
+    anomaly = handler.get_last_anomaly(SCHEDULER_NAME)
+    assert anomaly['timestamp'] == '2022-05-31T23:33:00.000000'
+    assert s3.calls['get_object'] == 1 + 6
+
+    # A refresh only lists the executions: no new results to read
+    assert handler.get_last_anomaly(SCHEDULER_NAME) == anomaly
+    assert s3.calls['get_object'] == 1 + 6 + 1
+
+def test_new_executions_are_read_on_refresh(backends):
+    handler, l4e, s3 = backends
+    handler.get_last_anomaly(SCHEDULER_NAME)
+
+    executions = l4e.get_scheduler(SCHEDULER_NAME)['executions']
+    timestamp = executions[0]['ScheduledStartTime'] + datetime.timedelta(minutes=5)
+    key = f'results/{SCHEDULER_NAME}/new/results.jsonl'
+    executions.insert(0, {
+        'ScheduledStartTime': timestamp,
+        'Status': 'SUCCESS',
+        'CustomerResultObject': {'Bucket': 'results-bucket', 'Key': key}
+    })
+    s3.put('results-bucket', key, results_file(['2022-06-01T00:01:00.000000'], ['2022-06-01T00:01:00.000000']))
+
+    get_calls = s3.calls['get_object']
+    assert handler.get_last_anomaly(SCHEDULER_NAME)['timestamp'] == '2022-06-01T00:01:00.000000'
+    assert s3.calls['get_object'] == get_calls + 2
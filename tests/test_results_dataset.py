@@ -0,0 +1,59 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import partition_registration
+import results_dataset
+import synthetic
+
+SCHEDULER_NAME = 'test-scheduler'
+
+@pytest.fixture
+def results_df():
+    # Two days of one minute results, written as two partitions:
+    content = synthetic.generate_results_file(2 * 1440, 10, synthetic.EVALUATION_START)
+    records = [json.loads(line) for line in content.splitlines()]
+
+    return results_dataset.flatten_results(records, SCHEDULER_NAME)
+
+@pytest.fixture
+def glue():
+    glue = synthetic.StubGlue()
+    glue.create_database(DatabaseInput={'Name': 'test'})
+    results_dataset.create_results_table('test', 'results', 's3://dataset-bucket/dataset/', client=glue)
+
+    return glue
+
+def read_partition(s3, glue, values, fname):
+    partition = glue.partitions[('test', 'results')][values]
+    bucket, prefix = partition['StorageDescriptor']['Location'][5:].split('/', 1)
+    body = s3.get_object(Bucket=bucket, Key=f'{prefix}{fname}')['Body'].read()
+
+    return pd.read_parquet(io.BytesIO(body))
+
+def test_partitions_are_read_back_from_the_catalog(results_df, glue, tmp_path):
+    s3 = synthetic.StubS3()
+    partitions = results_dataset.write_partitions(
+        results_df,
+        'results.parquet',
+        output_dir=str(tmp_path),
+        bucket='dataset-bucket',
+        prefix='dataset/',
+        client=s3
+    )
+    assert len(partitions) == 2
+    registrar = partition_registration.PartitionRegistrar('test', 'results', client=glue)
+    assert registrar.register(partitions) == partitions
+
+    for scheduler_name, date in partitions:
+        expected_df = results_df[results_df['date'] == date][results_dataset.DATA_COLUMNS].reset_index(drop=True)
+        partition_df = read_partition(s3, glue, (scheduler_name, date), 'results.parquet')
+        pd.testing.assert_frame_equal(partition_df, expected_df, check_dtype=False, check_categorical=False)
+
+        # The local copy holds the same file:
+        path = results_dataset.get_partition_path(scheduler_name, date) + 'results.parquet'
+        assert (tmp_path / path).read_bytes() == s3.objects[('dataset-bucket', f'dataset/{path}')]
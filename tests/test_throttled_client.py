@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import pytest
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+import l4ecwcw
+
+class FlakyService:
+    """
+    Answers each API after failing with the given errors, and blocks its
+    calls until released to let identical calls overlap
+    """
+    def __init__(self, errors=None, latency=0.0):
+        self.errors = list(errors or [])
+        self.latency = latency
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def call(self, api, kwargs):
+        self.calls.append(api)
+        self.release.wait()
+        time.sleep(self.latency)
+        if len(self.errors) > 0:
+            raise self.errors.pop(0)
+
+        return {'api': api}
+
+    def describe_model(self, **kwargs):
+        return self.call('describe_model', kwargs)
+
+    def start_inference_scheduler(self, **kwargs):
+        return self.call('start_inference_scheduler', kwargs)
+
+def client_error(code, status):
+    return ClientError({
+        'Error': {'Code': code},
+        'ResponseMetadata': {'HTTPStatusCode': status}
+    }, 'DescribeModel')
+
+def test_transient_errors_are_retried():
+    service = FlakyService([
+        client_error('ThrottlingException', 400),
+        client_error('InternalServerException', 500),
+        client_error('SomethingUnexpected', 503),
+        ReadTimeoutError(endpoint_url='https://lookoutequipment')
+    ])
+    client = l4ecwcw.ThrottledClient(service, base_delay=0.001)
+
+    assert client.describe_model(ModelName='model') == {'api': 'describe_model'}
+    counters = client.get_counters('describe_model')
+    assert (counters['calls'], counters['throttles'], counters['errors'], counters['retries']) == (5, 1, 3, 4)
+
+def test_client_errors_are_not_retried():
+    service = FlakyService([client_error('ResourceNotFoundException', 400)])
+    client = l4ecwcw.ThrottledClient(service, base_delay=0.001)
+
+    with pytest.raises(ClientError):
+        client.describe_model(ModelName='model')
+    assert service.calls == ['describe_model']
+
+def test_latency_excludes_backoff(monkeypatch):
+    monkeypatch.setattr(l4ecwcw.random, 'uniform', lambda low, high: high)
+    service = FlakyService([client_error('ThrottlingException', 400)] * 3, latency=0.01)
+    client = l4ecwcw.ThrottledClient(service, base_delay=0.2, max_delay=0.2)
+
+    start = time.monotonic()
+    client.describe_model(ModelName='model')
+    duration = time.monotonic() - start
+
+    latency = client.get_counters('describe_model')['latency']
+    assert duration >= 0.6
+    assert 0.04 <= latency < 0.1
+
+def run_concurrently(client, api, num_threads=4):
+    client.client.release.clear()
+    threads = [
+        threading.Thread(target=getattr(client, api), kwargs={'InferenceSchedulerName': 'scheduler'})
+        for _ in range(num_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    client.client.release.set()
+    for thread in threads:
+        thread.join()
+
+def test_only_read_only_calls_are_coalesced():
+    client = l4ecwcw.ThrottledClient(FlakyService())
+
+    run_concurrently(client, 'describe_model')
+    assert client.client.calls.count('describe_model') == 1
+    assert client.get_counters('describe_model')['coalesced'] == 3
+
+    run_concurrently(client, 'start_inference_scheduler')
+    assert client.client.calls.count('start_inference_scheduler') == 4
+
+def test_metrics_are_emitted_by_the_entry_points(capsys, monkeypatch):
+    client = l4ecwcw.ThrottledClient(FlakyService([client_error('ThrottlingException', 400)]), base_delay=0.001)
+    monkeypatch.setattr(l4ecwcw, 'l4e_client', client)
+
+    @l4ecwcw.emit_api_metrics
+    def entry_point(event, context):
+        return client.describe_model(ModelName=event['model_name'])
+
+    entry_point({'model_name': 'model'}, None)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(records) == 1
+    assert records[0]['API'] == 'describe_model'
+    assert (records[0]['Calls'], records[0]['Throttles'], records[0]['Retries']) == (2, 1, 1)
+    assert records[0]['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'LookoutEquipment/Dashboards'
+
+    # The counters are reset once published:
+    assert client.counters == dict()
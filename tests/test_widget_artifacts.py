@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+
+import l4ecwcw
+import synthetic
+
+MODEL_NAME = 'test-model'
+SVG = '<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="1080pt" height="288pt" viewBox="0 0 1080 288" version="1.1">\n</svg>\n'
+
+@pytest.fixture
+def backends(monkeypatch):
+    l4e = synthetic.StubLookoutEquipment()
+    l4e.add_model(MODEL_NAME, [], None, None, created_at=datetime.datetime(2022, 6, 1, tzinfo=datetime.timezone.utc))
+    s3 = synthetic.StubS3()
+    monkeypatch.setattr(l4ecwcw, 'WIDGET_CACHE_S3_PATH', 's3://widgets-bucket/widgets/')
+    monkeypatch.setattr(l4ecwcw, 'l4e_client', l4e)
+    monkeypatch.setattr(l4ecwcw, 'model_versions', dict())
+
+    return l4e, s3
+
+def get_artifact(s3, width, height, renders):
+    def render(width, height):
+        renders.append((width, height))
+        return SVG
+
+    return l4ecwcw.get_widget_artifact('plot-ranked-signals', MODEL_NAME, width, height, render, client=s3)
+
+def test_close_sizes_share_an_artifact(backends):
+    l4e, s3 = backends
+    renders = []
+    payload = get_artifact(s3, 1396, 346, renders)
+    assert get_artifact(s3, 1440, 360, renders) == payload
+    assert get_artifact(s3, 1470, 351, renders) == payload
+    assert renders == [(1440, 360)]
+
+    # The SVG follows the width of the widget:
+    assert '<svg width="100%" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1080 288" version="1.1">' in payload
+
+def test_reused_model_name_gets_new_artifacts(backends, monkeypatch):
+    l4e, s3 = backends
+    renders = []
+    get_artifact(s3, 1440, 360, renders)
+
+    l4e.get_model(MODEL_NAME)['created_at'] += datetime.timedelta(days=30)
+    monkeypatch.setattr(l4ecwcw, 'model_versions', dict())
+    get_artifact(s3, 1440, 360, renders)
+    assert len(renders) == 2
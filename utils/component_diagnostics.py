@@ -0,0 +1,199 @@
+# Standard python and AWS imports:
+import numpy as np
+import pandas as pd
+
+class ComponentIndex:
+    """
+    Maps the signals found in the diagnostics of Lookout for Equipment (named
+    `asset\\tag`) to the components of a tags description. The index is
+    built once: each signal gets the integer code of its component and the
+    diagnostics of any number of events are then summed by component with a
+    single numpy.add.reduceat() over the signals sorted by component,
+    instead of splitting, merging and grouping the diagnostics event by
+    event.
+
+    PARAMS
+    ======
+        tags_description: dict or pandas.DataFrame
+            The component of each tag: either a dictionary (as returned by
+            sensor_loader.load_sensors()) or a dataframe with a tag and a
+            component column (e.g. the content of tags_description.csv)
+
+        tag_col, component_col: string (default to 'Tag' and 'Component')
+            The columns of the tags description dataframe
+    """
+    def __init__(self, tags_description, tag_col='Tag', component_col='Component'):
+        if isinstance(tags_description, pd.DataFrame):
+            tags_description = tags_description.drop_duplicates(subset=tag_col)
+            tags = tags_description[tag_col].astype(str).tolist()
+            components = tags_description[component_col].astype(str).tolist()
+        else:
+            tags = [str(tag) for tag in tags_description.keys()]
+            components = [str(component) for component in tags_description.values()]
+
+        self.tags = pd.Index(tags)
+        codes, self.components = pd.factorize(pd.Index(components), sort=True)
+        self.components = list(self.components)
+        self.tag_codes = codes.astype(np.int64)
+        self.layouts = dict()
+
+    @property
+    def num_components(self):
+        return len(self.components)
+
+    def get_codes(self, signals):
+        """
+        Returns the component code of each signal, -1 for the signals
+        missing from the tags description. Signals are looked up by their
+        full name first, then by their tag name (after the last backslash)
+        """
+        signals = pd.Index([str(signal) for signal in signals])
+        positions = self.tags.get_indexer(signals)
+        missing = positions < 0
+        if missing.any():
+            short_names = [signal.rpartition('\\')[2] for signal in signals[missing]]
+            positions[missing] = self.tags.get_indexer(short_names)
+
+        return np.where(positions >= 0, self.tag_codes[positions], -1)
+
+    def get_layout(self, signals):
+        """
+        Computes, once for a given list of signals, the order sorting the
+        signals by component and where each component starts in this order
+        """
+        key = tuple(signals)
+        if key not in self.layouts:
+            codes = self.get_codes(signals)
+            known = np.flatnonzero(codes >= 0)
+            order = known[np.argsort(codes[known], kind='stable')]
+            present, starts = np.unique(codes[order], return_index=True)
+            self.layouts[key] = (order, present, starts)
+
+        return self.layouts[key]
+
+    def aggregate(self, diagnostics, signals=None):
+        """
+        Sums the importance of the signals of each component, for every
+        event at once
+
+        PARAMS
+        ======
+            diagnostics: numpy.ndarray or pandas.DataFrame
+                A (events x signals) matrix of signal importance, e.g. as
+                returned by get_diagnostics_matrix() or the diagnostics
+                columns of the inference results of a scheduler
+
+            signals: list of strings (default to None)
+                The signal of each column of the matrix (the columns of the
+                dataframe are used when not provided)
+
+        RETURNS
+        =======
+            component_diagnostics: pandas.DataFrame
+                A (events x components) dataframe with the importance of
+                each component. The signals missing from the tags
+                description are ignored
+        """
+        index = None
+        if isinstance(diagnostics, pd.DataFrame):
+            index = diagnostics.index
+            if signals is None:
+                signals = diagnostics.columns
+            diagnostics = diagnostics.to_numpy(dtype=np.float64)
+        diagnostics = np.atleast_2d(np.asarray(diagnostics, dtype=np.float64))
+        if signals is None or len(signals) != diagnostics.shape[1]:
+            raise ValueError('Expecting the name of each signal of the diagnostics matrix')
+
+        order, present, starts = self.get_layout(signals)
+        totals = np.zeros((diagnostics.shape[0], self.num_components))
+        if len(order) > 0 and diagnostics.shape[0] > 0:
+            totals[:, present] = np.add.reduceat(diagnostics[:, order], starts, axis=1)
+
+        return pd.DataFrame(totals, index=index, columns=self.components)
+
+def get_diagnostics_matrix(diagnostics):
+    """
+    Unpacks the diagnostics of several events into a single matrix. All the
+    (name, value) pairs are flattened in one pass and placed in the matrix
+    with a single fancy-indexing assignment: events listing their signals
+    in different orders (or listing different signals) are supported
+
+    PARAMS
+    ======
+        diagnostics: pandas.DataFrame, pandas.Series or list
+            The `predicted_ranges` dataframe of a model evaluation (with a
+            `diagnostics` column) or a list with the diagnostics of each
+            event, each diagnostics being a list of dictionaries with a
+            `name` and a `value` key
+
+    RETURNS
+    =======
+        matrix: numpy.ndarray
+            A (events x signals) array with the importance of each signal,
+            0.0 for the signals missing from an event
+
+        signals: list of strings
+            The name of each column of the matrix, in their order of
+            appearance
+    """
+    if isinstance(diagnostics, pd.DataFrame):
+        diagnostics = diagnostics['diagnostics']
+    diagnostics = list(diagnostics)
+
+    lengths = np.fromiter((len(d) for d in diagnostics), dtype=np.int64, count=len(diagnostics))
+    num_items = int(lengths.sum())
+
+    # Column of each signal, in their order of appearance:
+    positions = dict()
+    columns = np.fromiter(
+        (positions.setdefault(item['name'], len(positions)) for event in diagnostics for item in event),
+        dtype=np.int64,
+        count=num_items
+    )
+    values = np.fromiter(
+        (item['value'] for event in diagnostics for item in event),
+        dtype=np.float64,
+        count=num_items
+    )
+    rows = np.repeat(np.arange(len(diagnostics)), lengths)
+
+    matrix = np.zeros((len(diagnostics), len(positions)))
+    matrix[rows, columns] = values
+
+    return matrix, list(positions)
+
+def aggregate_diagnostics(diagnostics, tags_description, index=None):
+    """
+    Rolls the diagnostics of several events up to the components of a
+    tags description
+
+    PARAMS
+    ======
+        diagnostics: pandas.DataFrame, pandas.Series or list
+            See get_diagnostics_matrix()
+
+        tags_description: dict, pandas.DataFrame or ComponentIndex
+            The component of each tag (see ComponentIndex)
+
+        index: array-like (default to None)
+            An index for the events (e.g. the start of each range), the
+            index of the `predicted_ranges` dataframe is used by default
+
+    RETURNS
+    =======
+        component_diagnostics: pandas.DataFrame
+            A (events x components) dataframe with the importance of each
+            component for each event
+    """
+    if index is None and isinstance(diagnostics, (pd.DataFrame, pd.Series)):
+        index = diagnostics.index
+
+    if not isinstance(tags_description, ComponentIndex):
+        tags_description = ComponentIndex(tags_description)
+
+    matrix, signals = get_diagnostics_matrix(diagnostics)
+    component_diagnostics = tags_description.aggregate(matrix, signals)
+    if index is not None:
+        component_diagnostics.index = index
+
+    return component_diagnostics
@@ -0,0 +1,272 @@
+# Standard python and AWS imports:
+import numpy as np
+import os
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from intervals import to_interval_set
+
+# Metrics computed by evaluate_events():
+EVENT_METRICS = [
+    'num_labels',
+    'num_predictions',
+    'detected_labels',
+    'matched_predictions',
+    'false_alarms',
+    'precision',
+    'recall',
+    'f1_score',
+    'false_alarms_per_day',
+    'mean_lead_time',
+    'median_lead_time',
+    'label_overlap_ratio',
+    'prediction_overlap_ratio'
+]
+
+# Kinds of the interval endpoints visited by the sweep. At equal times the
+# starts are visited before the ends: ranges are closed, two ranges sharing
+# a bound overlap.
+LABEL_START = 0
+PREDICTION_START = 1
+LABEL_END = 2
+PREDICTION_END = 3
+
+def sweep_intervals(label_starts, label_ends, prediction_starts, prediction_ends):
+    """
+    Sweeps over the sorted endpoints of labelled and predicted ranges. The
+    number of active ranges of each kind after each endpoint is derived from
+    cumulative counts of the starts and ends visited so far, which gives,
+    without any Python loop over the ranges:
+
+    * the duration during which both a labelled and a predicted range are
+      active
+    * for each predicted range, whether it overlaps a labelled range
+    * for each labelled range, the first predicted range overlapping it
+
+    The labelled ranges must be sorted by start, the predicted ranges must be
+    sorted and disjoint.
+
+    PARAMS
+    ======
+        label_starts, label_ends: numpy.array of numpy.datetime64
+            The labelled ranges
+
+        prediction_starts, prediction_ends: numpy.array of numpy.datetime64
+            The predicted ranges
+
+    RETURNS
+    =======
+        overlap: integer
+            Time during which both kinds of ranges are active (nanoseconds)
+
+        matched_predictions: numpy.array of booleans
+            True for the predicted ranges overlapping a labelled range
+
+        first_predictions: numpy.array of integers
+            Index of the first predicted range overlapping each labelled
+            range, -1 for the labelled ranges not detected
+    """
+    num_labels = len(label_starts)
+    num_predictions = len(prediction_starts)
+
+    times = np.concatenate([label_starts, prediction_starts, label_ends, prediction_ends])
+    times = times.astype('datetime64[ns]').view(np.int64)
+    kinds = np.repeat(
+        np.array([LABEL_START, PREDICTION_START, LABEL_END, PREDICTION_END], dtype=np.int8),
+        [num_labels, num_predictions, num_labels, num_predictions]
+    )
+
+    # Single sort of all the endpoints, by time then by kind:
+    order = np.lexsort((kinds, times))
+    times = times[order]
+    kinds = kinds[order]
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = np.arange(len(order))
+
+    started_labels = np.cumsum(kinds == LABEL_START)
+    started_predictions = np.cumsum(kinds == PREDICTION_START)
+    active_labels = started_labels - np.cumsum(kinds == LABEL_END)
+    active_predictions = started_predictions - np.cumsum(kinds == PREDICTION_END)
+
+    # Time between consecutive endpoints during which both are active:
+    both_active = (active_labels[:-1] > 0) & (active_predictions[:-1] > 0)
+    overlap = int(np.diff(times)[both_active].sum())
+
+    # A predicted range overlaps a labelled range active at its start or
+    # starting before its end:
+    offset = num_labels
+    at_start = positions[offset:offset + num_predictions]
+    offset = 2 * num_labels + num_predictions
+    at_end = positions[offset:offset + num_predictions]
+    matched_predictions = (
+        (active_labels[at_start] > 0)
+        | (started_labels[at_end] > started_labels[at_start])
+    )
+
+    # The first predicted range overlapping a labelled range is either the
+    # one active at its start, or the next one if it starts before its end:
+    at_start = positions[:num_labels]
+    at_end = positions[num_labels + num_predictions:2 * num_labels + num_predictions]
+    first_predictions = np.full(num_labels, -1, dtype=np.int64)
+    active = active_predictions[at_start] > 0
+    first_predictions[active] = started_predictions[at_start[active]] - 1
+    upcoming = ~active & (started_predictions[at_end] > started_predictions[at_start])
+    first_predictions[upcoming] = started_predictions[at_start[upcoming]]
+
+    return overlap, matched_predictions, first_predictions
+
+def evaluate_events(labels, predictions, start=None, end=None, lead_window=None):
+    """
+    Computes event-level metrics comparing the labelled ranges of an asset
+    with the ranges predicted by a model:
+
+    * Precision: ratio of the predicted events overlapping a labelled event
+    * Recall: ratio of the labelled events overlapped by a predicted event
+    * False alarms per day: predicted events overlapping no labelled event,
+      per day of the evaluation period
+    * Lead time: for each detected labelled event, how long before its
+      start the first predicted event overlapping it started (negative when
+      the event was detected after it started)
+    * Overlap ratios: time covered by both a labelled and a predicted range
+      over the total labelled time and over the total predicted time
+
+    PARAMS
+    ======
+        labels: pandas.DataFrame, IntervalSet or list
+            The labelled ranges (e.g. the content of a labels file)
+
+        predictions: pandas.DataFrame, IntervalSet or list
+            The predicted ranges (e.g. the `predicted_ranges` of a model)
+
+        start, end: string or pandas.Datetime (default: None)
+            The evaluation period: the ranges are clipped to this period.
+            If not provided, the period spanned by the ranges is used
+
+        lead_window: string or pandas.Timedelta (default: None)
+            If provided, a predicted event starting at most this long before
+            a labelled event (e.g. `7D`) is an early detection of it: it is
+            matched with the labelled event even if they do not overlap
+
+    RETURNS
+    =======
+        metrics: dict
+            The value of each metric (see EVENT_METRICS), lead times are
+            given in hours
+    """
+    labels = to_interval_set(labels).clip(start, end)
+    predictions = to_interval_set(predictions).clip(start, end)
+
+    # Labelled ranges extended backwards to catch the early detections (the
+    # extended ranges may overlap, but their starts stay sorted):
+    label_starts = labels.starts
+    if lead_window is not None:
+        label_starts = label_starts - np.timedelta64(pd.Timedelta(lead_window).value, 'ns')
+
+    overlap, matched_predictions, first_predictions = sweep_intervals(
+        label_starts,
+        labels.ends,
+        predictions.starts,
+        predictions.ends
+    )
+
+    # The overlap ratios only count the labelled ranges themselves:
+    if lead_window is not None:
+        overlap, _, _ = sweep_intervals(labels.starts, labels.ends, predictions.starts, predictions.ends)
+
+    num_labels = len(labels)
+    num_predictions = len(predictions)
+    detected = first_predictions >= 0
+    detected_labels = int(detected.sum())
+    matched = int(matched_predictions.sum())
+    lead_times = (
+        labels.starts[detected] - predictions.starts[first_predictions[detected]]
+    ).astype('timedelta64[ns]').view(np.int64) / 3.6e12
+
+    if start is None:
+        start = min([s[0] for s in [labels.starts, predictions.starts] if len(s) > 0], default=None)
+    if end is None:
+        end = max([e[-1] for e in [labels.ends, predictions.ends] if len(e) > 0], default=None)
+    days = 0.0
+    if start is not None and end is not None:
+        days = (pd.to_datetime(end) - pd.to_datetime(start)) / pd.Timedelta('1D')
+
+    precision = matched / num_predictions if num_predictions > 0 else np.nan
+    recall = detected_labels / num_labels if num_labels > 0 else np.nan
+    label_duration = labels.total_duration.value
+    prediction_duration = predictions.total_duration.value
+
+    return {
+        'num_labels': num_labels,
+        'num_predictions': num_predictions,
+        'detected_labels': detected_labels,
+        'matched_predictions': matched,
+        'false_alarms': num_predictions - matched,
+        'precision': precision,
+        'recall': recall,
+        'f1_score': (
+            2 * precision * recall / (precision + recall)
+            if precision + recall > 0 else np.nan
+        ),
+        'false_alarms_per_day': (num_predictions - matched) / days if days > 0 else np.nan,
+        'mean_lead_time': lead_times.mean() if len(lead_times) > 0 else np.nan,
+        'median_lead_time': np.median(lead_times) if len(lead_times) > 0 else np.nan,
+        'label_overlap_ratio': overlap / label_duration if label_duration > 0 else np.nan,
+        'prediction_overlap_ratio': overlap / prediction_duration if prediction_duration > 0 else np.nan
+    }
+
+def _evaluate_pair(pair, lead_window):
+    key, labels, predictions, start, end = pair
+
+    return evaluate_events(labels, predictions, start, end, lead_window)
+
+def evaluate_batch(pairs, lead_window=None, max_workers=None, processes=True, chunksize=64):
+    """
+    Evaluates many (model, asset) pairs at once, e.g. to compare models
+    tuned over a fleet of assets. The pairs are spread over a pool of
+    processes, by chunks to limit the communication overhead.
+
+    PARAMS
+    ======
+        pairs: iterable
+            A (key, labels, predictions, start, end) tuple for each pair,
+            the key (e.g. a (model, asset) tuple) identifies the pair in the
+            results. The ranges can be dataframes, interval sets or lists
+            (see evaluate_events())
+
+        lead_window: string or pandas.Timedelta (default: None)
+            See evaluate_events()
+
+        max_workers: integer (default to None)
+            Number of pairs evaluated concurrently, defaults to the number
+            of processors of the machine
+
+        processes: boolean (default to True)
+            Set to False to use a pool of threads instead of processes
+
+        chunksize: integer (default to 64)
+            Number of pairs sent at once to each process
+
+    RETURNS
+    =======
+        metrics_df: pandas.DataFrame
+            A dataframe with one row per pair (indexed by their key) and one
+            column per metric
+    """
+    pairs = list(pairs)
+    keys = [pair[0] for pair in pairs]
+    if len(pairs) == 0:
+        return pd.DataFrame(columns=EVENT_METRICS)
+
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    max_workers = min(max_workers or os.cpu_count() or 1, len(pairs))
+    with executor_class(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            _evaluate_pair,
+            pairs,
+            [lead_window] * len(pairs),
+            chunksize=chunksize
+        ))
+
+    index = pd.MultiIndex.from_tuples(keys) if isinstance(keys[0], tuple) else pd.Index(keys)
+
+    return pd.DataFrame(results, index=index, columns=EVENT_METRICS)
@@ -0,0 +1,255 @@
+# Standard python and AWS imports:
+import numpy as np
+import os
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Timestamp formats supported by the inference schedulers in the name of
+# their input files:
+TIMESTAMP_FORMATS = {
+    'EPOCH': None,
+    'yyyy-MM-dd-HH-mm-ss': '%Y-%m-%d-%H-%M-%S',
+    'yyyyMMddHHmmss': '%Y%m%d%H%M%S'
+}
+
+def get_timezone_offset(timezone_offset):
+    """
+    Converts a scheduler time zone offset (e.g. `+05:30` or `-08:00`) into
+    a pandas.Timedelta
+    """
+    if timezone_offset is None:
+        return pd.Timedelta(0)
+
+    sign = -1 if timezone_offset.startswith('-') else 1
+    hours, minutes = timezone_offset.lstrip('+-').split(':')
+
+    return sign * pd.Timedelta(hours=int(hours), minutes=int(minutes))
+
+def format_file_timestamps(timestamps, timestamp_format='yyyyMMddHHmmss', timezone_offset=None):
+    """
+    Formats the timestamps used in the name of the scheduler input files
+
+    PARAMS
+    ======
+        timestamps: pandas.DatetimeIndex
+            The start of each file (UTC)
+
+        timestamp_format: string (default to 'yyyyMMddHHmmss')
+            One of the formats supported by the schedulers: `EPOCH`,
+            `yyyy-MM-dd-HH-mm-ss` or `yyyyMMddHHmmss`
+
+        timezone_offset: string (default to None)
+            The time zone offset of the scheduler (e.g. `+05:30`): the file
+            names are expressed in this time zone. Epoch timestamps are
+            not affected
+
+    RETURNS
+    =======
+        formatted: list of strings
+            The formatted timestamps
+    """
+    if timestamp_format not in TIMESTAMP_FORMATS:
+        raise ValueError(
+            f'Unknown timestamp format: {timestamp_format}, expecting one of {list(TIMESTAMP_FORMATS)}'
+        )
+
+    if timestamp_format == 'EPOCH':
+        epochs = timestamps.asi8 // 10**9
+        return [str(epoch) for epoch in epochs]
+
+    local_timestamps = timestamps + get_timezone_offset(timezone_offset)
+
+    return list(local_timestamps.strftime(TIMESTAMP_FORMATS[timestamp_format]))
+
+def slice_inference_data(inference_df,
+                         freq='5min',
+                         component_name='sensors',
+                         tags_description=None,
+                         timestamp_format='yyyyMMddHHmmss',
+                         delimiter='_',
+                         timezone_offset=None,
+                         rebase_to=None,
+                         num_sequences=None,
+                         output_dir=None,
+                         bucket=None,
+                         prefix=None,
+                         date_format='%Y-%m-%dT%H:%M:%S.%f',
+                         chunk_rows=100000,
+                         max_workers=8,
+                         client=None):
+    """
+    Slices a sensor dataframe into the input files expected by an inference
+    scheduler: one file per scheduling period and per component, named
+    after the component and the start of the period.
+
+    The rows are assigned to their period (the timestamp floored to the
+    scheduling frequency) in a single pass over the sorted index, encoded
+    as CSV by large blocks and the files are written to a local directory
+    and/or to Amazon S3 by a pool of threads.
+
+    PARAMS
+    ======
+        inference_df: pandas.DataFrame
+            A dataframe with a datetime index (UTC) and one column per tag
+
+        freq: string (default to '5min')
+            The scheduling frequency: this must match the data upload
+            frequency of the scheduler
+
+        component_name: string (default to 'sensors')
+            Name of the component when no tags description is given
+
+        tags_description: dict (default to None)
+            The component of each tag: one file per component is written
+            for each period. If None, all the tags are written in a single
+            file per period
+
+        timestamp_format: string (default to 'yyyyMMddHHmmss')
+            Format of the timestamps in the file names: `EPOCH`,
+            `yyyy-MM-dd-HH-mm-ss` or `yyyyMMddHHmmss`
+
+        delimiter: string (default to '_')
+            The delimiter between the component name and the timestamp in
+            the file names
+
+        timezone_offset: string (default to None)
+            The time zone offset of the scheduler (e.g. `+05:30`) used in
+            the file names. The timestamps inside the files stay in UTC
+
+        rebase_to: datetime (default to None)
+            If given, the timestamps are shifted so that the first period
+            starts at this date (floored to the scheduling frequency): use
+            the current time to replay historical data with a running
+            scheduler
+
+        num_sequences: integer (default to None)
+            Only write the first periods found in the data
+
+        output_dir: string (default to None)
+            Local directory where the files are written
+
+        bucket: string (default to None)
+            Bucket where the files are uploaded
+
+        prefix: string (default to None)
+            Prefix of the input location of the scheduler
+
+        date_format: string (default to '%Y-%m-%dT%H:%M:%S.%f')
+            Format of the timestamps inside the files
+
+        chunk_rows: integer (default to 100000)
+            Approximate number of rows encoded at once
+
+        max_workers: integer (default to 8)
+            Number of files written concurrently
+
+        client: boto3 S3 client (default to None)
+            The client used for the uploads. A new one is created if None
+            and a bucket is given
+
+    RETURNS
+    =======
+        fnames: list
+            The names of the files written, sorted by period and component
+    """
+    if output_dir is None and bucket is None:
+        raise ValueError('Expecting an output directory and/or a bucket')
+
+    if bucket is not None and client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if prefix is not None and len(prefix) > 0 and not prefix.endswith('/'):
+        prefix += '/'
+
+    if not inference_df.index.is_monotonic_increasing:
+        inference_df = inference_df.sort_index()
+
+    # Period of each row, computed on the integer representation of the
+    # index: the boundaries between periods are found in a single pass
+    # over the sorted periods:
+    freq_ns = pd.Timedelta(freq).value
+    timestamps = inference_df.index
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert(None)
+    periods = timestamps.asi8 // freq_ns
+    boundaries = np.flatnonzero(np.diff(periods)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(periods)]])
+    if len(periods) == 0:
+        starts = ends = np.array([], dtype=np.int64)
+
+    if num_sequences is not None:
+        starts = starts[:num_sequences]
+        ends = ends[:num_sequences]
+
+    # Shifts all the timestamps so that the first period starts at the
+    # requested date:
+    shift = pd.Timedelta(0)
+    if rebase_to is not None and len(starts) > 0:
+        rebase_to = pd.Timestamp(rebase_to)
+        if rebase_to.tz is not None:
+            rebase_to = rebase_to.tz_convert(None)
+        shift = rebase_to.floor(freq) - pd.Timestamp(periods[0] * freq_ns)
+
+    period_starts = pd.DatetimeIndex(periods[starts] * freq_ns) + shift
+    file_timestamps = format_file_timestamps(period_starts, timestamp_format, timezone_offset)
+
+    # Timestamps are formatted once for all the files:
+    data_timestamps = (timestamps + shift).strftime(date_format)
+
+    if tags_description is None:
+        components = {component_name: list(inference_df.columns)}
+    else:
+        components = dict()
+        for tag in inference_df.columns:
+            components.setdefault(tags_description[tag], []).append(tag)
+
+    def write_file(fname, content):
+        if output_dir is not None:
+            with open(os.path.join(output_dir, fname), 'w') as f:
+                f.write(content)
+
+        if bucket is not None:
+            client.put_object(
+                Bucket=bucket,
+                Key=f'{prefix or ""}{fname}',
+                Body=content.encode('utf-8')
+            )
+
+        return fname
+
+    # The rows are encoded as CSV once, by blocks of consecutive periods
+    # holding about `chunk_rows` rows, then split between the files of
+    # each period:
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        block_start = 0
+        while block_start < len(starts):
+            block_end = np.searchsorted(starts, starts[block_start] + chunk_rows, side='left')
+            block_end = max(block_end, block_start + 1)
+            first_row = starts[block_start]
+            last_row = ends[block_end - 1]
+
+            for component, tags in components.items():
+                block_df = inference_df.iloc[first_row:last_row][tags]
+                block_df = block_df.set_axis(data_timestamps[first_row:last_row], axis='index')
+                header = ','.join(['Timestamp'] + [str(tag) for tag in tags]) + '\n'
+                lines = block_df.to_csv(header=False).split('\n')
+
+                for i in range(block_start, block_end):
+                    fname = f'{component}{delimiter}{file_timestamps[i]}.csv'
+                    rows = lines[starts[i] - first_row:ends[i] - first_row]
+                    content = header + '\n'.join(rows) + '\n'
+                    futures.append((i, executor.submit(write_file, fname, content)))
+
+            block_start = block_end
+
+        # Sorted by period, then by component:
+        fnames = [future.result() for _, future in sorted(futures, key=lambda f: f[0])]
+
+    return fnames
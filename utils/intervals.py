@@ -0,0 +1,367 @@
+# Standard python and AWS imports:
+import numpy as np
+import pandas as pd
+
+def to_datetime64(values):
+    """
+    Converts timestamps (strings, datetimes, epochs in nanoseconds...) into
+    a numpy.array of naive UTC numpy.datetime64
+    """
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]', copy=False)
+
+    timestamps = pd.to_datetime(pd.Index(values))
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert(None)
+
+    return np.asarray(timestamps, dtype='datetime64[ns]')
+
+def to_timestamp64(value):
+    """
+    Converts a single timestamp into a naive UTC numpy.datetime64
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert(None)
+
+    return np.datetime64(timestamp.value, 'ns')
+
+class IntervalSet:
+    """
+    A set of time ranges (labelled anomalies, predicted events, shutdown
+    periods...) stored as sorted arrays of starts and ends. Overlapping and
+    adjacent ranges are merged when the set is built, so the ranges are
+    disjoint and both arrays are sorted: point and range queries are binary
+    searches and the set operations are array operations over the bounds,
+    no range is ever visited in a Python loop.
+
+    Ranges are closed: a range includes both its start and its end.
+
+    PARAMS
+    ======
+        starts, ends: array-like
+            The start and end of each range, in any order
+
+        tolerance: string or pandas.Timedelta (default: None)
+            Ranges separated by at most this duration are merged (e.g. `1min`
+            to merge the consecutive ranges of 1 minute data)
+    """
+    def __init__(self, starts=(), ends=(), tolerance=None):
+        starts = to_datetime64(starts)
+        ends = to_datetime64(ends)
+        if len(starts) != len(ends):
+            raise ValueError('Expecting as many starts as ends')
+
+        valid = starts <= ends
+        self.starts, self.ends = merge_intervals(starts[valid], ends[valid], tolerance)
+
+    @classmethod
+    def from_sorted(cls, starts, ends):
+        """
+        Builds a set from arrays of numpy.datetime64 already sorted and
+        disjoint, without merging them again
+        """
+        interval_set = cls.__new__(cls)
+        interval_set.starts = starts
+        interval_set.ends = ends
+
+        return interval_set
+
+    @classmethod
+    def from_dataframe(cls, ranges_df, start_col='start', end_col='end', tolerance=None):
+        """
+        Builds a set from a dataframe with one range per row (e.g. a labels
+        file or the predicted ranges of a model)
+        """
+        if (start_col not in ranges_df.columns) and (ranges_df.shape[1] >= 2):
+            start_col, end_col = ranges_df.columns[:2]
+
+        return cls(ranges_df[start_col], ranges_df[end_col], tolerance)
+
+    @classmethod
+    def from_records(cls, records, tolerance=None):
+        """
+        Builds a set from a list of ranges, each given as a dictionary with
+        a `start` and an `end` key (e.g. the annotations exported by Label
+        Studio or the `predicted_ranges` of a model) or as a pair
+        """
+        records = list(records)
+        if len(records) > 0 and isinstance(records[0], dict):
+            starts = [r['start'] for r in records]
+            ends = [r['end'] for r in records]
+        else:
+            starts = [r[0] for r in records]
+            ends = [r[1] for r in records]
+
+        return cls(starts, ends, tolerance)
+
+    @classmethod
+    def from_csv(cls, fname, tolerance=None):
+        """
+        Reads a labels file with one range per line and no header, as
+        expected by Lookout for Equipment
+        """
+        ranges_df = pd.read_csv(fname, header=None, names=['start', 'end'])
+
+        return cls(ranges_df['start'], ranges_df['end'], tolerance)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(pd.to_datetime(self.starts), pd.to_datetime(self.ends))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, IntervalSet)
+            and np.array_equal(self.starts, other.starts)
+            and np.array_equal(self.ends, other.ends)
+        )
+
+    def __repr__(self):
+        return f'IntervalSet({len(self)} ranges, {self.total_duration})'
+
+    @property
+    def durations(self):
+        return pd.to_timedelta(self.ends - self.starts)
+
+    @property
+    def total_duration(self):
+        return pd.Timedelta(int((self.ends - self.starts).view(np.int64).sum()))
+
+    def to_dataframe(self):
+        """
+        Returns the ranges as a dataframe with a `start` and an `end` column
+        """
+        return pd.DataFrame({
+            'start': pd.to_datetime(self.starts),
+            'end': pd.to_datetime(self.ends)
+        })
+
+    def contains(self, timestamps):
+        """
+        Checks which timestamps fall within a range of the set, with one
+        binary search per timestamp
+
+        PARAMS
+        ======
+            timestamps: array-like
+                The timestamps to check
+
+        RETURNS
+        =======
+            covered: numpy.array of booleans
+                True for the timestamps falling within a range
+        """
+        timestamps = to_datetime64(np.atleast_1d(timestamps))
+        position = np.searchsorted(self.starts, timestamps, side='right') - 1
+        if len(self.starts) == 0:
+            return np.zeros(len(timestamps), dtype=bool)
+
+        return (position >= 0) & (timestamps <= self.ends[np.maximum(position, 0)])
+
+    def find_overlaps(self, start, end):
+        """
+        Locates the ranges of the set overlapping a query range, with two
+        binary searches: the ranges being sorted and disjoint, both their
+        starts and their ends are sorted
+
+        PARAMS
+        ======
+            start, end: timestamps or array-like
+                The bounds of one or several query ranges
+
+        RETURNS
+        =======
+            first, last: integer or numpy.array of integers
+                The ranges self.starts[first:last] overlap each query range
+        """
+        first = np.searchsorted(self.ends, to_datetime64(np.atleast_1d(start)), side='left')
+        last = np.searchsorted(self.starts, to_datetime64(np.atleast_1d(end)), side='right')
+        last = np.maximum(first, last)
+        if np.ndim(start) == 0:
+            return int(first[0]), int(last[0])
+
+        return first, last
+
+    def overlaps(self, start, end):
+        """
+        Checks whether query ranges overlap at least one range of the set
+        """
+        first, last = self.find_overlaps(start, end)
+
+        return last > first
+
+    def clip(self, start=None, end=None):
+        """
+        Returns the part of the set within a time window, only the ranges
+        overlapping the window are visited
+        """
+        first, last = 0, len(self)
+        if start is not None:
+            start = to_timestamp64(start)
+            first = np.searchsorted(self.ends, start, side='left')
+        if end is not None:
+            end = to_timestamp64(end)
+            last = np.searchsorted(self.starts, end, side='right')
+        last = max(first, last)
+
+        starts = self.starts[first:last].copy()
+        ends = self.ends[first:last].copy()
+        if len(starts) > 0 and start is not None:
+            starts[0] = max(starts[0], start)
+        if len(ends) > 0 and end is not None:
+            ends[-1] = min(ends[-1], end)
+
+        return IntervalSet.from_sorted(starts, ends)
+
+    def union(self, other, tolerance=None):
+        """
+        Returns the ranges covered by either set
+        """
+        starts, ends = merge_intervals(
+            np.concatenate([self.starts, other.starts]),
+            np.concatenate([self.ends, other.ends]),
+            tolerance
+        )
+
+        return IntervalSet.from_sorted(starts, ends)
+
+    def intersection(self, other):
+        """
+        Returns the ranges covered by both sets. Each range of this set is
+        matched with the ranges of the other set it overlaps (two binary
+        searches), the matching pairs are then built all at once
+        """
+        first, last = other.find_overlaps(self.starts, self.ends)
+        counts = last - first
+        rows = np.repeat(np.arange(len(self)), counts)
+        other_rows = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+
+        starts = np.maximum(self.starts[rows], other.starts[other_rows])
+        ends = np.minimum(self.ends[rows], other.ends[other_rows])
+
+        return IntervalSet.from_sorted(starts, ends)
+
+    def complement(self, start, end):
+        """
+        Returns the gaps between the ranges of the set within a time window
+        """
+        start = to_timestamp64(start)
+        end = to_timestamp64(end)
+        clipped = self.clip(start, end)
+
+        starts = np.concatenate([[start], clipped.ends])
+        ends = np.concatenate([clipped.starts, [end]])
+        keep = starts < ends
+
+        return IntervalSet.from_sorted(starts[keep], ends[keep])
+
+    def difference(self, other):
+        """
+        Removes the ranges of another set (e.g. shutdown periods) from this
+        set. The bounds shared with the removed ranges are kept, ranges
+        reduced to a single timestamp are dropped
+        """
+        if len(self) == 0 or len(other) == 0:
+            return self
+
+        gaps = other.complement(
+            min(self.starts[0], other.starts[0]),
+            max(self.ends[-1], other.ends[-1])
+        )
+        remaining = self.intersection(gaps)
+        keep = remaining.starts < remaining.ends
+
+        return IntervalSet.from_sorted(remaining.starts[keep], remaining.ends[keep])
+
+    def rasterize(self, index):
+        """
+        Converts the set into a binary signal sampled on a time index: 1.0
+        for the timestamps falling within a range, 0.0 otherwise
+        """
+        return self.contains(np.asarray(index, dtype='datetime64[ns]')).astype(np.float64)
+
+    def plot(self, ax, start, end, color, label=None):
+        """
+        Plots the set as a step signal going from 0 to 1 during each range.
+        Only the range bounds are drawn, whatever the length of the plotted
+        period.
+
+        PARAMS
+        ======
+            ax: matplotlib.pyplot.Axis
+                The axis to draw the ranges on
+
+            start, end: pandas.Datetime
+                The plotted period
+
+            color: string
+                The color of the step line and of the filled area
+
+            label: string (default: None)
+                The label of the filled area in the legend
+        """
+        clipped = self.clip(start, end)
+        x = np.empty(2 * len(clipped) + 2, dtype='datetime64[ns]')
+        x[0] = to_timestamp64(start)
+        x[1:-1:2] = clipped.starts
+        x[2:-1:2] = clipped.ends
+        x[-1] = to_timestamp64(end)
+
+        y = np.zeros(len(x))
+        y[1:-1:2] = 1.0
+
+        ax.plot(x, y, drawstyle='steps-post', color=color, linewidth=0.5)
+        ax.fill_between(x, y1=y, y2=0, step='post', alpha=0.1, color=color, label=label)
+
+def to_interval_set(ranges, tolerance=None):
+    """
+    Returns an IntervalSet from an IntervalSet, a ranges dataframe or a list
+    of ranges
+    """
+    if isinstance(ranges, IntervalSet):
+        return ranges
+
+    elif isinstance(ranges, pd.DataFrame):
+        return IntervalSet.from_dataframe(ranges, tolerance=tolerance)
+
+    return IntervalSet.from_records(ranges, tolerance=tolerance)
+
+def merge_intervals(starts, ends, tolerance=None):
+    """
+    Sorts a set of ranges and merges the ones that overlap or touch each
+    other.
+
+    PARAMS
+    ======
+        starts, ends: numpy.array of numpy.datetime64
+            The start and end of each range
+
+        tolerance: string or pandas.Timedelta (default: None)
+            Ranges separated by at most this duration are also merged
+
+    RETURNS
+    =======
+        starts, ends: numpy.array of numpy.datetime64
+            The start and end of each merged range, sorted by start
+    """
+    if len(starts) == 0:
+        return starts, ends
+
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = ends[order]
+
+    # A new range begins when its start is after all the previous ends:
+    running_end = np.maximum.accumulate(ends)
+    gap = starts[1:] - running_end[:-1]
+    new_interval = np.ones(len(starts), dtype=bool)
+    if tolerance is None:
+        new_interval[1:] = gap > np.timedelta64(0, 'ns')
+    else:
+        new_interval[1:] = gap > np.timedelta64(pd.Timedelta(tolerance).value, 'ns')
+    first = np.flatnonzero(new_interval)
+    last = np.append(first[1:], len(starts)) - 1
+
+    return starts[first], running_end[last]
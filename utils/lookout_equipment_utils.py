@@ -1,10 +1,15 @@
 # Standard python and AWS imports:
 import matplotlib.pyplot as plt
 import numpy as np
+import os
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
+from intervals import IntervalSet, to_interval_set
 from matplotlib.dates import DateFormatter
 from matplotlib import gridspec
+from multiprocessing import shared_memory
+from rolling_statistics import plot_rolling_statistics
 
 def plot_timeseries(
     timeseries_df,
@@ -20,7 +25,9 @@ def plot_timeseries(
     prediction_titles=None,
     shutdown_ranges_df=None,
     evaluation_color=None,
-    evaluation_alpha=0.5
+    evaluation_alpha=0.5,
+    rolling_window='1D',
+    plot_rolling_envelope=False
 ):
     """
     This function plots a time series signal with a line plot and can combine
@@ -45,13 +52,21 @@ def plot_timeseries(
         plot_rolling_avg: boolean (default: False)
             If set to true, will add a rolling average curve on top of the
             line plot for the time series.
+            
+        rolling_window: string or pandas.Timedelta (default: '1D')
+            The length of the rolling average window. The window is based
+            on time, whatever the sampling rate of the time series.
+            
+        plot_rolling_envelope: boolean (default: False)
+            If set to true, will also fill the area between the rolling 
+            minimum and maximum of the time series.
         
-        labels_df: pandas.DataFrame (default: None)
+        labels_df: pandas.DataFrame or IntervalSet (default: None)
             If provided, this is a dataframe with all the labelled anomalies.
             This will be rendered as a filled-in plots below the time series
             itself.
         
-        predictions: pandas.DataFrame or list of pandas.DataFrame
+        predictions: pandas.DataFrame, IntervalSet or a list of them
             If provided, this is a dataframe with all the predicted anomalies.
             This will be rendered as a filled-in plots below the time series
             itself.
@@ -106,7 +121,7 @@ def plot_timeseries(
         nb_plots += 1
         
     if predictions is not None:
-        if type(predictions) == pd.core.frame.DataFrame:
+        if isinstance(predictions, (pd.DataFrame, IntervalSet)):
             fig_height += 1
             height_ratios += [1.5]
             nb_plots += 1
@@ -146,19 +161,14 @@ def plot_timeseries(
         ax[0].plot(data['Value'], linewidth=0.5, alpha=0.8, label=tag_name)
     ax[0].set_xlim(start, end)
     
-    # Plot a daily rolling average:
+    # Plot a rolling average (daily by default):
     if plot_rolling_avg == True:
-        daily_rolling_average = data['Value'].rolling(window=60*24).mean()
-        ax[0].plot(data.index, 
-                   daily_rolling_average, 
-                   alpha=0.5, 
-                   color='white', 
-                   linewidth=3)
-        ax[0].plot(data.index, 
-                   daily_rolling_average, 
-                   label='Daily rolling leverage', 
-                   color='tab:red', 
-                   linewidth=1)
+        plot_rolling_statistics(ax[0], 
+                                data['Value'], 
+                                window=rolling_window, 
+                                envelope=plot_rolling_envelope,
+                                color='tab:red', 
+                                label=f'Rolling average ({rolling_window})')
 
     # Configure custom grid:
     ax_id = 0
@@ -176,27 +186,13 @@ def plot_timeseries(
     # Add the labels on a second plot:
     if labels_df is not None:
         ax_id += 1
-        label_index = pd.date_range(
-            start=data.index.min(), 
-            end=data.index.max(), 
-            freq='1min'
-        )
-        label_data = pd.DataFrame(index=label_index)
-        label_data.loc[:, 'Label'] = 0.0
-
-        for index, row in labels_df.iterrows():
-            event_start = row['start']
-            event_end = row['end']
-            label_data.loc[event_start:event_end, 'Label'] = 1.0
-            
-        ax[ax_id].plot(label_data['Label'], color='tab:green', linewidth=0.5)
+        labels = to_interval_set(labels_df)
+        labels.plot(ax[ax_id], 
+                    data.index.min(), 
+                    data.index.max(), 
+                    color='tab:green', 
+                    label='Real anomaly range (label)')
         ax[ax_id].set_xlim(start, end)
-        ax[ax_id].fill_between(label_index, 
-                               y1=label_data['Label'], 
-                               y2=0, 
-                               alpha=0.1, 
-                               color='tab:green', 
-                               label='Real anomaly range (label)')
         ax[ax_id].axes.get_xaxis().set_ticks([])
         ax[ax_id].axes.get_yaxis().set_ticks([])
         ax[ax_id].set_xlabel('Anomaly ranges (labels)', fontsize=12)
@@ -204,67 +200,218 @@ def plot_timeseries(
     # Add the labels (anomaly range) on a 
     # third plot located below the main ones:
     if predictions is not None:
-        pred_index = pd.date_range(
-            start=data.index.min(), 
-            end=data.index.max(), 
-            freq='1min')
-        pred_data = pd.DataFrame(index=pred_index)
-        
-        if type(predictions) == pd.core.frame.DataFrame:
+        if isinstance(predictions, (pd.DataFrame, IntervalSet)):
+            predictions_list = [predictions]
+            titles = ['Anomaly ranges (Prediction)']
+            shutdowns = None
+            
+        elif type(predictions) == list:
+            predictions_list = predictions
+            titles = prediction_titles
+            shutdowns = None
+            if shutdown_ranges_df is not None:
+                shutdowns = to_interval_set(shutdown_ranges_df)
+            
+        for prediction_index, p in enumerate(predictions_list):
             ax_id += 1
-            pred_data.loc[:, 'prediction'] = 0.0
-
-            for index, row in predictions.iterrows():
-                event_start = row['start']
-                event_end = row['end']
-                pred_data.loc[event_start:event_end, 'prediction'] = 1.0
-
-            ax[ax_id].plot(pred_data['prediction'], 
-                           color='tab:red',
-                           linewidth=0.5)
+            predicted = to_interval_set(p)
+            
+            # Shutdown periods are removed from the predicted ranges:
+            if shutdowns is not None:
+                predicted = predicted.difference(shutdowns)
+                
+            predicted.plot(ax[ax_id], 
+                           data.index.min(), 
+                           data.index.max(), 
+                           color='tab:red')
             ax[ax_id].set_xlim(start, end)
-            ax[ax_id].fill_between(pred_index, 
-                                   y1=pred_data['prediction'],
-                                   y2=0, 
-                                   alpha=0.1, 
-                                   color='tab:red')
             ax[ax_id].axes.get_xaxis().set_ticks([])
             ax[ax_id].axes.get_yaxis().set_ticks([])
-            ax[ax_id].set_xlabel('Anomaly ranges (Prediction)', fontsize=12)
-            
-        elif type(predictions) == list:
-            for prediction_index, p in enumerate(predictions):
-                ax_id += 1
-                pred_data.loc[:, 'prediction'] = 0.0
-
-                for index, row in p.iterrows():
-                    event_start = row['start']
-                    event_end = row['end']
-                    pred_data.loc[event_start:event_end, 'prediction'] = 1.0
-                    
-                if shutdown_ranges_df is not None:
-                    for index, row in shutdown_ranges_df.iterrows():
-                        shutdown_start = row['start']
-                        shutdown_end = row['end']
-                        pred_data.loc[shutdown_start:shutdown_end, 'prediction'] = 0.0
-                
-                ax[ax_id].plot(pred_data['prediction'], 
-                               color='tab:red',
-                               linewidth=0.5)
-                ax[ax_id].set_xlim(start, end)
-                ax[ax_id].fill_between(pred_index,
-                                       y1=pred_data['prediction'],
-                                       y2=0, 
-                                       alpha=0.1, 
-                                       color='tab:red')
-                ax[ax_id].axes.get_xaxis().set_ticks([])
-                ax[ax_id].axes.get_yaxis().set_ticks([])
-                ax[ax_id].set_xlabel(
-                    prediction_titles[prediction_index], 
-                    fontsize=12
-                )
+            ax[ax_id].set_xlabel(titles[prediction_index], fontsize=12)
         
     # Show the plot with a legend:
     ax[0].legend(fontsize=10, loc='upper right', framealpha=0.4)
         
-    return fig, ax
\ No newline at end of file
+    return fig, ax
+    
+def plot_timeseries_batch(
+    timeseries_df,
+    tags_list,
+    output_dir,
+    start=None,
+    end=None,
+    labels_df=None,
+    predictions=None,
+    prediction_titles=None,
+    shutdown_ranges_df=None,
+    output_format='png',
+    max_workers=None,
+    **kwargs
+):
+    """
+    This function renders one `plot_timeseries()` figure per tag and saves 
+    them as image files. The label and prediction tracks are computed once
+    for all the tags and the figures are rendered in parallel by a pool of
+    processes: the signals are sent to the workers through a shared memory
+    block instead of pickling the dataframe for each of them.
+    
+    PARAMS
+    ======
+        timeseries_df: pandas.DataFrame
+            A dataframe with a datetime index and one column per tag
+        
+        tags_list: list of strings
+            The tags to plot
+            
+        output_dir: string
+            The directory where the figures are saved
+            
+        start: string or pandas.Datetime (default: None)
+            Starting timestamp of the signals to plot. If not provided, will
+            use the whole signals
+        
+        end: string or pandas.Datetime (default: None)
+            End timestamp of the signals to plot. If not provided, will use 
+            the whole signals
+            
+        labels_df: pandas.DataFrame or IntervalSet (default: None)
+            If provided, this is a dataframe with all the labelled anomalies.
+        
+        predictions: pandas.DataFrame, IntervalSet or a list of them
+            If provided, the predicted anomalies to plot below each signal
+            
+        prediction_titles: list of strings (default: None)
+            The titles of each prediction plot.
+            
+        shutdown_ranges_df: pandas.DataFrame (default: None)
+            If provided, these periods are removed from the predictions
+            
+        output_format: string (default: 'png')
+            The format of the figure files (`png` or `svg`)
+            
+        max_workers: integer (default: None)
+            The number of processes rendering the figures. Defaults to the
+            number of CPUs
+            
+        **kwargs:
+            Other parameters passed to `plot_timeseries()` (e.g. `fig_width`,
+            `tag_split`, `custom_grid`...)
+            
+    RETURNS
+    =======
+        figures: dict
+            The path of the figure file of each tag
+    """
+    data = timeseries_df.loc[start:end, tags_list]
+    data_start = data.index.min()
+    data_end = data.index.max()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Shared label and prediction tracks:
+    tracks = dict()
+    if labels_df is not None:
+        tracks['labels'] = to_interval_set(labels_df).clip(data_start, data_end)
+        
+    if predictions is not None:
+        shutdowns = None
+        if isinstance(predictions, (pd.DataFrame, IntervalSet)):
+            predictions = [predictions]
+            prediction_titles = ['Anomaly ranges (Prediction)']
+        elif shutdown_ranges_df is not None:
+            shutdowns = to_interval_set(shutdown_ranges_df)
+            
+        tracks['predictions'] = []
+        for p in predictions:
+            predicted = to_interval_set(p).clip(data_start, data_end)
+            if shutdowns is not None:
+                predicted = predicted.difference(shutdowns)
+            tracks['predictions'].append(predicted)
+        tracks['prediction_titles'] = prediction_titles
+        
+    # One row of the shared block per tag, so that each worker reads a 
+    # contiguous signal:
+    index = np.asarray(data.index, dtype='datetime64[ns]')
+    values = np.ascontiguousarray(data.values.T, dtype=np.float64)
+    index_block = shared_memory.SharedMemory(create=True, size=max(index.nbytes, 1))
+    values_block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    
+    try:
+        np.ndarray(index.shape, dtype=index.dtype, buffer=index_block.buf)[:] = index
+        np.ndarray(values.shape, dtype=values.dtype, buffer=values_block.buf)[:] = values
+        
+        shared_arrays = (
+            (index_block.name, index.shape, index.dtype.str),
+            (values_block.name, values.shape, values.dtype.str)
+        )
+        figures = dict()
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(shared_arrays, tracks, output_dir, output_format, kwargs)
+        ) as executor:
+            tasks = {
+                tag: executor.submit(_plot_batch_tag, position, tag) 
+                for position, tag in enumerate(tags_list)
+            }
+            for tag, task in tasks.items():
+                figures[tag] = task.result()
+                
+    finally:
+        index_block.close()
+        index_block.unlink()
+        values_block.close()
+        values_block.unlink()
+        
+    return figures
+    
+# State of each process rendering the figures of plot_timeseries_batch():
+_batch_worker = dict()
+
+def _init_batch_worker(shared_arrays, tracks, output_dir, output_format, kwargs):
+    plt.switch_backend('Agg')
+    
+    arrays = []
+    blocks = []
+    for name, shape, dtype in shared_arrays:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+        
+    # The blocks must stay open as long as the arrays are used:
+    _batch_worker.update({
+        'blocks': blocks,
+        'index': pd.DatetimeIndex(arrays[0]),
+        'values': arrays[1],
+        'tracks': tracks,
+        'output_dir': output_dir,
+        'output_format': output_format,
+        'kwargs': kwargs
+    })
+    
+def _plot_batch_tag(position, tag):
+    tracks = _batch_worker['tracks']
+    tag_df = pd.DataFrame(
+        {'Value': _batch_worker['values'][position]}, 
+        index=_batch_worker['index']
+    )
+    
+    # The tracks are already merged and clipped interval sets:
+    fig, ax = plot_timeseries(
+        tag_df, 
+        tag, 
+        labels_df=tracks.get('labels'), 
+        predictions=tracks.get('predictions'), 
+        prediction_titles=tracks.get('prediction_titles'),
+        **_batch_worker['kwargs']
+    )
+    ax[0].set_title(f'{tag} time series')
+    
+    fname = str(tag).replace('/', '_').replace('\\', '_')
+    fname = os.path.join(
+        _batch_worker['output_dir'], 
+        f'{fname}.{_batch_worker["output_format"]}'
+    )
+    fig.savefig(fname, format=_batch_worker['output_format'])
+    plt.close(fig)
+    
+    return fname
@@ -0,0 +1,337 @@
+# Standard python and AWS imports:
+import pandas as pd
+
+from urllib.parse import unquote_plus
+
+# Maximum number of partitions created by a single Glue API call:
+MAX_PARTITIONS_PER_CALL = 100
+
+class PartitionRegistrar:
+    """
+    Registers the partitions of a Glue table as new objects are written in
+    its Hive-style layout (`key1=value1/key2=value2/file`), instead of
+    crawling the whole table again. The partitions of the table are listed
+    once and remembered: the keys of new objects (e.g. from S3 event
+    notifications) or the partitions written by a conversion are filtered
+    and only the partitions never seen before reach the Glue API.
+
+    PARAMS
+    ======
+        database, table_name: string
+            Glue database and name of the table
+
+        client: boto3 Glue client (default to None)
+            The client used to query the catalog (or a local stand-in
+            offering the same methods). A new one is created if None
+    """
+    def __init__(self, database, table_name, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client('glue')
+
+        self.database = database
+        self.table_name = table_name
+        self.client = client
+
+        table = client.get_table(DatabaseName=database, Name=table_name)['Table']
+        self.storage = table['StorageDescriptor']
+        self.partition_keys = [k['Name'] for k in table.get('PartitionKeys', [])]
+        if len(self.partition_keys) == 0:
+            raise ValueError(f'Table {database}.{table_name} has no partition key')
+
+        self.location = self.storage['Location']
+        if not self.location.endswith('/'):
+            self.location += '/'
+        self.bucket, self.prefix = self.location[5:].split('/', 1)
+        self.known = None
+
+    def load_partitions(self):
+        """
+        Lists the partitions already registered in the catalog (once)
+        """
+        if self.known is not None:
+            return self.known
+
+        self.known = set()
+        next_token = None
+        while True:
+            kwargs = {'DatabaseName': self.database, 'TableName': self.table_name}
+            if next_token is not None:
+                kwargs['NextToken'] = next_token
+            response = self.client.get_partitions(**kwargs)
+            self.known.update(tuple(p['Values']) for p in response['Partitions'])
+
+            next_token = response.get('NextToken')
+            if next_token is None:
+                return self.known
+
+    def get_partition(self, key):
+        """
+        Returns the partition values of an object of the table, None for
+        the objects outside of its partitions
+
+        PARAMS
+        ======
+            key: string
+                Key of the object (e.g. `<prefix>/scheduler=x/date=2022-03-30/file.parquet`)
+
+        RETURNS
+        =======
+            values: tuple
+                The value of each partition key, in the order of the table
+        """
+        if not key.startswith(self.prefix):
+            return None
+
+        folders = key[len(self.prefix):].split('/')[:-1]
+        if len(folders) != len(self.partition_keys):
+            return None
+
+        values = []
+        for folder, partition_key in zip(folders, self.partition_keys):
+            name, _, value = folder.partition('=')
+            if name != partition_key or len(value) == 0:
+                return None
+            values.append(value)
+
+        return tuple(values)
+
+    def get_partition_location(self, values):
+        """
+        Returns the S3 URI of a partition (Hive layout under the table)
+        """
+        return self.location + ''.join(
+            f'{k}={v}/' for k, v in zip(self.partition_keys, values)
+        )
+
+    def register(self, partitions):
+        """
+        Registers the partitions not registered yet, by batches of 100
+
+        PARAMS
+        ======
+            partitions: iterable
+                The values of each partition (tuples)
+
+        RETURNS
+        =======
+            created: list
+                The partitions registered by this call
+        """
+        known = self.load_partitions()
+        new_partitions = sorted(set(tuple(p) for p in partitions) - known)
+
+        created = []
+        for start in range(0, len(new_partitions), MAX_PARTITIONS_PER_CALL):
+            batch = new_partitions[start:start + MAX_PARTITIONS_PER_CALL]
+            response = self.client.batch_create_partition(
+                DatabaseName=self.database,
+                TableName=self.table_name,
+                PartitionInputList=[{
+                    'Values': list(partition),
+                    'StorageDescriptor': dict(self.storage, Location=self.get_partition_location(partition))
+                } for partition in batch]
+            )
+
+            # Partitions registered concurrently by another process are
+            # not an error:
+            existing = set()
+            for error in response.get('Errors', []):
+                if error['ErrorDetail']['ErrorCode'] != 'AlreadyExistsException':
+                    raise RuntimeError(f'Partition {error["PartitionValues"]} not registered: {error["ErrorDetail"]}')
+                existing.add(tuple(error['PartitionValues']))
+
+            known.update(batch)
+            created += [p for p in batch if p not in existing]
+
+        return created
+
+    def register_keys(self, keys):
+        """
+        Registers the partitions of new objects written in the table
+
+        PARAMS
+        ======
+            keys: iterable
+                Keys of the new objects, the objects outside of the
+                partitions of the table are ignored
+
+        RETURNS
+        =======
+            created: list
+                The partitions registered by this call
+        """
+        partitions = set(self.get_partition(key) for key in keys)
+        partitions.discard(None)
+
+        return self.register(partitions)
+
+    def register_event(self, event):
+        """
+        Registers the partitions of the objects of an S3 event notification
+        (e.g. the event received by a Lambda function subscribed to the
+        creation of objects in the table)
+        """
+        keys = [key for bucket, key in get_event_keys(event) if bucket == self.bucket]
+
+        return self.register_keys(keys)
+
+def get_event_keys(event):
+    """
+    Extracts the bucket and the key of the objects of an S3 event
+    notification (the keys are URL-encoded in the events)
+    """
+    return [
+        (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+        for record in event.get('Records', [])
+        if 's3' in record
+    ]
+
+def list_new_keys(bucket, prefix, watermark=None, suffix='', client=None):
+    """
+    Lists the objects written after a watermark. S3 lists the keys in
+    lexicographic order: when new keys always sort after the previous ones
+    (e.g. the results of a scheduler, stored under the timestamp of each
+    execution), only the new objects are listed. This is not the case of
+    the keys of a Hive layout (a new date of a scheduler sorts before the
+    older dates of the next scheduler): list the raw results, not the
+    converted dataset.
+
+    PARAMS
+    ======
+        bucket, prefix: string
+            Location of the objects
+
+        watermark: string (default to None)
+            The last key seen by the previous call, None to list all the
+            objects
+
+        suffix: string (default to '')
+            Only the keys ending with this suffix are returned (e.g.
+            `results.jsonl`)
+
+        client: boto3 S3 client (default to None)
+            The client used to list the objects. A new one is created if
+            None
+
+    RETURNS
+    =======
+        keys: list
+            The keys of the new objects
+
+        watermark: string
+            The last key listed, to give to the next call
+    """
+    if client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    keys = []
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    if watermark is not None:
+        kwargs['StartAfter'] = watermark
+
+    while True:
+        response = client.list_objects_v2(**kwargs)
+        for content in response.get('Contents', []):
+            watermark = content['Key']
+            if watermark.endswith(suffix):
+                keys.append(watermark)
+
+        if 'NextContinuationToken' not in response:
+            return keys, watermark
+        kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+def get_projection_parameters(location, partition_types, start_date, date_format='yyyy-MM-dd'):
+    """
+    Builds the table parameters of an Athena partition projection: Athena
+    then computes the partitions from the query filters and the table needs
+    no registration at all. Date partitions are projected from a start
+    date up to now, the other ones are injected (the queries must filter
+    them with an equality, e.g. `WHERE scheduler = '...'`)
+
+    PARAMS
+    ======
+        location: string
+            S3 URI of the root of the table
+
+        partition_types: dict
+            The partition keys of the table, `date` for the date partitions
+            and `injected` for the other ones (e.g.
+            `{'scheduler': 'injected', 'date': 'date'}`)
+
+        start_date: string or pandas.Timestamp
+            The first date of the date partitions
+
+        date_format: string (default to 'yyyy-MM-dd')
+            Format of the date partitions (Java date format)
+
+    RETURNS
+    =======
+        parameters: dict
+            The parameters to add to the `TableInput` of the table
+    """
+    if not location.endswith('/'):
+        location += '/'
+
+    parameters = {
+        'projection.enabled': 'true',
+        'storage.location.template': location + ''.join(f'{k}=${{{k}}}/' for k in partition_types)
+    }
+    for partition_key, partition_type in partition_types.items():
+        if partition_type not in ['date', 'injected']:
+            raise ValueError(f'Unknown projection type: {partition_type}, expecting "date" or "injected"')
+
+        parameters[f'projection.{partition_key}.type'] = partition_type
+        if partition_type == 'date':
+            parameters[f'projection.{partition_key}.range'] = f'{pd.Timestamp(start_date):%Y-%m-%d},NOW'
+            parameters[f'projection.{partition_key}.format'] = date_format
+            parameters[f'projection.{partition_key}.interval'] = '1'
+            parameters[f'projection.{partition_key}.interval.unit'] = 'DAYS'
+
+    return parameters
+
+def get_csv_table_input(table_name, location, columns, timestamp_col='Timestamp'):
+    """
+    Builds the definition of a Glue table over CSV files with a header (such
+    as the input files of a scheduler), so that the table is declared once
+    instead of being discovered by a crawler
+
+    PARAMS
+    ======
+        table_name: string
+            Name of the table
+
+        location: string
+            S3 URI of the folder of the files
+
+        columns: list of strings
+            The columns of the files, as in their header
+
+        timestamp_col: string (default to 'Timestamp')
+            The timestamp column, declared as a string: the other columns
+            are declared as doubles
+
+    RETURNS
+    =======
+        table_input: dict
+            The `TableInput` expected by the Glue create_table() API
+    """
+    return {
+        'Name': table_name,
+        'TableType': 'EXTERNAL_TABLE',
+        'Parameters': {'classification': 'csv', 'skip.header.line.count': '1', 'EXTERNAL': 'TRUE'},
+        'StorageDescriptor': {
+            'Columns': [
+                {'Name': c.lower(), 'Type': 'string' if c == timestamp_col else 'double'}
+                for c in columns
+            ],
+            'Location': location,
+            'InputFormat': 'org.apache.hadoop.mapred.TextInputFormat',
+            'OutputFormat': 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat',
+            'SerdeInfo': {
+                'SerializationLibrary': 'org.apache.hadoop.hive.serde2.lazy.LazySimpleSerDe',
+                'Parameters': {'field.delim': ','}
+            }
+        }
+    }
@@ -0,0 +1,346 @@
+# Standard python and AWS imports:
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = ['last', 'mean', 'min', 'max']
+
+def get_grid(start, end, freq):
+    """
+    Builds a regular time grid aligned on multiples of the frequency (so
+    that grids built from different chunks of data share the same points)
+
+    PARAMS
+    ======
+        start, end: pandas.Timestamp
+            The first and last timestamps to cover
+
+        freq: string or pandas.Timedelta
+            The step of the grid: a pandas frequency (e.g. `5min`) or an
+            ISO 8601 duration such as the `DataUploadFrequency` of an
+            inference scheduler (e.g. `PT5M`)
+
+    RETURNS
+    =======
+        grid: numpy.ndarray
+            The start of each bin of the grid (integer nanoseconds)
+    """
+    step = pd.Timedelta(freq).value
+    first = (pd.Timestamp(start).value // step) * step
+    last = (pd.Timestamp(end).value // step) * step
+
+    return np.arange(first, last + step, step, dtype=np.int64)
+
+def aggregate_bins(sensors_df, grid, step, how='last'):
+    """
+    Aggregates the observations of all the tags of a sensor dataframe into
+    the bins of a time grid. Each bin covers [t, t + step) and is labelled
+    by its start t. The bin of every row is located with a single binary
+    search of the sorted index in the bin edges, and all the tags are then
+    aggregated in one grouped pass (missing values are skipped)
+
+    PARAMS
+    ======
+        sensors_df: pandas.DataFrame
+            A dataframe with a sorted datetime index and one column per tag,
+            NaN where a tag has no observation
+
+        grid: numpy.ndarray
+            The start of each bin (integer nanoseconds)
+
+        step: integer
+            The width of the bins (nanoseconds)
+
+        how: string (default to 'last')
+            The aggregation of the observations of each bin: `last`, `mean`,
+            `min` or `max`
+
+    RETURNS
+    =======
+        aggregated: numpy.ndarray
+            A (bins x tags) array, NaN for the bins without observation
+
+        observed: numpy.ndarray
+            A (bins x tags) array with the start of the bin for the bins
+            with an observation, -1 for the others
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f'Unknown aggregation: {how}, expecting one of {AGGREGATIONS}')
+
+    num_bins = len(grid)
+    num_tags = sensors_df.shape[1]
+    aggregated = np.full((num_bins, num_tags), np.nan)
+    observed = np.full((num_bins, num_tags), -1, dtype=np.int64)
+    if num_bins == 0 or len(sensors_df) == 0:
+        return aggregated, observed
+
+    # Only the rows inside the grid are aggregated:
+    timestamps = np.asarray(sensors_df.index, dtype='datetime64[ns]').view(np.int64)
+    edges = np.append(grid, grid[-1] + step)
+    first_row, last_row = np.searchsorted(timestamps, edges[[0, -1]], side='left')
+    if last_row == first_row:
+        return aggregated, observed
+
+    bins = np.searchsorted(edges, timestamps[first_row:last_row], side='right') - 1
+    grouped = sensors_df.iloc[first_row:last_row].groupby(bins, sort=False)
+    result = getattr(grouped, how)()
+
+    aggregated[result.index.to_numpy()] = result.to_numpy(dtype=np.float64)
+    observed = np.where(np.isnan(aggregated), -1, grid[:, np.newaxis])
+
+    return aggregated, observed
+
+def fill_gaps(aggregated, observed, grid, limit, initial_values=None, initial_observed=None):
+    """
+    Fills the bins without observation with the value of the previous bin
+    with an observation, as long as this bin is recent enough
+
+    PARAMS
+    ======
+        aggregated, observed: numpy.ndarray
+            The arrays returned by aggregate_bins()
+
+        grid: numpy.ndarray
+            The start of each bin (integer nanoseconds)
+
+        limit: string or pandas.Timedelta
+            Maximum time between the start of the bin to fill and the start
+            of the bin with an observation used to fill it
+
+        initial_values, initial_observed: numpy.ndarray (default to None)
+            The value and the bin start of each tag before the first bin
+            (used when the data are aligned chunk by chunk)
+
+    RETURNS
+    =======
+        filled: numpy.ndarray
+            The aggregated values with the gaps filled
+
+        filled_observed: numpy.ndarray
+            The start of the bin with an observation used for each bin
+    """
+    num_bins, num_tags = aggregated.shape
+    if initial_values is None:
+        initial_values = np.full(num_tags, np.nan)
+        initial_observed = np.full(num_tags, -1, dtype=np.int64)
+
+    values = np.vstack([initial_values, aggregated])
+    observed_ext = np.vstack([initial_observed, observed])
+    has_value = observed_ext >= 0
+
+    # Last bin with an observation, for each bin and each tag:
+    rows = np.arange(num_bins + 1)[:, np.newaxis]
+    source = np.where(has_value, rows, 0)
+    np.maximum.accumulate(source, axis=0, out=source)
+    source = source[1:]
+
+    filled = np.take_along_axis(values, source, axis=0)
+    filled_observed = np.take_along_axis(observed_ext, source, axis=0)
+    too_old = (
+        (filled_observed < 0)
+        | (grid[:, np.newaxis] - filled_observed > pd.Timedelta(limit).value)
+    )
+    filled[too_old] = np.nan
+    filled_observed[too_old] = -1
+
+    return filled, filled_observed
+
+def align_frame(sensors_df,
+                freq,
+                how='last',
+                limit=None,
+                start=None,
+                end=None,
+                initial_values=None,
+                initial_observed=None,
+                return_state=False):
+    """
+    Aligns the tags of a wide sensor dataframe, possibly sampled at
+    different rates (NaN where a tag has no observation), on a regular grid
+    in a single vectorized pass over all the tags
+
+    PARAMS
+    ======
+        sensors_df: pandas.DataFrame
+            A dataframe with a datetime index and one column per tag
+
+        freq: string or pandas.Timedelta
+            The step of the target grid (e.g. `5min` or `PT5M`)
+
+        how: string (default to 'last')
+            The aggregation of the observations of each bin: `last`, `mean`,
+            `min` or `max`
+
+        limit: string or pandas.Timedelta (default to None)
+            If given, the bins without observation take the value of the
+            previous bin with an observation when it started at most this
+            long before (e.g. `15min`). Longer gaps stay NaN
+
+        start, end: pandas.Timestamp (default to None)
+            The period of the grid, defaults to the period of the data
+
+        initial_values, initial_observed: numpy.ndarray (default to None)
+            State of each tag before the start of the grid, used to fill
+            the first bins (see align_chunks())
+
+        return_state: boolean (default to False)
+            Set to True to also return the state of each tag at the end of
+            the grid
+
+    RETURNS
+    =======
+        aligned_df: pandas.DataFrame
+            A dataframe indexed by the start of each bin of the grid
+
+        state: tuple
+            The value and observation time of each tag at the end of the
+            grid (only when `return_state` is True)
+    """
+    if not sensors_df.index.is_monotonic_increasing:
+        sensors_df = sensors_df.sort_index()
+
+    step = pd.Timedelta(freq).value
+    if start is None and len(sensors_df) > 0:
+        start = sensors_df.index[0]
+    if end is None and len(sensors_df) > 0:
+        end = sensors_df.index[-1]
+
+    if start is None or end is None or pd.Timestamp(end) < pd.Timestamp(start):
+        grid = np.array([], dtype=np.int64)
+    else:
+        grid = get_grid(start, end, step)
+
+    aggregated, observed = aggregate_bins(sensors_df, grid, step, how)
+    if limit is not None:
+        aggregated, observed = fill_gaps(
+            aggregated, observed, grid, limit, initial_values, initial_observed
+        )
+
+    aligned_df = pd.DataFrame(
+        aggregated,
+        index=pd.DatetimeIndex(grid, name=sensors_df.index.name),
+        columns=sensors_df.columns
+    )
+
+    if return_state:
+        state = get_last_state(aggregated, observed, initial_values, initial_observed)
+        return aligned_df, state
+
+    return aligned_df
+
+def get_last_state(aggregated, observed, initial_values=None, initial_observed=None):
+    """
+    Returns the last value of each tag and the start of its bin
+    """
+    num_tags = aggregated.shape[1]
+    values = np.full(num_tags, np.nan) if initial_values is None else initial_values.copy()
+    times = np.full(num_tags, -1, dtype=np.int64) if initial_observed is None else initial_observed.copy()
+
+    has_value = observed >= 0
+    any_value = has_value.any(axis=0)
+    last = len(observed) - 1 - np.argmax(has_value[::-1], axis=0)
+    tags = np.flatnonzero(any_value)
+    values[tags] = aggregated[last[tags], tags]
+    times[tags] = observed[last[tags], tags]
+
+    return values, times
+
+def align_signals(signals, freq, how='last', limit=None, start=None, end=None):
+    """
+    Aligns signals sampled at different rates, each with its own index, on
+    a common regular grid
+
+    PARAMS
+    ======
+        signals: dict
+            A pandas.Series with a datetime index for each tag
+
+        freq, how, limit, start, end:
+            See align_frame()
+
+    RETURNS
+    =======
+        aligned_df: pandas.DataFrame
+            A dataframe indexed by the start of each bin of the grid, with
+            one column per tag
+    """
+    non_empty = [s for s in signals.values() if len(s) > 0]
+    if start is None and len(non_empty) > 0:
+        start = min(s.index.min() for s in non_empty)
+    if end is None and len(non_empty) > 0:
+        end = max(s.index.max() for s in non_empty)
+
+    aligned = dict()
+    for tag, series in signals.items():
+        aligned_df = align_frame(series.to_frame(tag), freq, how, limit, start, end)
+        aligned[tag] = aligned_df[tag]
+
+    return pd.DataFrame(aligned)
+
+def align_chunks(chunks, freq, how='last', limit=None):
+    """
+    Aligns a large sensor dataset read chunk by chunk (e.g. with the
+    `chunksize` parameter of pandas.read_csv()) on a regular grid. Only the
+    rows of the last incomplete bin are kept from one chunk to the next:
+    the memory used does not depend on the size of the dataset.
+
+    PARAMS
+    ======
+        chunks: iterable
+            Wide sensor dataframes with a datetime index, sorted by time
+            and with the same columns
+
+        freq, how, limit:
+            See align_frame()
+
+    YIELDS
+    ======
+        aligned_df: pandas.DataFrame
+            The aligned bins of each chunk, bins never span two chunks
+    """
+    step = pd.Timedelta(freq).value
+    pending_df = None
+    state = (None, None)
+    next_bin = None
+
+    for chunk_df in chunks:
+        if pending_df is not None:
+            chunk_df = pd.concat([pending_df, chunk_df])
+        if len(chunk_df) == 0:
+            continue
+
+        # The last bin of the chunk may continue in the next chunk:
+        timestamps = np.asarray(chunk_df.index, dtype='datetime64[ns]').view(np.int64)
+        cut = (timestamps[-1] // step) * step
+        cut_row = np.searchsorted(timestamps, cut, side='left')
+        pending_df = chunk_df.iloc[cut_row:]
+        complete_df = chunk_df.iloc[:cut_row]
+        if len(complete_df) == 0:
+            continue
+
+        start = next_bin if next_bin is not None else timestamps[0]
+        aligned_df, state = align_frame(
+            complete_df,
+            freq,
+            how,
+            limit,
+            start=pd.Timestamp(start),
+            end=pd.Timestamp(cut - 1),
+            initial_values=state[0],
+            initial_observed=state[1],
+            return_state=True
+        )
+        next_bin = cut
+        yield aligned_df
+
+    if pending_df is not None and len(pending_df) > 0:
+        start = next_bin if next_bin is not None else pending_df.index[0]
+        aligned_df = align_frame(
+            pending_df,
+            freq,
+            how,
+            limit,
+            start=pd.Timestamp(start),
+            initial_values=state[0],
+            initial_observed=state[1]
+        )
+        yield aligned_df
@@ -0,0 +1,322 @@
+# Standard python and AWS imports:
+import io
+import json
+import numpy as np
+import os
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Columns of the long-format results dataset: one row per timestamp and
+# per sensor of the diagnostics. The scheduler and the date are the
+# partitions of the dataset, they are not stored in the Parquet files:
+RESULTS_COLUMNS = ['timestamp', 'scheduler', 'subsystem', 'sensor', 'score', 'prediction']
+PARTITION_KEYS = ['scheduler', 'date']
+DATA_COLUMNS = ['timestamp', 'subsystem', 'sensor', 'score', 'prediction']
+
+# Glue types of the columns (Parquet timestamps are written in milliseconds,
+# as expected by Athena):
+COLUMN_TYPES = {
+    'timestamp': 'timestamp',
+    'scheduler': 'string',
+    'subsystem': 'string',
+    'sensor': 'string',
+    'score': 'double',
+    'prediction': 'int',
+    'date': 'string'
+}
+
+def read_results(bucket, key, client=None):
+    """
+    Reads an inference results file (JSON lines) written by a scheduler
+
+    PARAMS
+    ======
+        bucket, key: string
+            Location of the results file
+
+        client: boto3 S3 client (default to None)
+            The client used to read the file. A new one is created if None
+
+    RETURNS
+    =======
+        records: list
+            One dictionary per timestamp
+    """
+    if client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    body = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+
+    return [json.loads(line) for line in body.splitlines() if len(line.strip()) > 0]
+
+def flatten_results(records, scheduler_name):
+    """
+    Flattens the results of a scheduler into a long-format dataframe with
+    one row per timestamp and per sensor. The (name, value) pairs of all
+    the diagnostics are unpacked in one pass, and each distinct signal name
+    is split into its subsystem and sensor only once: the subsystem and
+    sensor columns are categoricals (stored as dictionary-encoded strings
+    in Parquet). As with an UNNEST of the diagnostics, the timestamps
+    without diagnostics (no anomaly detected) have no row.
+
+    PARAMS
+    ======
+        records: list
+            The records of one or several results files (see read_results())
+
+        scheduler_name: string
+            Name of the scheduler which produced these results
+
+    RETURNS
+    =======
+        results_df: pandas.DataFrame
+            A dataframe with the RESULTS_COLUMNS and a `date` column
+            (`YYYY-MM-DD`) used to partition the dataset
+    """
+    lengths = np.fromiter(
+        (len(r.get('diagnostics') or []) for r in records),
+        dtype=np.int64,
+        count=len(records)
+    )
+    num_rows = int(lengths.sum())
+
+    # Column of each signal, in their order of appearance:
+    positions = dict()
+    codes = np.fromiter(
+        (positions.setdefault(d['name'], len(positions)) for r in records for d in r.get('diagnostics') or []),
+        dtype=np.int64,
+        count=num_rows
+    )
+    scores = np.fromiter(
+        (d['value'] for r in records for d in r.get('diagnostics') or []),
+        dtype=np.float64,
+        count=num_rows
+    )
+    rows = np.repeat(np.arange(len(records)), lengths)
+
+    # Signals are named `subsystem\sensor`:
+    signals = [name.partition('\\') for name in positions]
+    subsystem_codes, subsystems = pd.factorize(pd.Index([s[0] for s in signals]))
+    sensor_codes, sensors = pd.factorize(pd.Index([s[2] if s[1] else s[0] for s in signals]))
+
+    # Timestamps and dates are parsed and formatted once per record:
+    timestamps = pd.to_datetime([r['timestamp'] for r in records])
+    date_codes, dates = pd.factorize(timestamps.floor('D'))
+    predictions = np.fromiter((r.get('prediction', 0) for r in records), dtype=np.int32, count=len(records))
+
+    return pd.DataFrame({
+        'timestamp': timestamps[rows],
+        'scheduler': pd.Categorical.from_codes(np.zeros(num_rows, dtype=np.int8), [scheduler_name]),
+        'subsystem': pd.Categorical.from_codes(subsystem_codes[codes], subsystems),
+        'sensor': pd.Categorical.from_codes(sensor_codes[codes], sensors),
+        'score': scores,
+        'prediction': predictions[rows],
+        'date': pd.Categorical.from_codes(date_codes[rows], dates.strftime('%Y-%m-%d'))
+    })
+
+def get_partition_path(scheduler_name, date):
+    """
+    Returns the path of a partition relative to the root of the dataset
+    (Hive layout: `scheduler=<name>/date=<YYYY-MM-DD>/`)
+    """
+    return f'scheduler={scheduler_name}/date={date}/'
+
+def write_partitions(results_df,
+                     fname,
+                     output_dir=None,
+                     bucket=None,
+                     prefix=None,
+                     client=None):
+    """
+    Writes a long-format results dataframe as Parquet files, one file per
+    partition (scheduler and date) covered by the dataframe. Each file is
+    named after the results file it comes from: converting the same
+    results twice overwrites the same files.
+
+    Writing Parquet files requires the `pyarrow` package.
+
+    PARAMS
+    ======
+        results_df: pandas.DataFrame
+            A dataframe produced by flatten_results()
+
+        fname: string
+            Name of the Parquet file written in each partition
+
+        output_dir: string (default to None)
+            A local directory where the dataset is written
+
+        bucket, prefix: string (default to None)
+            The S3 location where the dataset is written
+
+        client: boto3 S3 client (default to None)
+            The client used for the uploads. A new one is created if None
+
+    RETURNS
+    =======
+        partitions: list
+            The (scheduler, date) pairs of the partitions written
+    """
+    if output_dir is None and bucket is None:
+        raise ValueError('Expecting an output directory and/or a bucket')
+
+    if bucket is not None and client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    partitions = []
+    for (scheduler_name, date), partition_df in results_df.groupby(PARTITION_KEYS, sort=True, observed=True):
+        buffer = io.BytesIO()
+        partition_df[DATA_COLUMNS].to_parquet(
+            buffer,
+            engine='pyarrow',
+            index=False,
+            coerce_timestamps='ms',
+            allow_truncated_timestamps=True
+        )
+        path = get_partition_path(scheduler_name, date) + fname
+
+        if output_dir is not None:
+            local_path = os.path.join(output_dir, path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            with open(local_path, 'wb') as f:
+                f.write(buffer.getvalue())
+
+        if bucket is not None:
+            client.put_object(Bucket=bucket, Key=f'{prefix or ""}{path}', Body=buffer.getvalue())
+
+        partitions.append((scheduler_name, date))
+
+    return partitions
+
+def get_output_fname(key):
+    """
+    Names the Parquet files converted from a results file after the folder
+    of the execution (e.g. `<prefix>/20220330104500/results.jsonl` gives
+    `20220330104500.parquet`)
+    """
+    parts = key.rstrip('/').split('/')
+    if len(parts) > 1 and parts[-1] == 'results.jsonl':
+        return f'{parts[-2]}.parquet'
+
+    return f'{os.path.splitext(parts[-1])[0]}.parquet'
+
+def convert_results(scheduler_name,
+                    results_bucket,
+                    result_keys,
+                    output_dir=None,
+                    bucket=None,
+                    prefix=None,
+                    max_workers=8,
+                    client=None):
+    """
+    Converts the results files of a scheduler into the partitioned
+    long-format Parquet dataset queried by Athena. The results files are
+    read, flattened and written by a pool of threads.
+
+    PARAMS
+    ======
+        scheduler_name: string
+            Name of the scheduler which produced these results
+
+        results_bucket: string
+            Bucket of the results files
+
+        result_keys: list of strings
+            Keys of the results files to convert (e.g. the new ones since
+            the last conversion)
+
+        output_dir, bucket, prefix:
+            Location of the dataset, see write_partitions()
+
+        max_workers: integer (default to 8)
+            Number of results files converted concurrently
+
+        client: boto3 S3 client (default to None)
+            The client used to read and write the files. A new one is
+            created if None
+
+    RETURNS
+    =======
+        partitions: list
+            The sorted (scheduler, date) pairs of the partitions written
+    """
+    if client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    def convert(key):
+        records = read_results(results_bucket, key, client)
+        results_df = flatten_results(records, scheduler_name)
+
+        return write_partitions(results_df, get_output_fname(key), output_dir, bucket, prefix, client)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        written = list(executor.map(convert, result_keys))
+
+    return sorted(set(p for partitions in written for p in partitions))
+
+def get_table_input(table_name, location):
+    """
+    Builds the definition of the Glue table of the results dataset
+
+    PARAMS
+    ======
+        table_name: string
+            Name of the table
+
+        location: string
+            S3 URI of the root of the dataset (e.g. `s3://bucket/prefix/`)
+
+    RETURNS
+    =======
+        table_input: dict
+            The `TableInput` expected by the Glue create_table() API
+    """
+    return {
+        'Name': table_name,
+        'TableType': 'EXTERNAL_TABLE',
+        'Parameters': {'classification': 'parquet', 'EXTERNAL': 'TRUE'},
+        'PartitionKeys': [{'Name': c, 'Type': COLUMN_TYPES[c]} for c in PARTITION_KEYS],
+        'StorageDescriptor': {
+            'Columns': [{'Name': c, 'Type': COLUMN_TYPES[c]} for c in DATA_COLUMNS],
+            'Location': location,
+            'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+            'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
+            'SerdeInfo': {
+                'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+            }
+        }
+    }
+
+def create_results_table(database, table_name, location, client=None):
+    """
+    Creates the Glue table of the results dataset if it does not exist yet
+
+    PARAMS
+    ======
+        database, table_name: string
+            Glue database and name of the table
+
+        location: string
+            S3 URI of the root of the dataset
+
+        client: boto3 Glue client (default to None)
+            The client used to create the table. A new one is created if
+            None
+    """
+    if client is None:
+        import boto3
+        client = boto3.client('glue')
+
+    from botocore.exceptions import ClientError
+
+    try:
+        client.create_table(DatabaseName=database, TableInput=get_table_input(table_name, location))
+
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'AlreadyExistsException':
+            raise
+        print(f'Table {database}.{table_name} already exists')
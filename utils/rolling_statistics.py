@@ -0,0 +1,194 @@
+# Standard python and AWS imports:
+import hashlib
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+
+# Rolling statistics already computed, by series content and window:
+MAX_CACHED_STATISTICS = 32
+_statistics_cache = OrderedDict()
+
+class RollingStatistics:
+    """
+    Rolling statistics of a time series over a time-based window. The window
+    ending at each timestamp t covers the timestamps in (t - window, t], so
+    that irregular sampling rates (e.g. 5 minutes or 1 second) are handled
+    the same way. Mean and standard deviation are computed from cumulative
+    sums in O(n) and missing values are ignored.
+
+    PARAMS
+    ======
+        series: pandas.Series
+            A time series with a sorted datetime index
+
+        window: string or pandas.Timedelta
+            The length of the window (e.g. `1D`, `6h`...)
+    """
+    def __init__(self, series, window):
+        self.series = series
+        self.window = pd.Timedelta(window)
+        self.statistics = dict()
+
+        timestamps = np.asarray(series.index, dtype='datetime64[ns]')
+        self.first = np.searchsorted(
+            timestamps,
+            timestamps - np.timedelta64(self.window),
+            side='right'
+        )
+        self.last = np.arange(1, len(timestamps) + 1)
+
+        # Values are centered to limit the cancellation errors of the 
+        # cumulative sums:
+        values = series.to_numpy(dtype=np.float64)
+        self.valid = np.isfinite(values)
+        self.center = values[self.valid].mean() if self.valid.any() else 0.0
+        self.values = np.where(self.valid, values - self.center, 0.0)
+        self.counts = self.window_sums(self.valid.astype(np.float64))
+
+    def window_sums(self, values):
+        """
+        Sums some values over the window ending at each timestamp
+        """
+        cumulative_sums = np.zeros(len(values) + 1)
+        np.cumsum(values, out=cumulative_sums[1:])
+
+        return cumulative_sums[self.last] - cumulative_sums[self.first]
+
+    def to_series(self, values, name):
+        values = np.where(self.counts > 0, values, np.nan)
+
+        return pd.Series(values, index=self.series.index, name=name)
+
+    def mean(self):
+        """
+        RETURNS
+        =======
+            mean: pandas.Series
+                The rolling mean of the series
+        """
+        if 'mean' not in self.statistics:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = self.center + self.window_sums(self.values) / self.counts
+            self.statistics['mean'] = self.to_series(mean, 'mean')
+
+        return self.statistics['mean']
+
+    def std(self):
+        """
+        RETURNS
+        =======
+            std: pandas.Series
+                The rolling standard deviation (with one degree of freedom,
+                as in pandas) of the series
+        """
+        if 'std' not in self.statistics:
+            sums = self.window_sums(self.values)
+            squares = self.window_sums(self.values ** 2)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                variance = (squares - sums ** 2 / self.counts) / (self.counts - 1)
+            variance = np.where(self.counts > 1, np.maximum(variance, 0.0), np.nan)
+            self.statistics['std'] = self.to_series(np.sqrt(variance), 'std')
+
+        return self.statistics['std']
+
+    def envelope(self):
+        """
+        The minimum and maximum can't be derived from cumulative sums: they
+        rely on the time-based rolling windows of pandas, which keep a
+        monotonic queue of the candidate values (also O(n)).
+
+        RETURNS
+        =======
+            min, max: pandas.Series
+                The rolling minimum and maximum of the series
+        """
+        if 'envelope' not in self.statistics:
+            rolling = self.series.astype(np.float64).rolling(self.window)
+            self.statistics['envelope'] = (
+                rolling.min().rename('min'),
+                rolling.max().rename('max')
+            )
+
+        return self.statistics['envelope']
+
+def get_rolling_statistics(series, window='1D'):
+    """
+    Gets the rolling statistics of a time series. They are memoized by
+    series content and window, so that plotting the same signal again
+    (e.g. on another period or with other labels) does not compute them
+    again.
+
+    PARAMS
+    ======
+        series: pandas.Series
+            A time series with a sorted datetime index
+
+        window: string or pandas.Timedelta (default: '1D')
+            The length of the window
+
+    RETURNS
+    =======
+        statistics: RollingStatistics
+            The rolling statistics of the series
+    """
+    fingerprint = hashlib.blake2b(
+        np.ascontiguousarray(series.index.asi8).tobytes(),
+        digest_size=16
+    )
+    fingerprint.update(np.ascontiguousarray(series.to_numpy(dtype=np.float64)).tobytes())
+    key = (fingerprint.hexdigest(), pd.Timedelta(window))
+
+    if key in _statistics_cache:
+        _statistics_cache.move_to_end(key)
+
+    else:
+        _statistics_cache[key] = RollingStatistics(series, window)
+        if len(_statistics_cache) > MAX_CACHED_STATISTICS:
+            _statistics_cache.popitem(last=False)
+
+    return _statistics_cache[key]
+
+def plot_rolling_statistics(ax, series, window='1D', envelope=False, color='tab:red', label=None):
+    """
+    Plots the rolling mean of a time series on top of its line plot and
+    optionally its min / max envelope.
+
+    PARAMS
+    ======
+        ax: matplotlib.pyplot.Axis
+            The axis where the time series is plotted
+
+        series: pandas.Series
+            The plotted time series
+
+        window: string or pandas.Timedelta (default: '1D')
+            The length of the window
+
+        envelope: boolean (default: False)
+            If set to true, will fill the area between the rolling minimum
+            and maximum of the signal
+
+        color: string (default: 'tab:red')
+            The color of the rolling mean and envelope
+
+        label: string (default: None)
+            The label of the rolling mean in the legend
+    """
+    statistics = get_rolling_statistics(series, window)
+    rolling_mean = statistics.mean()
+
+    if envelope:
+        rolling_min, rolling_max = statistics.envelope()
+        ax.fill_between(
+            series.index,
+            rolling_min,
+            rolling_max,
+            alpha=0.2,
+            color=color,
+            linewidth=0.0,
+            label=f'Rolling envelope ({window})'
+        )
+
+    ax.plot(series.index, rolling_mean, alpha=0.5, color='white', linewidth=3)
+    ax.plot(series.index, rolling_mean, label=label, color=color, linewidth=1)
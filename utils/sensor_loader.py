@@ -0,0 +1,237 @@
+# Standard python and AWS imports:
+import glob
+import numpy as np
+import os
+import pandas as pd
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+def load_sensor_data(root_dir,
+                     timestamp_col='Timestamp',
+                     timestamp_format='ISO8601',
+                     dtype=np.float32,
+                     max_workers=None,
+                     processes=True,
+                     file_pattern='*.csv'):
+    """
+    Loads the sensor data of an asset organized with one subdirectory per
+    component (e.g. `sensors-data/impeller/component2_file1.csv`) into a
+    single wide dataframe.
+
+    The CSV files are read in parallel with an explicit timestamp format and
+    the sensor values are directly parsed with the requested precision. The
+    files of a given component sharing the same sensors (e.g. one file per
+    month) are stacked, and the components are then aligned on the sorted
+    union of their timestamps (a timestamp missing for a component gives
+    NaN values for its sensors).
+
+    PARAMS
+    ======
+        root_dir: string
+            Path to the directory containing one subdirectory per component.
+            Files located directly in this directory are attached to a
+            component named after it
+
+        timestamp_col: string (default to 'Timestamp')
+            Name of the timestamp column of every file
+
+        timestamp_format: string (default to 'ISO8601')
+            Format of the timestamps, passed to pandas.to_datetime(). Use an
+            explicit strftime format (e.g. '%Y-%m-%d %H:%M:%S') when the
+            timestamps are not ISO 8601 formatted
+
+        dtype: numpy dtype (default to numpy.float32)
+            Data type of the sensor values
+
+        max_workers: integer (default to None)
+            Number of files read concurrently, defaults to the number of
+            processors of the machine
+
+        processes: boolean (default to True)
+            Parsing CSV files is CPU bound: the files are read in a pool of
+            processes. Set to False to use a pool of threads instead
+
+        file_pattern: string (default to '*.csv')
+            Glob pattern of the files to load in each directory
+
+    RETURNS
+    =======
+        equipment_df: pandas.DataFrame
+            A dataframe with a sorted datetime index and one column per tag
+
+        tags_description: dict
+            The component of each tag
+    """
+    files = list_component_files(root_dir, file_pattern)
+    if len(files) == 0:
+        raise ValueError(f'No file matching {file_pattern} found in {root_dir}')
+
+    # Reads all the files in parallel:
+    read = partial(
+        read_sensor_file,
+        timestamp_col=timestamp_col,
+        timestamp_format=timestamp_format,
+        dtype=dtype
+    )
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+    with executor_class(max_workers=max_workers) as executor:
+        frames = list(executor.map(read, [fname for _, fname in files]))
+
+    # Stacks the files of each component sharing the same tags:
+    blocks = dict()
+    tags_description = dict()
+    for (component, fname), (timestamps, values, tags) in zip(files, frames):
+        key = (component, tuple(tags))
+        blocks.setdefault(key, []).append((timestamps, values))
+
+    block_list = []
+    for (component, tags), block in blocks.items():
+        for tag in tags:
+            if tag in tags_description and tags_description[tag] != component:
+                raise ValueError(
+                    f'Tag {tag} found in components {tags_description[tag]} and {component}'
+                )
+            if tag in tags_description:
+                raise ValueError(f'Tag {tag} found twice in component {component}')
+            tags_description[tag] = component
+
+        timestamps = np.concatenate([b[0] for b in block])
+        values = np.concatenate([b[1] for b in block])
+        timestamps, values = sort_timestamps(timestamps, values)
+        block_list.append((timestamps, values, list(tags)))
+
+    equipment_df = align_blocks(block_list, dtype)
+    equipment_df.index.name = timestamp_col
+
+    return equipment_df, tags_description
+
+def list_component_files(root_dir, file_pattern='*.csv'):
+    """
+    Lists the files of each component of an asset
+
+    PARAMS
+    ======
+        root_dir: string
+            Path to the directory containing one subdirectory per component
+
+        file_pattern: string (default to '*.csv')
+            Glob pattern of the files to list
+
+    RETURNS
+    =======
+        files: list of tuples
+            A sorted list of (component, file path) tuples
+    """
+    files = []
+    for root, dirs, _ in os.walk(root_dir):
+        dirs.sort()
+        component = os.path.basename(os.path.normpath(root))
+        for fname in sorted(glob.glob(os.path.join(glob.escape(root), file_pattern))):
+            files.append((component, fname))
+
+    return files
+
+def read_sensor_file(fname, timestamp_col='Timestamp', timestamp_format='ISO8601', dtype=np.float32):
+    """
+    Reads a sensor CSV file
+
+    PARAMS
+    ======
+        fname: string
+            Path to the CSV file
+
+        timestamp_col: string (default to 'Timestamp')
+            Name of the timestamp column
+
+        timestamp_format: string (default to 'ISO8601')
+            Format of the timestamps, passed to pandas.to_datetime()
+
+        dtype: numpy dtype (default to numpy.float32)
+            Data type of the sensor values
+
+    RETURNS
+    =======
+        timestamps: numpy.ndarray
+            The timestamps of the file (datetime64[ns])
+
+        values: numpy.ndarray
+            A (timestamps x tags) array of sensor values
+
+        tags: list
+            The name of each tag
+    """
+    # Every column but the timestamp is directly parsed with the requested
+    # data type, no intermediate float64 copy is made:
+    column_types = defaultdict(lambda: dtype, {timestamp_col: object})
+    df = pd.read_csv(fname, dtype=column_types)
+    if timestamp_col not in df.columns:
+        raise ValueError(f'No {timestamp_col} column found in {fname}')
+
+    timestamps = pd.to_datetime(df.pop(timestamp_col), format=timestamp_format)
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert(None)
+    timestamps = timestamps.to_numpy(dtype='datetime64[ns]')
+    values = df.to_numpy(dtype=dtype)
+
+    return timestamps, values, df.columns.tolist()
+
+def sort_timestamps(timestamps, values):
+    """
+    Sorts the rows of a block of sensor values by timestamp. When a timestamp
+    appears several times, the last row is kept
+    """
+    if len(timestamps) > 1 and not (timestamps[1:] > timestamps[:-1]).all():
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        values = values[order]
+
+        # Last occurrence of each duplicated timestamp:
+        keep = np.append(timestamps[1:] != timestamps[:-1], True)
+        timestamps = timestamps[keep]
+        values = values[keep]
+
+    return timestamps, values
+
+def align_blocks(blocks, dtype=np.float32):
+    """
+    Aligns blocks of sensor values sorted by timestamp on the sorted union of
+    their timestamps
+
+    PARAMS
+    ======
+        blocks: list of tuples
+            A list of (timestamps, values, tags) tuples with sorted and
+            unique timestamps
+
+        dtype: numpy dtype (default to numpy.float32)
+            Data type of the aligned values
+
+    RETURNS
+    =======
+        df: pandas.DataFrame
+            A wide dataframe with a datetime index
+    """
+    tags = [tag for _, _, block_tags in blocks for tag in block_tags]
+
+    # When all the blocks share the same timestamps (the most common case),
+    # nothing needs to be aligned:
+    first_timestamps = blocks[0][0]
+    if all(np.array_equal(first_timestamps, b[0]) for b in blocks[1:]):
+        index = first_timestamps
+        values = np.hstack([b[1] for b in blocks]).astype(dtype, copy=False)
+
+    else:
+        # Sorted union of the timestamps of all the blocks:
+        index = np.sort(np.concatenate([b[0] for b in blocks]), kind='stable')
+        index = index[np.append(True, index[1:] != index[:-1])]
+        values = np.full((len(index), len(tags)), np.nan, dtype=dtype)
+        column = 0
+        for timestamps, block_values, block_tags in blocks:
+            rows = np.searchsorted(index, timestamps)
+            values[rows, column:column + len(block_tags)] = block_values
+            column += len(block_tags)
+
+    return pd.DataFrame(values, index=pd.DatetimeIndex(index), columns=tags)
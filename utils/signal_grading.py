@@ -0,0 +1,283 @@
+# Standard python and AWS imports:
+import numpy as np
+import os
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Default thresholds of the grading:
+MAX_MISSING_RATIO = 0.3
+MAX_FLATLINE_RATIO = 0.7
+MIN_FLATLINE_LENGTH = 10
+MAX_SIGN_CHANGE_RATIO = 0.01
+MAX_GAP = '7D'
+MIN_HISTORY = '14D'
+
+# Metrics computed for each tag by grade_block():
+GRADING_METRICS = [
+    'num_values',
+    'missing_ratio',
+    'history',
+    'largest_gap',
+    'flatline_ratio',
+    'longest_flatline',
+    'longest_flatline_duration',
+    'num_variations',
+    'sign_change_ratio'
+]
+GRADING_FLAGS = [
+    'has_missing_data',
+    'is_flatline',
+    'is_monotonic',
+    'has_large_gaps',
+    'is_short_history'
+]
+
+# Number of tags graded at once: bounds the memory used by the
+# intermediate (rows x tags) arrays
+BLOCK_SIZE = 16
+
+def grade_signals(sensors_df,
+                  max_missing_ratio=MAX_MISSING_RATIO,
+                  max_flatline_ratio=MAX_FLATLINE_RATIO,
+                  min_flatline_length=MIN_FLATLINE_LENGTH,
+                  max_sign_change_ratio=MAX_SIGN_CHANGE_RATIO,
+                  max_gap=MAX_GAP,
+                  min_history=MIN_HISTORY,
+                  block_size=BLOCK_SIZE,
+                  max_workers=None):
+    """
+    Grades every tag of a sensor dataframe before ingesting it in Lookout
+    for Equipment, to spot the signals which would be of no use to train a
+    model:
+
+    * Missing data: ratio of missing values
+    * Flatlines: ratio of the values belonging to a run of constant values
+      (at least `min_flatline_length` consecutive rows)
+    * Monotonic signals (counters...): ratio of sign changes between
+      consecutive variations
+    * Large gaps: longest time without any value
+    * Short history: time between the first and the last value
+
+    All the checks are computed with array operations over blocks of tags
+    (no Python loop over the rows or the tags): run-length encoding for the
+    flatlines, differences of consecutive timestamps for the gaps and sign
+    changes counts for the monotonic signals.
+
+    PARAMS
+    ======
+        sensors_df: pandas.DataFrame
+            A dataframe with a sorted datetime index and one column per tag
+
+        max_missing_ratio: float (default to 0.3)
+            Tags with a larger ratio of missing values are flagged
+
+        max_flatline_ratio: float (default to 0.7)
+            Tags with a larger ratio of values in flatlines are flagged
+
+        min_flatline_length: integer (default to 10)
+            Minimum number of consecutive constant values of a flatline
+
+        max_sign_change_ratio: float (default to 0.01)
+            Tags for which the variations change their sign less often
+            than this ratio are flagged as monotonic
+
+        max_gap: string or pandas.Timedelta (default to '7D')
+            Tags with a longer time without any value are flagged
+
+        min_history: string or pandas.Timedelta (default to '14D')
+            Tags with values spanning a shorter time are flagged
+
+        block_size: integer (default to 16)
+            Number of tags graded at once
+
+        max_workers: integer (default to None)
+            Number of blocks of tags graded concurrently (NumPy releases the
+            GIL), defaults to the number of processors of the machine
+
+    RETURNS
+    =======
+        report: pandas.DataFrame
+            A dataframe with one row per tag, the metrics of each check,
+            a flag for each issue and an `issues` column listing them
+    """
+    timestamps = np.asarray(sensors_df.index, dtype='datetime64[ns]').view(np.int64)
+    if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+        raise ValueError('The index of the sensor dataframe must be sorted')
+
+    def grade(start):
+        values = sensors_df.iloc[:, start:start + block_size].to_numpy()
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64)
+
+        return grade_block(values, timestamps, min_flatline_length)
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        blocks = list(executor.map(grade, range(0, sensors_df.shape[1], block_size)))
+
+    report = pd.DataFrame({
+        key: np.concatenate([b[key] for b in blocks]) if len(blocks) > 0 else []
+        for key in GRADING_METRICS
+    }, index=pd.Index(sensors_df.columns, name='Tag'))
+
+    for column in ['largest_gap', 'history', 'longest_flatline_duration']:
+        report[column] = pd.to_timedelta(report[column], unit='ns')
+
+    report['has_missing_data'] = report['missing_ratio'] > max_missing_ratio
+    report['is_flatline'] = report['flatline_ratio'] > max_flatline_ratio
+    report['is_monotonic'] = (
+        (report['sign_change_ratio'] < max_sign_change_ratio)
+        & (report['num_variations'] > 0)
+    )
+    report['has_large_gaps'] = report['largest_gap'] > pd.Timedelta(max_gap)
+    report['is_short_history'] = report['history'] < pd.Timedelta(min_history)
+
+    flags = report[GRADING_FLAGS].to_numpy()
+    report['issues'] = [
+        ', '.join(flag for flag, raised in zip(GRADING_FLAGS, row) if raised)
+        for row in flags
+    ]
+
+    return report
+
+def grade_block(values, timestamps, min_flatline_length=MIN_FLATLINE_LENGTH):
+    """
+    Computes the grading metrics of a block of tags. The values of each tag
+    are processed as a contiguous row of a (tags x rows) array: the
+    boundaries of the runs of constant values, of the runs of missing
+    values and the non-zero variations are located with numpy.flatnonzero()
+    and reduced tag by tag
+
+    PARAMS
+    ======
+        values: numpy.ndarray
+            A (rows x tags) array of sensor values, NaN for missing values
+
+        timestamps: numpy.ndarray
+            The timestamp of each row (integer nanoseconds)
+
+        min_flatline_length: integer (default to 10)
+            Minimum number of consecutive constant values of a flatline
+
+    RETURNS
+    =======
+        metrics: dict
+            An array with the value of each metric for each tag
+    """
+    values = np.ascontiguousarray(values.T)
+    num_tags, num_rows = values.shape
+    valid = np.isfinite(values)
+    num_values = valid.sum(axis=1)
+    has_values = num_values > 0
+    metrics = {'num_values': num_values}
+    metrics['missing_ratio'] = 1.0 - num_values / max(num_rows, 1)
+
+    if num_rows == 0:
+        for key in GRADING_METRICS[2:]:
+            metrics[key] = np.zeros(num_tags)
+        return metrics
+
+    # History:
+    first = np.argmax(valid, axis=1)
+    last = num_rows - 1 - np.argmax(valid[:, ::-1], axis=1)
+    metrics['history'] = np.where(has_values, timestamps[last] - timestamps[first], 0)
+
+    # Largest gap between two consecutive values: either between two
+    # consecutive rows or across a run of missing values:
+    largest_gap = np.zeros(num_tags, dtype=np.int64)
+    if num_rows > 1:
+        steps = np.diff(timestamps)
+        largest_gap[:] = steps.max()
+        partial = np.flatnonzero(num_values < num_rows)
+        largest_gap[partial] = np.where(valid[partial, 1:] & valid[partial, :-1], steps, 0).max(axis=1)
+
+        # Runs of missing values surrounded by valid values, from the
+        # transitions of the valid mask (a run of a tag can not be matched
+        # with a run end of the next tag: every tag starts with a zero):
+        transitions = np.zeros((num_tags, num_rows + 1), dtype=np.int8)
+        np.subtract(valid[:, 1:], valid[:, :-1], out=transitions[:, 1:-1], dtype=np.int8)
+        run_starts = np.flatnonzero(transitions == -1)
+        run_ends = np.flatnonzero(transitions == 1)
+        del transitions
+
+        if len(run_starts) > 0 and len(run_ends) > 0:
+            previous = np.searchsorted(run_starts, run_ends) - 1
+            matched = previous >= 0
+            run_ends = run_ends[matched]
+            run_starts = run_starts[previous[matched]]
+            tags = run_ends // (num_rows + 1)
+            matched = run_starts // (num_rows + 1) == tags
+            gaps = (
+                timestamps[run_ends[matched] % (num_rows + 1)]
+                - timestamps[run_starts[matched] % (num_rows + 1) - 1]
+            )
+            np.maximum.at(largest_gap, tags[matched], gaps)
+    metrics['largest_gap'] = largest_gap
+
+    # Flatlines (run-length encoding): each row of the boundaries array
+    # starts and ends with a boundary, with a boundary wherever the value
+    # changes in between (missing values are never equal, they form runs
+    # of one value):
+    boundaries = np.ones((num_tags, num_rows + 1), dtype=bool)
+    np.not_equal(values[:, 1:], values[:, :-1], out=boundaries[:, 1:-1])
+    num_boundaries = np.count_nonzero(boundaries, axis=1)
+    positions = np.flatnonzero(boundaries)
+    del boundaries
+
+    # The runs of each tag go from one of its boundaries to the next one
+    # (the last boundary of a tag closes its last run):
+    run_lengths = np.diff(positions)
+    last_boundaries = np.cumsum(num_boundaries) - 1
+    first_runs = np.append(0, last_boundaries[:-1] + 1)
+    run_lengths[last_boundaries[:-1]] = 0
+
+    flat_lengths = np.where(run_lengths >= min_flatline_length, run_lengths, 0)
+    metrics['flatline_ratio'] = np.add.reduceat(flat_lengths, first_runs) / np.maximum(num_values, 1)
+    metrics['longest_flatline'] = np.where(has_values, np.maximum.reduceat(run_lengths, first_runs), 0)
+
+    # Only the runs of several values have a duration:
+    candidates = np.flatnonzero(run_lengths > 1)
+    longest_duration = np.zeros(num_tags, dtype=np.int64)
+    if len(candidates) > 0:
+        tags, first_rows = np.divmod(positions[candidates], num_rows + 1)
+        durations = timestamps[first_rows + run_lengths[candidates] - 1] - timestamps[first_rows]
+        np.maximum.at(longest_duration, tags, durations)
+    metrics['longest_flatline_duration'] = longest_duration
+    del positions, run_lengths, flat_lengths, candidates
+
+    # Monotonic signals: a sign change is counted when a variation has the
+    # opposite sign of the previous non-zero variation of the tag
+    # (variations next to a missing value are ignored):
+    variations = np.diff(values, axis=1)
+    signs = (variations > 0).view(np.int8) - (variations < 0).view(np.int8)
+    del variations
+    num_variations = np.count_nonzero(signs, axis=1)
+    nonzero_signs = signs.ravel()[np.flatnonzero(signs)]
+    del signs
+
+    sign_changes = np.zeros(len(nonzero_signs), dtype=np.int32)
+    np.not_equal(nonzero_signs[1:], nonzero_signs[:-1], out=sign_changes[1:], casting='unsafe')
+
+    # The first variation of each tag is not a sign change:
+    first_variations = np.cumsum(num_variations) - num_variations
+    has_variations = num_variations > 0
+    sign_changes[first_variations[has_variations]] = 0
+    num_sign_changes = np.zeros(num_tags, dtype=np.int64)
+    if has_variations.any():
+        num_sign_changes[has_variations] = np.add.reduceat(sign_changes, first_variations[has_variations])
+
+    metrics['num_variations'] = num_variations
+    metrics['sign_change_ratio'] = np.where(
+        num_variations > 1,
+        num_sign_changes / np.maximum(num_variations - 1, 1),
+        0.0
+    )
+
+    return metrics
+
+def get_bad_tags(report):
+    """
+    Returns the list of the tags with at least one issue in a grading
+    report produced by grade_signals()
+    """
+    return report.index[report['issues'] != ''].tolist()
@@ -0,0 +1,406 @@
+# Standard python and AWS imports:
+import gzip
+import io
+import pandas as pd
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+# S3 multipart uploads: every part but the last one must be at least 5 MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Binary file-like object streaming what is written to it into an S3
+    object. The data are buffered until a part is complete, the parts are
+    then uploaded concurrently with a multipart upload. Objects smaller than
+    a part are sent with a single put_object() call. The number of parts
+    waiting to be uploaded is bounded by a semaphore (which can be shared by
+    several writers): writing blocks until an upload completes.
+
+    Once everything is written, finish() sends the last part without
+    waiting for the upload, and close() waits for all the parts and
+    completes the upload.
+
+    PARAMS
+    ======
+        client: boto3 S3 client
+            The client used for the uploads (or a local stand-in offering
+            the same methods)
+
+        bucket: string
+            Bucket of the object
+
+        key: string
+            Key of the object
+
+        executor: concurrent.futures.Executor
+            The pool of threads uploading the parts
+
+        part_size: integer (default to 16 MB)
+            Size of the parts, at least 5 MB
+
+        pending_parts: threading.Semaphore (default to None)
+            Semaphore bounding the number of parts waiting to be uploaded,
+            defaults to a semaphore of 4 parts
+
+        extra_args: dict (default to None)
+            Additional parameters of the upload (e.g. `ContentEncoding`)
+    """
+    def __init__(self,
+                 client,
+                 bucket,
+                 key,
+                 executor,
+                 part_size=DEFAULT_PART_SIZE,
+                 pending_parts=None,
+                 extra_args=None):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f'Parts of a multipart upload must be at least {MIN_PART_SIZE} bytes')
+
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.executor = executor
+        self.part_size = part_size
+        self.extra_args = extra_args or dict()
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.futures = []
+        self.pending_parts = pending_parts or threading.Semaphore(4)
+        self.finished = False
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed or self.finished:
+            raise ValueError('I/O operation on closed file')
+
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[:self.part_size])
+            del self.buffer[:self.part_size]
+            self.upload_part(part)
+
+        return len(data)
+
+    def upload_part(self, part):
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                **self.extra_args
+            )
+            self.upload_id = response['UploadId']
+
+        # Raises the error of a failed part as soon as possible:
+        for future in self.futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        self.pending_parts.acquire()
+        part_number = len(self.futures) + 1
+        future = self.executor.submit(self.send_part, part, part_number)
+        self.futures.append(future)
+
+    def send_part(self, part, part_number):
+        try:
+            response = self.client.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=part
+            )
+            return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+        finally:
+            self.pending_parts.release()
+
+    def send_object(self, body):
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=body,
+                **self.extra_args
+            )
+
+        finally:
+            self.pending_parts.release()
+
+    def finish(self):
+        """
+        Sends the remaining data without waiting for the uploads to complete
+        """
+        if self.finished:
+            return
+
+        # Small object, no multipart upload needed:
+        if self.upload_id is None:
+            self.pending_parts.acquire()
+            self.futures.append(self.executor.submit(self.send_object, bytes(self.buffer)))
+
+        elif len(self.buffer) > 0:
+            self.upload_part(bytes(self.buffer))
+
+        self.buffer = bytearray()
+        self.finished = True
+
+    def close(self):
+        """
+        Waits for all the uploads and completes the multipart upload
+        """
+        if self.closed:
+            return
+
+        try:
+            self.finish()
+            results = [future.result() for future in self.futures]
+            if self.upload_id is not None:
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    MultipartUpload={'Parts': results}
+                )
+
+        except Exception:
+            self.abort()
+            raise
+
+        finally:
+            self.buffer = bytearray()
+            super().close()
+
+    def abort(self):
+        """
+        Aborts the multipart upload so that no orphan part is left in the
+        bucket
+        """
+        # The parts which never started do not wait for an upload anymore:
+        for future in self.futures:
+            if future.cancel():
+                self.pending_parts.release()
+
+        if self.upload_id is not None:
+            for future in self.futures:
+                if not future.cancelled():
+                    future.exception()
+
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id
+            )
+            self.upload_id = None
+
+def get_training_files(equipment_df,
+                       layout='component',
+                       tags_description=None,
+                       component_name='sensors',
+                       fname='sensors.csv'):
+    """
+    Lists the files expected by Lookout for Equipment for a given layout of
+    the training data
+
+    PARAMS
+    ======
+        equipment_df: pandas.DataFrame
+            A dataframe with a datetime index and one column per tag
+
+        layout: string (default to 'component')
+            Either `component` (one directory and one file per component
+            with all its tags) or `tag` (one directory and one file per tag)
+
+        tags_description: dict (default to None)
+            The component of each tag. If None, all the tags belong to a
+            single component named after `component_name`
+
+        component_name: string (default to 'sensors')
+            Name of the component when no tags description is given
+
+        fname: string (default to 'sensors.csv')
+            Name of the file of each component (`component` layout) or of
+            each tag (`tag` layout)
+
+    RETURNS
+    =======
+        files: list of tuples
+            A list of (relative path, list of tags) tuples
+    """
+    if layout == 'tag':
+        return [(f'{tag}/{fname}', [tag]) for tag in equipment_df.columns]
+
+    elif layout == 'component':
+        components = dict()
+        for tag in equipment_df.columns:
+            if tags_description is None:
+                component = component_name
+            else:
+                component = tags_description[tag]
+            components.setdefault(component, []).append(tag)
+
+        return [(f'{component}/{fname}', tags) for component, tags in components.items()]
+
+    else:
+        raise ValueError(f'Unknown layout: {layout}, expecting "component" or "tag"')
+
+def write_csv(writer,
+              df,
+              chunk_rows=100000,
+              date_format='%Y-%m-%d %H:%M:%S',
+              float_format=None,
+              timestamp_col='Timestamp'):
+    """
+    Encodes a dataframe as CSV chunk by chunk into a binary file-like object,
+    so that the whole CSV content is never held in memory
+    """
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        content = chunk.to_csv(
+            header=(start == 0),
+            date_format=date_format,
+            float_format=float_format,
+            index_label=timestamp_col
+        )
+        writer.write(content.encode('utf-8'))
+
+def write_training_data(equipment_df,
+                        bucket,
+                        prefix,
+                        layout='component',
+                        tags_description=None,
+                        component_name='sensors',
+                        fname='sensors.csv',
+                        compression=None,
+                        chunk_rows=100000,
+                        part_size=DEFAULT_PART_SIZE,
+                        max_workers=8,
+                        date_format='%Y-%m-%d %H:%M:%S',
+                        float_format=None,
+                        client=None):
+    """
+    Writes a training dataset directly to Amazon S3 with the directory
+    layout expected by Lookout for Equipment. Each file is encoded in row
+    chunks and streamed to a multipart upload: no local copy of the dataset
+    is made and the parts of all the files are uploaded concurrently while
+    the next chunks are encoded.
+
+    PARAMS
+    ======
+        equipment_df: pandas.DataFrame
+            A dataframe with a datetime index and one column per tag
+
+        bucket: string
+            Bucket where the training data are written
+
+        prefix: string
+            Prefix of the training data (e.g. `training-data/centrifugal-pump/`)
+
+        layout: string (default to 'component')
+            Either `component` (one directory and one file per component
+            with all its tags) or `tag` (one directory and one file per tag)
+
+        tags_description: dict (default to None)
+            The component of each tag. If None, all the tags belong to a
+            single component named after `component_name`
+
+        component_name: string (default to 'sensors')
+            Name of the component when no tags description is given
+
+        fname: string (default to 'sensors.csv')
+            Name of each file
+
+        compression: string (default to None)
+            Set to `gzip` to compress the files (`.gz` is appended to their
+            name)
+
+        chunk_rows: integer (default to 100000)
+            Number of rows encoded at once
+
+        part_size: integer (default to 16 MB)
+            Size of the parts of the multipart uploads
+
+        max_workers: integer (default to 8)
+            Number of parts uploaded concurrently
+
+        date_format: string (default to '%Y-%m-%d %H:%M:%S')
+            Format of the timestamps
+
+        float_format: string (default to None)
+            Format of the sensor values (e.g. '%.6g'), by default the
+            shortest representation giving back the same values
+
+        client: boto3 S3 client (default to None)
+            The client used for the uploads. A new one is created if None
+
+    RETURNS
+    =======
+        s3_paths: list
+            The S3 URIs of the files written
+    """
+    if compression not in [None, 'gzip']:
+        raise ValueError(f'Unknown compression: {compression}, expecting None or "gzip"')
+
+    if client is None:
+        import boto3
+        client = boto3.client('s3')
+
+    if len(prefix) > 0 and not prefix.endswith('/'):
+        prefix += '/'
+
+    files = get_training_files(equipment_df, layout, tags_description, component_name, fname)
+    extra_args = {'ContentType': 'text/csv'}
+    if compression == 'gzip':
+        extra_args['ContentEncoding'] = 'gzip'
+
+    # The parts of all the files share the same pool of threads and at most
+    # two parts per thread wait to be uploaded:
+    timestamp_col = equipment_df.index.name or 'Timestamp'
+
+    # Timestamps are formatted once for all the files:
+    if isinstance(equipment_df.index, pd.DatetimeIndex):
+        equipment_df = equipment_df.set_axis(equipment_df.index.strftime(date_format), axis='index')
+    pending_parts = threading.Semaphore(2 * max_workers)
+    writers = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for path, tags in files:
+                key = f'{prefix}{path}'
+                if compression == 'gzip':
+                    key += '.gz'
+
+                writer = S3MultipartWriter(
+                    client,
+                    bucket,
+                    key,
+                    executor,
+                    part_size=part_size,
+                    pending_parts=pending_parts,
+                    extra_args=extra_args
+                )
+                writers.append(writer)
+                if compression == 'gzip':
+                    with gzip.GzipFile(fileobj=writer, mode='wb', compresslevel=6) as f:
+                        write_csv(f, equipment_df[tags], chunk_rows, date_format, float_format, timestamp_col)
+                else:
+                    write_csv(writer, equipment_df[tags], chunk_rows, date_format, float_format, timestamp_col)
+
+                # The next file is encoded while this one is uploaded:
+                writer.finish()
+
+            for writer in writers:
+                writer.close()
+
+        except Exception:
+            for writer in writers:
+                if not writer.closed:
+                    writer.abort()
+            raise
+
+    return [f's3://{bucket}/{writer.key}' for writer in writers]